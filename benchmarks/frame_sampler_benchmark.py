@@ -0,0 +1,103 @@
+"""
+Frame sampling benchmark over synthetic videos.
+
+Generates long-GOP H.264 test videos of several lengths with the bundled FFmpeg,
+then times the previous seek-per-frame extraction against each FrameSampler
+strategy.
+
+Usage:
+    python -m benchmarks.frame_sampler_benchmark
+    python -m benchmarks.frame_sampler_benchmark --durations 10 60 300 --frames 5 --gop 250
+"""
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import imageio_ffmpeg
+import numpy as np
+from PIL import Image
+
+from frame_sampler import FrameSampler, STRATEGIES
+
+
+def make_video(ffmpeg_path, path, duration, fps, gop, size="640x360"):
+    # testsrc2 moves every frame, so the encoder can't cheat with skip blocks
+    subprocess.run(
+        [
+            ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"testsrc2=duration={duration}:size={size}:rate={fps}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-g", str(gop), "-pix_fmt", "yuv420p",
+            str(path),
+        ],
+        check=True,
+    )
+
+
+def seek_extract(video_path, num_frames):
+    """The previous implementation: one CAP_PROP_POS_FRAMES seek per sampled frame"""
+    frames = []
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames > 0:
+            for idx in np.linspace(0, total_frames - 1, num_frames, dtype=int):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+                ret, frame = cap.read()
+                if ret:
+                    frames.append(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))
+    finally:
+        cap.release()
+    return frames
+
+
+def time_call(fn, repeats):
+    timings = []
+    frames = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        frames = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=int, nargs="+", default=[10, 60, 180], help="Video lengths in seconds")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--gop", type=int, default=250, help="Keyframe interval of the synthetic videos")
+    parser.add_argument("--frames", type=int, default=5, help="Frames to sample per video")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
+    sampler = FrameSampler(ffmpeg_path)
+    report = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for duration in args.durations:
+            video_path = Path(tmp) / f"synthetic_{duration}s.mp4"
+            make_video(ffmpeg_path, video_path, duration, args.fps, args.gop)
+
+            methods = {"seek": lambda: seek_extract(video_path, args.frames)}
+            for strategy in STRATEGIES:
+                methods[strategy] = lambda s=strategy: sampler.sample(video_path, args.frames, strategy=s)
+
+            for name, fn in methods.items():
+                seconds, count = time_call(fn, args.repeats)
+                report.append({
+                    "duration_s": duration,
+                    "method": name,
+                    "seconds": round(seconds, 3),
+                    "frames": count,
+                })
+                print(f"{duration:>5}s  {name:<10} {seconds:8.3f}s  {count} frames")
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
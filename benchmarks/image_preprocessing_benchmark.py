@@ -0,0 +1,96 @@
+"""
+Bytes and latency of model-bound images, with and without preprocessing.
+
+Every image under ``static/`` (or ``--images``) is loaded from memory, the way
+uploads are, and prepared both ways:
+
+- baseline: the PIL image handed to the Gemini SDK, which encodes it as a
+  lossless WebP blob
+- preprocessed: ImagePreprocessor's EXIF fix, max-edge resize and lossy re-encode
+
+Transfer time is estimated from ``--upload-mbps``.
+
+Usage:
+    python -m benchmarks.image_preprocessing_benchmark
+    python -m benchmarks.image_preprocessing_benchmark --max-edge 1024 --format WEBP --quality 80 --upload-mbps 20
+"""
+import argparse
+import io
+import json
+import time
+from pathlib import Path
+
+from google.generativeai.types import content_types
+from PIL import Image
+
+from image_preprocessing import ImagePreprocessor
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp"}
+
+
+def load_in_memory(path):
+    return Image.open(io.BytesIO(path.read_bytes()))
+
+
+def sdk_blob_bytes(image):
+    start = time.perf_counter()
+    blob = content_types.to_blob(image)
+    return len(blob.data), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default="static", help="Directory searched recursively for images")
+    parser.add_argument("--max-edge", type=int, default=1536)
+    parser.add_argument("--format", default="JPEG", choices=["JPEG", "WEBP"])
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--upload-mbps", type=float, default=10.0, help="Uplink used to estimate transfer time")
+    args = parser.parse_args()
+
+    paths = sorted(p for p in Path(args.images).rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        raise SystemExit(f"No images found under {args.images}")
+
+    preprocessor = ImagePreprocessor(max_edge=args.max_edge, fmt=args.format, quality=args.quality, workers=1)
+    transfer = lambda size: size * 8 / (args.upload_mbps * 1_000_000)
+
+    rows = []
+    for path in paths:
+        baseline_bytes, baseline_seconds = sdk_blob_bytes(load_in_memory(path))
+        prepared = preprocessor.prepare_sync(load_in_memory(path))
+        rows.append({
+            "image": str(path),
+            "original": f"{prepared.original_width}x{prepared.original_height}",
+            "prepared": f"{prepared.width}x{prepared.height}",
+            "baseline_bytes": baseline_bytes,
+            "prepared_bytes": prepared.encoded_bytes,
+            "baseline_encode_ms": round(baseline_seconds * 1000, 2),
+            "prepared_encode_ms": round(prepared.seconds * 1000, 2),
+        })
+
+    baseline_total = sum(row["baseline_bytes"] for row in rows)
+    prepared_total = sum(row["prepared_bytes"] for row in rows)
+    baseline_encode = sum(row["baseline_encode_ms"] for row in rows) / 1000
+    prepared_encode = sum(row["prepared_encode_ms"] for row in rows) / 1000
+    summary = {
+        "images": len(rows),
+        "baseline_bytes": baseline_total,
+        "prepared_bytes": prepared_total,
+        "bytes_saved": baseline_total - prepared_total,
+        "bytes_saved_pct": round(100 * (1 - prepared_total / baseline_total), 1),
+        "baseline_encode_s": round(baseline_encode, 3),
+        "prepared_encode_s": round(prepared_encode, 3),
+        "baseline_encode_plus_upload_s": round(baseline_encode + transfer(baseline_total), 3),
+        "prepared_encode_plus_upload_s": round(prepared_encode + transfer(prepared_total), 3),
+        "upload_mbps": args.upload_mbps,
+    }
+
+    for row in rows:
+        print(f"{row['image']:<50} {row['original']:>11} -> {row['prepared']:<11} "
+              f"{row['baseline_bytes']:>10} -> {row['prepared_bytes']:>9} bytes  "
+              f"{row['baseline_encode_ms']:>8.1f} -> {row['prepared_encode_ms']:>7.1f} ms")
+    print(json.dumps({"summary": summary, "images": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
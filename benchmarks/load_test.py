@@ -0,0 +1,455 @@
+"""
+End-to-end HTTP load test of main.app with a fake Gemini backend.
+
+Runs the FastAPI app in-process behind httpx's ASGI transport, with every
+model call answered by a deterministic FakeGenerativeModel (configurable
+latency, jitter and error rate) and the database replaced by an in-memory
+mongomock catalog, or a scratch database on a local mongod. The catalog is
+seeded by catalog_generator. A weighted mix of /upload_image,
+/upload/image/*, /upload/video/* and /search/all/* requests is driven at a
+fixed concurrency. Per-endpoint p50/p95/p99 latency, throughput, status
+counts and event-loop lag are printed as JSON, so runs from two releases
+can be diffed. Pass --baseline to add the deltas against an earlier report.
+
+Client and server share one event loop, so the loop lag includes the load
+generator's own overhead. mongomock has no $text operator: in-memory runs
+exercise the app's escaped-regex search fallback, so use --mongodb-url for
+search numbers. Video uploads are sent without a file (the catalog lookup
+path) because a queued video job needs ffmpeg and the speech stack.
+
+Usage:
+    python -m benchmarks.load_test --requests 2000 --concurrency 32 --latency-ms 400 --error-rate 0.02
+    python -m benchmarks.load_test --mongodb-url mongodb://localhost:27017 --output load.json
+    python -m benchmarks.load_test --mix upload_image=1,search_all=3 --baseline load.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional
+from unittest import mock
+
+from google.api_core.exceptions import ServiceUnavailable
+from PIL import Image
+
+from catalog_generator import VIDEO, CatalogGenerator, object_id, write_mongo
+from loop_monitor import get_loop_monitor
+from model_client import DEFAULT_MODEL_NAME, ModelClient, _clients
+
+LOAD_TEST_DB = "sociosell_load_test"
+
+# Relative weight of each request type in the default mix
+SCENARIOS = {
+    "upload_image": 2,
+    "upload_image_batch": 1,
+    "upload_video": 1,
+    "search_products": 2,
+    "product_details": 2,
+    "search_videos": 1,
+    "video_listings": 1,
+    "search_all": 2,
+}
+
+# main's module-level collection handles, rebound to the load test database
+MAIN_COLLECTIONS = {
+    "product_collection": "products",
+    "listing_collection": "listings",
+    "analytics_collection": "analytics",
+    "review_collection": "reviews",
+    "video_collection": "videos",
+    "video_listings_collection": "video_listings",
+    "video_analytics_collection": "video_analytics",
+    "analysis_cache_collection": "analysis_cache",
+    "video_jobs_collection": "video_jobs",
+}
+
+IMAGE_LABEL = re.compile(r"Image (\d+):")
+PLACEHOLDER = re.compile(r"\[([^\]]+)\]")
+
+
+class FakeResponse(NamedTuple):
+    text: str
+
+
+class FakeGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel that answers without calling the API.
+
+    Each call sleeps for ``latency_ms`` (normally distributed with
+    ``jitter_ms``) and fails with ServiceUnavailable at ``error_rate``. The
+    draws come from a seeded RNG, so a run with the same seed and call order
+    sees the same latencies and failures. JSON-mode calls get an instance of
+    the requested response schema; text-mode calls get the image analysis
+    format, one block per numbered image. With a ``catalog``, the name,
+    category and features come from one of its products, so recommendations
+    find real matches.
+    """
+
+    def __init__(self, latency_ms: float = 300.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 seed: int = 0, catalog: Optional[CatalogGenerator] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.catalog = catalog
+        self._rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    async def generate_content_async(self, contents, generation_config=None, **kwargs):
+        self.calls += 1
+        delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+        fail = self._rng.random() < self.error_rate
+        await asyncio.sleep(delay / 1000)
+        if fail:
+            self.errors += 1
+            raise ServiceUnavailable("Injected model error")
+
+        images = len([part for part in contents if isinstance(part, str) and IMAGE_LABEL.fullmatch(part)])
+        profile = self.catalog.profile(self._rng.randrange(self.catalog.products)) if self.catalog else None
+        schema = (generation_config or {}).get("response_schema")
+        if schema:
+            return FakeResponse(json.dumps(fake_instance(schema, images, profile=profile)))
+        return FakeResponse(fake_text(images))
+
+
+def catalog_fields(profile) -> Dict:
+    return {"product_name": profile.title, "category": profile.category,
+            "subcategory": profile.subcategory, "key_features": profile.features}
+
+
+def fake_instance(schema: Dict, images: int = 0, name: str = "", profile=None):
+    """A value matching a response schema; batch ``analyses`` get one item per image"""
+    if profile is not None and name in catalog_fields(profile):
+        return catalog_fields(profile)[name]
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: fake_instance(child, images, key, profile)
+                for key, child in schema.get("properties", {}).items()}
+    if kind == "array":
+        if name == "analyses":
+            return [dict(fake_instance(schema["items"], images, profile=profile), image_number=number)
+                    for number in range(1, images + 1)]
+        return [fake_instance(schema["items"], images, name, profile) for _ in range(3)]
+    if kind in ("integer", "number"):
+        return 1
+    if kind == "boolean":
+        return True
+    return f"Synthetic {name.replace('_', ' ')}".strip()
+
+
+def fake_text(images: int = 0) -> str:
+    from image_processor import ANALYSIS_FIELDS
+
+    fields = PLACEHOLDER.sub(r"Synthetic \1", ANALYSIS_FIELDS)
+    if not images:
+        return f"BEGIN_ANALYSIS\n{fields}\nEND_ANALYSIS"
+    return "\n".join(f"BEGIN_ANALYSIS {n}\n{fields}\nEND_ANALYSIS {n}" for n in range(1, images + 1))
+
+
+def _without_text_search(method):
+    from pymongo.errors import OperationFailure
+    from search import INDEX_NOT_FOUND
+
+    def wrapper(self, query=None, *args, **kwargs):
+        # find takes a filter and aggregate a pipeline that starts with the $text $match
+        first = query[0].get("$match", {}) if isinstance(query, list) and query else query
+        # What mongod says without a text index, so search takes its regex fallback
+        if first and "$text" in first:
+            raise OperationFailure("text index required for $text query", code=INDEX_NOT_FOUND)
+        return method(self, query, *args, **kwargs)
+    return wrapper
+
+
+class PlannedRequest(NamedTuple):
+    scenario: str
+    method: str
+    url: str
+    files: Optional[List] = None
+    data: Optional[Dict] = None
+    headers: Optional[Dict] = None
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, float]:
+    if not text:
+        return dict(SCENARIOS)
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def png(index: int, size: int) -> bytes:
+    # A distinct colour per image (lossless, so it survives decoding) and every upload misses the analysis cache
+    image = Image.new("RGB", (size, size), (index % 256, index // 256 % 256, index // 65536 % 256))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def plan_requests(count: int, generator: CatalogGenerator, mix: Dict[str, float], seed: int = 0,
+                  image_size: int = 512, first_image: int = 0) -> List[PlannedRequest]:
+    """A reproducible request sequence, with payloads built ahead of the timed run"""
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    images = iter(range(first_image, first_image + count * 3))
+    json_accept = {"accept": "application/json"}
+    planned = []
+    for _ in range(count):
+        scenario = rng.choices(names, weights)[0]
+        profile = generator.profile(rng.randrange(generator.products))
+        video_id = str(object_id(generator.seed, VIDEO, rng.randrange(max(1, generator.videos))))
+        term = rng.choice([profile.brand, profile.subcategory, profile.title.split()[1]])
+        if scenario == "upload_image":
+            files = [("file", ("product.png", png(next(images), image_size), "image/png"))]
+            planned.append(PlannedRequest(scenario, "POST", "/upload_image", files=files, headers=json_accept))
+        elif scenario == "upload_image_batch":
+            files = [("files", (f"product_{n}.png", png(next(images), image_size), "image/png"))
+                     for n in range(3)]
+            planned.append(PlannedRequest(scenario, "POST", "/upload/image/", files=files,
+                                          data={"title": profile.title}))
+        elif scenario == "upload_video":
+            planned.append(PlannedRequest(scenario, "POST", "/upload/video/",
+                                          data={"title": profile.title, "description": "Load test"}))
+        elif scenario == "search_products":
+            planned.append(PlannedRequest(scenario, "GET", f"/upload/image/search/{term}"))
+        elif scenario == "product_details":
+            product_id = generator.product_id(rng.randrange(generator.products))
+            planned.append(PlannedRequest(scenario, "GET", f"/upload/image/product/details/{product_id}"))
+        elif scenario == "search_videos":
+            planned.append(PlannedRequest(scenario, "GET", f"/upload/video/search/{term}"))
+        elif scenario == "video_listings":
+            planned.append(PlannedRequest(scenario, "GET", f"/upload/video/listings/{video_id}"))
+        else:
+            planned.append(PlannedRequest(scenario, "GET", f"/search/all/{term}"))
+    return planned
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "p50": round(percentile(ordered, 50), 2),
+        "p95": round(percentile(ordered, 95), 2),
+        "p99": round(percentile(ordered, 99), 2),
+        "max": round(ordered[-1], 2) if ordered else 0.0,
+        "mean": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+    }
+
+
+async def monitor_loop_lag(samples: List[float], interval: float = 0.01):
+    """Record how late each tick of a fixed-interval sleep wakes up, in ms"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, (time.perf_counter() - start - interval) * 1000))
+
+
+async def drive(client, planned: List[PlannedRequest], concurrency: int):
+    """Send the planned requests from ``concurrency`` workers; returns (scenario, status, ms) per request"""
+    results = []
+    pending = iter(planned)
+
+    async def worker():
+        for request in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.request(request.method, request.url, files=request.files,
+                                                data=request.data, headers=request.headers)
+                status = response.status_code
+            except Exception as e:
+                logging.getLogger(__name__).error(f"{request.method} {request.url} failed: {e}")
+                status = 0
+            results.append((request.scenario, status, (time.perf_counter() - start) * 1000))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def build_report(results, seconds: float, lag: List[float], model: FakeGenerativeModel, config: Dict) -> Dict:
+    def section(rows):
+        statuses = Counter(str(status) for _, status, _ in rows)
+        return {
+            "requests": len(rows),
+            "errors": sum(1 for _, status, _ in rows if status == 0 or status >= 500),
+            "status": dict(sorted(statuses.items())),
+            "throughput_rps": round(len(rows) / seconds, 2) if seconds else 0.0,
+            "latency_ms": summarize([ms for _, _, ms in rows]),
+        }
+
+    endpoints = {}
+    for scenario in sorted({row[0] for row in results}):
+        endpoints[scenario] = section([row for row in results if row[0] == scenario])
+    return {
+        "config": config,
+        "duration_s": round(seconds, 3),
+        **section(results),
+        "endpoints": endpoints,
+        "event_loop_lag_ms": summarize(lag),
+        "model": {"calls": model.calls, "errors": model.errors},
+    }
+
+
+def compare(report: Dict, baseline: Dict) -> Dict:
+    """Throughput and p95 changes against an earlier report, overall and per endpoint"""
+    def delta(before, after):
+        change = round((after - before) / before * 100, 1) if before else None
+        return {"before": before, "after": after, "change_pct": change}
+
+    def pair(current, previous):
+        return {
+            "throughput_rps": delta(previous["throughput_rps"], current["throughput_rps"]),
+            "p95_ms": delta(previous["latency_ms"]["p95"], current["latency_ms"]["p95"]),
+        }
+
+    return {
+        "overall": pair(report, baseline),
+        "endpoints": {name: pair(section, baseline["endpoints"][name])
+                      for name, section in report["endpoints"].items() if name in baseline["endpoints"]},
+        "event_loop_lag_p99_ms": delta(baseline["event_loop_lag_ms"]["p99"], report["event_loop_lag_ms"]["p99"]),
+    }
+
+
+def bind_database(main, db):
+    """Point main's database handles, caches and job queue at ``db``"""
+    main.db = db
+    for attribute, name in MAIN_COLLECTIONS.items():
+        setattr(main, attribute, db[name])
+    main.image_processor.cache.attach_collection(db["analysis_cache"])
+    main.video_stage_cache.attach_collection(db["analysis_cache"])
+    main.video_job_queue.collection = db["video_jobs"]
+
+
+async def run(args):
+    os.environ.setdefault("GOOGLE_API_KEY", "load-test")
+    generator = CatalogGenerator(args.products, args.videos, seed=args.seed)
+    model = FakeGenerativeModel(args.latency_ms, args.jitter_ms, args.error_rate, args.seed, catalog=generator)
+    client = ModelClient(DEFAULT_MODEL_NAME, model=model)
+    _clients[DEFAULT_MODEL_NAME] = client
+
+    import httpx
+    import main
+
+    logging.getLogger().setLevel(args.log_level)
+    main.image_processor.model_client = client
+
+    if args.mongodb_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from pymongo import MongoClient
+
+        sync_db = MongoClient(args.mongodb_url)[LOAD_TEST_DB]
+        async_db = AsyncIOMotorClient(args.mongodb_url)[LOAD_TEST_DB]
+        text_search = contextlib.nullcontext()
+    else:
+        import mongomock
+        from mongomock_motor import AsyncMongoMockClient
+
+        shared = mongomock.MongoClient()
+        sync_db = shared[LOAD_TEST_DB]
+        async_db = AsyncMongoMockClient(mock_mongo_client=shared)[LOAD_TEST_DB]
+        text_search = mock.patch.multiple(
+            mongomock.collection.Collection,
+            find=_without_text_search(mongomock.collection.Collection.find),
+            aggregate=_without_text_search(mongomock.collection.Collection.aggregate),
+        )
+
+    for name in ("analysis_cache", "video_jobs"):
+        sync_db[name].drop()
+    seeded = write_mongo(sync_db, generator)
+    bind_database(main, async_db)
+
+    mix = parse_mix(args.mix)
+    warmup = plan_requests(args.warmup, generator, mix, args.seed + 1, args.image_size)
+    planned = plan_requests(args.requests, generator, mix, args.seed, args.image_size,
+                            first_image=args.warmup * 3)
+
+    lag: List[float] = []
+    # Keep stdout for the report; the app prints while handling some requests
+    with text_search, contextlib.redirect_stdout(sys.stderr):
+        await main.app.router.startup()
+        try:
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test",
+                                         timeout=args.timeout) as http:
+                await drive(http, warmup, args.concurrency)
+                model.calls = model.errors = 0
+                get_loop_monitor().reset()
+                monitor = asyncio.create_task(monitor_loop_lag(lag))
+                start = time.perf_counter()
+                results = await drive(http, planned, args.concurrency)
+                seconds = time.perf_counter() - start
+                monitor.cancel()
+                blocking = get_loop_monitor().stats()["blocking"]
+        finally:
+            await main.app.router.shutdown()
+
+    config = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+        "error_rate": args.error_rate,
+        "seed": args.seed,
+        "database": "mongod" if args.mongodb_url else "mongomock",
+        "catalog": seeded,
+        "mix": mix,
+        "model_max_concurrency": client.max_concurrency,
+    }
+    report = build_report(results, seconds, lag, model, config)
+    # Where the app blocked the loop, as seen by its own monitor (stacks are in /metrics)
+    report["blocking"] = {key: blocking[key] for key in ("events", "blocked_ms_total", "top_sites")}
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["baseline"] = compare(report, json.load(f))
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    if args.mongodb_url and args.drop:
+        sync_db.client.drop_database(LOAD_TEST_DB)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests sent first")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="fake model latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="standard deviation of the model latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of model calls that fail")
+    parser.add_argument("--mix", help=f"scenario weights, e.g. upload_image=2,search_all=1 (from {', '.join(SCENARIOS)})")
+    parser.add_argument("--products", type=int, default=2000, help="catalog products to seed")
+    parser.add_argument("--videos", type=int, default=200, help="catalog videos to seed")
+    parser.add_argument("--image-size", type=int, default=512, help="edge length of uploaded test images")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request client timeout in seconds")
+    parser.add_argument("--mongodb-url", help="use a scratch database on this mongod instead of mongomock")
+    parser.add_argument("--drop", action="store_true", help="drop the scratch database afterwards")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--log-level", default="WARNING")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Latency benchmark for product recommendations.
+
+Compares the previous path (a new synchronous MongoClient per request plus two
+blocking finds) with the shared AsyncIOMotorClient running one aggregation.
+
+Usage:
+    python -m benchmarks.recommendations_benchmark --mongodb-url mongodb://localhost:27017
+    python -m benchmarks.recommendations_benchmark --mock --handshake-ms 40
+
+``--mock`` runs both paths in-process against mongomock/mongomock-motor, with
+``--handshake-ms`` emulating the connection setup the old path paid per request.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+from recommendations import fetch_recommendations, format_recommendations
+
+CATEGORIES = {
+    "Electronics": ["Smartphones", "Wireless Earbuds", "Laptops"],
+    "Fashion": ["Sneakers", "Clothing"],
+    "Home Decor": ["Lighting", "Rugs"],
+}
+FEATURES = ["5G Connectivity", "Fast Charging", "Water Resistance", "Touch Controls",
+            "Breathable Mesh", "Energy Efficient", "Handcrafted", "Lightweight"]
+BENCH_DB = "sociosell_benchmark"
+
+
+def make_products(count, seed=7):
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        category = rng.choice(list(CATEGORIES))
+        products.append({
+            "category": category,
+            "subcategory": rng.choice(CATEGORIES[category]),
+            "title": f"Brand {i}",
+            "features": rng.sample(FEATURES, 3),
+            "price_range": rng.choice(["budget", "mid_range", "premium"]),
+        })
+    return products
+
+
+def make_requests(count, seed=11):
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        category = rng.choice(list(CATEGORIES))
+        requests.append({
+            "category": category,
+            "subcategory": rng.choice(CATEGORIES[category]),
+            "key_features": rng.sample(FEATURES, 2),
+        })
+    return requests
+
+
+def old_recommendations(make_client, data):
+    """The per-request MongoClient implementation previously in main.generate_recommendations"""
+    client = make_client()
+    try:
+        product_collection = client[BENCH_DB]["products"]
+        category, subcategory = data["category"], data["subcategory"]
+        primary_query = {"category": category, "subcategory": subcategory,
+                         "features": {"$in": data["key_features"]}}
+        fallback_query = {"category": category, "subcategory": subcategory}
+        recommendations = list(product_collection.find(primary_query).limit(5))
+        if len(recommendations) < 3:
+            recommendations.extend(product_collection.find(fallback_query).limit(5 - len(recommendations)))
+        return format_recommendations(recommendations)
+    finally:
+        client.close()
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "requests": len(samples),
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+    }
+
+
+async def run(args):
+    if args.mock:
+        import mongomock
+        from mongomock_motor import AsyncMongoMockClient
+
+        shared_sync = mongomock.MongoClient()
+
+        class HandshakeClient:
+            """Emulates the TLS/handshake cost of opening a fresh MongoClient"""
+            def __init__(self):
+                time.sleep(args.handshake_ms / 1000)
+
+            def __getitem__(self, name):
+                return shared_sync[name]
+
+            def close(self):
+                pass
+
+        make_client = HandshakeClient
+        async_client = AsyncMongoMockClient()
+        seed_sync = shared_sync
+    else:
+        from pymongo import MongoClient
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        make_client = lambda: MongoClient(args.mongodb_url)
+        async_client = AsyncIOMotorClient(args.mongodb_url, maxPoolSize=20, minPoolSize=5)
+        seed_sync = MongoClient(args.mongodb_url)
+
+    products = make_products(args.products)
+    seed_sync[BENCH_DB]["products"].delete_many({})
+    seed_sync[BENCH_DB]["products"].insert_many([dict(p) for p in products])
+    async_collection = async_client[BENCH_DB]["products"]
+    if args.mock:
+        # mongomock-motor keeps its own store, so it is seeded separately
+        await async_collection.insert_many([dict(p) for p in products])
+
+    requests = make_requests(args.requests)
+
+    old_samples = []
+    for data in requests:
+        start = time.perf_counter()
+        old_recommendations(make_client, data)
+        old_samples.append((time.perf_counter() - start) * 1000)
+
+    new_samples = []
+    for data in requests:
+        start = time.perf_counter()
+        await fetch_recommendations(async_collection, data)
+        new_samples.append((time.perf_counter() - start) * 1000)
+
+    if not args.mock:
+        seed_sync.drop_database(BENCH_DB)
+        seed_sync.close()
+
+    print(json.dumps({
+        "backend": "mongomock" if args.mock else args.mongodb_url,
+        "products": args.products,
+        "per_request_client": summarize(old_samples),
+        "shared_pool_aggregation": summarize(new_samples),
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongodb-url", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--mock", action="store_true", help="use in-process mongomock instead of a server")
+    parser.add_argument("--handshake-ms", type=float, default=40.0)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Micro-benchmark of the model response parsers.
+
+Compares the legacy ``startswith`` chain the video processor used (copied
+below) with the compiled VIDEO_ANALYSIS_SCHEMA, on a labelled-text response
+and on the same analysis returned as a JSON-mode object.
+
+Usage:
+    python -m benchmarks.response_parser_benchmark
+    python -m benchmarks.response_parser_benchmark --items 50 --number 5000
+"""
+import argparse
+import json
+import timeit
+
+from video_processor import VIDEO_ANALYSIS_SCHEMA
+
+TEXT_FIELDS = {
+    'Product Name:': 'product_name', 'Category:': 'category', 'Subcategory:': 'subcategory',
+    'Platform:': 'platform', 'Duration:': 'duration', 'Views:': 'views',
+    'Transcript Summary:': 'transcript_summary', 'Price:': 'price',
+}
+SECTIONS = {
+    'Key Features:': 'key_features', 'Search Keywords:': 'search_keywords',
+    'Highlights:': 'highlights', 'Key Timestamps:': 'key_timestamps', 'Product links:': 'product_links',
+}
+
+
+def legacy_parse(text):
+    """The pre-schema VideoProcessor._parse_analysis, condensed"""
+    analysis_dict = {key: "Not Available" for key in TEXT_FIELDS.values()}
+    analysis_dict.update(key_features=[], search_keywords=[], highlights=[], key_timestamps={}, product_links=[])
+    if 'BEGIN_ANALYSIS' in text and 'END_ANALYSIS' in text:
+        content = text.split('BEGIN_ANALYSIS')[-1].split('END_ANALYSIS')[0].strip()
+    else:
+        content = text.strip()
+
+    current_section = None
+    for line in content.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        label = next((label for label in TEXT_FIELDS if line.startswith(label)), None)
+        section = next((label for label in SECTIONS if line.startswith(label)), None)
+        if label:
+            analysis_dict[TEXT_FIELDS[label]] = line.split(':', 1)[1].strip()
+        elif section:
+            current_section = SECTIONS[section]
+        elif line.startswith('- '):
+            item = line.strip('- ').strip()
+            if current_section == 'product_links':
+                link, price = item.rsplit(',', 1) if ',' in item else (item, "Not Available")
+                analysis_dict['product_links'].append({"store": link.strip(), "price": price.strip()})
+            elif current_section in ('key_features', 'search_keywords', 'highlights'):
+                analysis_dict[current_section].append(item)
+        elif current_section == 'key_timestamps' and ':' in line:
+            timestamp, desc = line.split(':', 1)
+            analysis_dict['key_timestamps'][timestamp.strip()] = desc.strip()
+    return analysis_dict
+
+
+def sample_response(items):
+    lines = ["Sure, here is the analysis.", "BEGIN_ANALYSIS",
+             "Product Name: Aero Runner 2", "Category: Fashion", "Subcategory: Sneakers",
+             "Platform: YouTube", "Duration: 12 min", "Views: 1.2M",
+             "Transcript Summary: " + "A lightweight running shoe with a carbon plate. " * 4,
+             "Price: $129.99", "Key Timestamps:"]
+    lines += [f"{minute} min - scene {minute}" for minute in range(items)]
+    for header in ("Highlights:", "Key Features:", "Search Keywords:"):
+        lines.append(header)
+        lines += [f"- {header[:-1].lower()} {i}" for i in range(items)]
+    lines.append("Product links:")
+    lines += [f"- Store {i}, ${i}.99" for i in range(items)]
+    lines += ["END_ANALYSIS", "Let me know if you need anything else."]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10, help="Entries per list section")
+    parser.add_argument("--number", type=int, default=2000, help="Parses per timing run")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    text = sample_response(args.items)
+    parsed = VIDEO_ANALYSIS_SCHEMA.parse(text)
+    json_text = "```json\n" + json.dumps(parsed) + "\n```"
+    if legacy_parse(text) != parsed or VIDEO_ANALYSIS_SCHEMA.parse(json_text) != parsed:
+        raise SystemExit("Parsers disagree on the sample response")
+
+    def best_us(fn, payload):
+        runs = timeit.repeat(lambda: fn(payload), number=args.number, repeat=args.repeat)
+        return round(1e6 * min(runs) / args.number, 2)
+
+    results = {
+        "response_chars": len(text),
+        "legacy_text_us": best_us(legacy_parse, text),
+        "schema_text_us": best_us(VIDEO_ANALYSIS_SCHEMA.parse, text),
+        "schema_json_us": best_us(VIDEO_ANALYSIS_SCHEMA.parse, json_text),
+    }
+    results["text_speedup"] = round(results["legacy_text_us"] / results["schema_text_us"], 2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
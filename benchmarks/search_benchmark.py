@@ -0,0 +1,135 @@
+"""
+Search benchmark: unanchored case-insensitive $regex vs the weighted text index.
+
+Generates a synthetic product catalog (1M documents by default) in a scratch
+database, then times the previous regex query and search.search_collection
+for the same terms and reports latency and documents examined.
+
+Usage:
+    python -m benchmarks.search_benchmark --mongodb-url mongodb://localhost:27017 --products 1000000
+    python -m benchmarks.search_benchmark --reuse   # keep the catalog from a previous run
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+from pymongo import ASCENDING, MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from search import search_collection, text_index_model
+
+BENCH_DB = "sociosell_search_benchmark"
+BATCH_SIZE = 10_000
+
+BRANDS = ["Samsung", "Apple", "Sony", "Nike", "Adidas", "Zara", "Philips", "Wilson", "MAC", "Dyson"]
+NOUNS = ["Headphones", "Sneakers", "Blazer", "Lamp", "Lipstick", "Basketball", "Watch", "Tablet",
+         "Mirror", "Rug", "Earbuds", "Racket", "Foundation", "Mascara", "Speaker"]
+CATEGORIES = {
+    "Electronics": ["Smartphones", "Wireless Earbuds", "Tablets"],
+    "Fashion": ["Sneakers", "Clothing"],
+    "Home Decor": ["Lighting", "Rugs", "Mirrors"],
+    "Beauty": ["Makeup", "Skincare"],
+    "Sports": ["Basketball", "Tennis"],
+}
+FEATURES = ["Noise Cancelling", "Fast Charging", "Water Resistant", "Lightweight", "Handcrafted",
+            "Energy Efficient", "Long-lasting", "Breathable", "Wireless", "Durable"]
+QUERIES = ["sony headphones", "sneakers", "lamp", "wireless", "dyson", "basketball"]
+
+
+def generate_products(count, seed=42):
+    rng = random.Random(seed)
+    for i in range(count):
+        category = rng.choice(list(CATEGORIES))
+        yield {
+            "title": f"{rng.choice(BRANDS)} {rng.choice(NOUNS)} {i}",
+            "category": category,
+            "subcategory": rng.choice(CATEGORIES[category]),
+            "features": rng.sample(FEATURES, 3),
+            "price_range": rng.choice(["budget", "mid_range", "premium"]),
+        }
+
+
+def seed_catalog(client, count):
+    collection = client[BENCH_DB]["products"]
+    collection.drop()
+    batch = []
+    start = time.perf_counter()
+    for product in generate_products(count):
+        batch.append(product)
+        if len(batch) == BATCH_SIZE:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    collection.create_index([("title", ASCENDING)])
+    collection.create_indexes([text_index_model("products")])
+    return time.perf_counter() - start
+
+
+def docs_examined(collection, query, **kwargs):
+    cursor = collection.find(query, **kwargs)
+    stats = cursor.explain().get("executionStats", {})
+    return stats.get("totalDocsExamined")
+
+
+async def time_async(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+async def run(args):
+    sync_client = MongoClient(args.mongodb_url)
+    if not args.reuse:
+        seconds = seed_catalog(sync_client, args.products)
+        print(f"Seeded {args.products} products in {seconds:.1f}s")
+
+    async_client = AsyncIOMotorClient(args.mongodb_url)
+    collection = async_client[BENCH_DB]["products"]
+    sync_collection = sync_client[BENCH_DB]["products"]
+
+    report = {"products": sync_collection.estimated_document_count(), "queries": {}}
+    for term in QUERIES:
+        regex_query = {"title": {"$regex": term, "$options": "i"}}
+
+        async def regex_path():
+            await collection.find(regex_query).to_list(length=None)
+
+        async def text_path():
+            await search_collection(collection, term, 1, args.page_size)
+
+        report["queries"][term] = {
+            "regex_ms": await time_async(regex_path, args.repeats),
+            "regex_docs_examined": docs_examined(sync_collection, regex_query),
+            "text_ms": await time_async(text_path, args.repeats),
+            "text_docs_examined": docs_examined(
+                sync_collection, {"$text": {"$search": term}}, limit=args.page_size
+            ),
+        }
+
+    print(json.dumps(report, indent=2))
+    if args.drop:
+        sync_client.drop_database(BENCH_DB)
+    sync_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongodb-url", default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--reuse", action="store_true", help="skip seeding and reuse the existing catalog")
+    parser.add_argument("--drop", action="store_true", help="drop the benchmark database afterwards")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
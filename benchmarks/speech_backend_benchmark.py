@@ -0,0 +1,154 @@
+"""
+Compare speech backends on a fixed local clip set: latency, memory and WER.
+
+The clip directory holds audio or video files, each next to a ``.txt`` file
+with the reference transcript of the same name (``clip01.wav`` + ``clip01.txt``).
+Each backend runs in its own subprocess so RSS figures are not polluted by the
+others.
+
+Usage:
+    python -m benchmarks.speech_backend_benchmark --clips bench_clips
+    python -m benchmarks.speech_backend_benchmark --clips bench_clips --backends torch int8 onnx --threads 2
+
+Prints one row per backend and the full report as JSON.
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MEDIA_SUFFIXES = {".wav", ".flac", ".mp3", ".m4a", ".ogg", ".mp4", ".mov", ".webm"}
+
+
+def rss_mb():
+    """Current resident set size, from /proc on Linux"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        import resource
+        return round(pages * resource.getpagesize() / (1024 * 1024), 1)
+    except (OSError, ImportError):
+        return None
+
+
+def peak_rss_mb():
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def normalize(text):
+    return re.sub(r"[^a-z' ]+", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Word-level Levenshtein distance"""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def find_clips(directory):
+    clips = []
+    for path in sorted(Path(directory).iterdir()):
+        reference = path.with_suffix(".txt")
+        if path.suffix.lower() in MEDIA_SUFFIXES and reference.exists():
+            clips.append((path, reference.read_text().strip()))
+    return clips
+
+
+def run_backend(backend_name, clips_dir, threads, repeats):
+    """Benchmark one backend in this process and return its report row"""
+    from benchmarks.transcription_benchmark import load_audio
+    from speech_backends import create_backend
+    from transcription import SAMPLE_RATE, TranscriptionEngine
+
+    baseline_rss = rss_mb()
+    engine = TranscriptionEngine(backend=create_backend(backend_name, num_threads=threads), num_threads=threads)
+    start = time.perf_counter()
+    engine.load()
+    load_seconds = time.perf_counter() - start
+    loaded_rss = rss_mb()
+
+    errors = words = 0
+    audio_seconds = compute_seconds = 0.0
+    clips = []
+    for path, reference in find_clips(clips_dir):
+        waveform = load_audio(path)
+        engine.transcribe_sync(waveform[:SAMPLE_RATE])  # warm up kernels on a short slice
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            hypothesis = engine.transcribe_sync(waveform)
+            timings.append(time.perf_counter() - start)
+        clip_errors, clip_words = word_errors(reference, hypothesis)
+        duration = len(waveform) / SAMPLE_RATE
+        errors += clip_errors
+        words += clip_words
+        audio_seconds += duration
+        compute_seconds += min(timings)
+        clips.append({
+            "clip": path.name,
+            "audio_s": round(duration, 2),
+            "latency_s": round(min(timings), 3),
+            "wer": round(clip_errors / max(1, clip_words), 4),
+        })
+
+    return {
+        "backend": backend_name,
+        "load_s": round(load_seconds, 2),
+        "rss_baseline_mb": baseline_rss,
+        "rss_loaded_mb": loaded_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "audio_s": round(audio_seconds, 2),
+        "latency_s": round(compute_seconds, 3),
+        "rtf": round(compute_seconds / audio_seconds, 4) if audio_seconds else None,
+        "wer": round(errors / max(1, words), 4),
+        "clips": clips,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", required=True, help="Directory of media files with .txt references")
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.clips, args.threads, args.repeats)))
+        return
+
+    if not find_clips(args.clips):
+        raise SystemExit(f"No clips with reference transcripts found in {args.clips}")
+
+    report = []
+    for backend in args.backends:
+        command = [
+            sys.executable, "-m", "benchmarks.speech_backend_benchmark", "--worker", backend,
+            "--clips", args.clips, "--threads", str(args.threads), "--repeats", str(args.repeats),
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"{backend:<6} failed: {result.stderr.strip().splitlines()[-1:]}")
+            report.append({"backend": backend, "error": result.stderr.strip()[-1000:]})
+            continue
+        row = json.loads(result.stdout.strip().splitlines()[-1])
+        report.append(row)
+        print(f"{backend:<6} load {row['load_s']:6.2f}s  latency {row['latency_s']:8.3f}s  rtf {row['rtf']}  "
+              f"rss {row['rss_loaded_mb']} MB (peak {row['peak_rss_mb']})  wer {row['wer']:.3f}")
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Real-time factor of chunked transcription against audio length.
+
+RTF is wall-clock seconds spent per second of audio (below 1.0 is faster than
+real time). Needs torch and transformers; the speech model is downloaded on
+first run.
+
+Usage:
+    python -m benchmarks.transcription_benchmark
+    python -m benchmarks.transcription_benchmark --audio talk.mp4 --durations 30 120 600 --threads 4
+    python -m benchmarks.transcription_benchmark --single-pass   # also time the old one-shot forward pass
+
+``--audio`` is decoded with the bundled FFmpeg and tiled or cut to each
+duration; without it a synthetic voiced signal is used.
+"""
+import argparse
+import json
+import resource
+import subprocess
+import time
+
+import imageio_ffmpeg
+import numpy as np
+
+from transcription import SAMPLE_RATE, TranscriptionEngine
+
+
+def load_audio(path):
+    command = [
+        imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error",
+        "-i", str(path), "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "f32le", "-",
+    ]
+    return np.frombuffer(subprocess.run(command, check=True, capture_output=True).stdout, dtype="<f4")
+
+
+def synthetic_audio(seconds, seed=0):
+    # Bursts of harmonics with pauses, so VAD has something to trim
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    voiced = sum(np.sin(2 * np.pi * k * pitch * t) / k for k in range(1, 6))
+    envelope = (np.sin(2 * np.pi * 0.25 * t) > -0.3).astype(np.float32)
+    noise = 0.01 * rng.standard_normal(len(t))
+    return (0.3 * voiced * envelope + noise).astype(np.float32)
+
+
+def fit(audio, seconds):
+    target = int(seconds * SAMPLE_RATE)
+    reps = -(-target // len(audio))
+    return np.tile(audio, reps)[:target]
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def single_pass(engine, waveform):
+    """The previous implementation: the whole waveform in one forward pass"""
+    import torch
+    inputs = engine.backend.processor(waveform, sampling_rate=SAMPLE_RATE, return_tensors="pt", padding=True)
+    with torch.no_grad():
+        logits = engine.backend.model(inputs.input_values).logits
+    return engine.backend.processor.batch_decode(torch.argmax(logits, dim=-1))[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=float, nargs="+", default=[10, 30, 60, 180])
+    parser.add_argument("--audio", help="Media file to use instead of synthetic audio")
+    parser.add_argument("--threads", type=int, default=0, help="torch thread count (0 = torch default)")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--window", type=float, default=20.0)
+    parser.add_argument("--overlap", type=float, default=2.0)
+    parser.add_argument("--vad", action="store_true")
+    parser.add_argument("--single-pass", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        raise SystemExit("This benchmark needs torch and transformers installed")
+
+    engine = TranscriptionEngine(
+        window_seconds=args.window, overlap_seconds=args.overlap, batch_size=args.batch_size,
+        vad=args.vad, num_threads=args.threads,
+    )
+    start = time.perf_counter()
+    engine.load()
+    print(f"model loaded in {time.perf_counter() - start:.1f}s, rss {peak_rss_mb()} MB")
+
+    source = load_audio(args.audio) if args.audio else None
+    report = []
+    for seconds in args.durations:
+        waveform = fit(source, seconds) if source is not None else synthetic_audio(seconds)
+        methods = {"chunked": lambda: engine.transcribe_sync(waveform)}
+        if args.single_pass:
+            methods["single_pass"] = lambda: single_pass(engine, waveform)
+
+        for name, fn in methods.items():
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            row = {
+                "audio_s": seconds,
+                "method": name,
+                "seconds": round(elapsed, 3),
+                "rtf": round(elapsed / seconds, 4),
+                "peak_rss_mb": peak_rss_mb(),
+            }
+            report.append(row)
+            print(f"{seconds:>7.0f}s  {name:<12} {elapsed:8.2f}s  rtf {row['rtf']:.3f}  peak rss {row['peak_rss_mb']} MB")
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+"""
+Deterministic synthetic catalog for load and scaling tests.
+
+Generates products, listings, analytics, reviews, videos, video listings and
+video analytics through the app's own models, with skewed distributions:
+Zipf-weighted categories and feature popularity, a heavy-tailed number of
+reviews per product and J-shaped ratings. Every item is derived from
+``(seed, kind, index)`` alone, so each collection streams independently,
+child documents know their parent's _id without a lookup, and the same seed
+always yields the same catalog.
+
+Usage:
+    python catalog_generator.py --products 1000000 --videos 100000 --format mongo
+    python catalog_generator.py --products 50000 --format jsonl --out temp/catalog
+    python catalog_generator.py --products 50000 --format parquet --out temp/catalog   # needs pyarrow
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import struct
+import time
+from pathlib import Path
+from typing import Dict, Iterator, NamedTuple
+
+from bson import ObjectId
+
+from models.analytics import Analytics, SalesPerformance, CustomerBehavior, MarketingMetrics, Demographics
+from models.analyticsVideo import VideoAnalytics, VideoAudience, VideoEngagement, VideoPerformance
+from models.listing import ProductListing
+from models.product import Product
+from models.review import RecentReview
+from models.video import Video
+from models.videoListing import VideoListing, ProductLink
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEED = 42
+CATEGORY_SKEW = 1.1
+FEATURE_SKEW = 1.0
+MEAN_REVIEWS_PER_PRODUCT = 8
+# Spread of the log-normal product popularity that drives review counts and sales
+POPULARITY_SIGMA = 1.2
+DEFAULT_BATCH_SIZE = 5000
+
+# category -> (subcategories, brands, product nouns, feature vocabulary)
+TAXONOMY = {
+    "Electronics": (
+        ["Smartphones", "Wireless Earbuds", "Tablets", "Laptops", "Headphones"],
+        ["Samsung", "Apple", "Sony", "Google", "OnePlus", "Bose", "Lenovo"],
+        ["Phone", "Earbuds", "Tablet", "Laptop", "Headphones", "Speaker"],
+        ["Fast Charging", "Noise Cancelling", "5G Connectivity", "AMOLED Display", "Wireless Charging",
+         "Long Battery Life", "Water Resistant", "AI-Enhanced Camera", "Bluetooth 5.3", "USB-C"],
+    ),
+    "Fashion": (
+        ["Sneakers", "Clothing", "Bags", "Accessories"],
+        ["Nike", "Adidas", "Zara", "Levi's", "Puma", "H&M"],
+        ["Sneakers", "Jacket", "Hoodie", "Backpack", "Jeans", "Cap"],
+        ["Breathable", "Lightweight", "Water Resistant", "Recycled Materials", "Slim Fit",
+         "Cushioned Sole", "Machine Washable", "Adjustable Straps"],
+    ),
+    "Home Decor": (
+        ["Lighting", "Rugs", "Mirrors", "Furniture"],
+        ["IKEA", "Philips", "West Elm", "Dyson", "Muji"],
+        ["Lamp", "Rug", "Mirror", "Shelf", "Armchair"],
+        ["Energy Efficient", "Handcrafted", "Dimmable", "Natural Wood", "Easy Assembly", "Stain Resistant"],
+    ),
+    "Beauty": (
+        ["Makeup", "Skincare", "Fragrance"],
+        ["MAC", "L'Oreal", "Clinique", "Fenty", "The Ordinary"],
+        ["Lipstick", "Foundation", "Serum", "Moisturizer", "Mascara"],
+        ["Long-lasting", "Cruelty Free", "Fragrance Free", "Vegan", "SPF 30", "Hydrating", "Matte Finish"],
+    ),
+    "Sports": (
+        ["Basketball", "Tennis", "Fitness", "Cycling"],
+        ["Wilson", "Spalding", "Head", "Garmin", "Fitbit"],
+        ["Basketball", "Racket", "Smartwatch", "Fitness Band", "Helmet"],
+        ["Superior Grip", "Moisture-Wicking", "Heart Rate Monitor", "GPS", "Durable", "Shock Absorbing"],
+    ),
+    "Wearables": (
+        ["Smartwatches", "Fitness Bands"],
+        ["Apple", "Samsung", "Garmin", "Fitbit", "Xiaomi"],
+        ["Watch", "Band", "Ring"],
+        ["Heart Rate Monitor", "Sleep Tracking", "GPS", "Water Resistant", "Always-on Display", "ECG"],
+    ),
+}
+PRICE_TIERS = ["budget", "mid_range", "premium"]
+TIER_PRICES = {"budget": (10, 60), "mid_range": (60, 300), "premium": (300, 1500)}
+PLATFORMS = ["YouTube", "TikTok", "Instagram"]
+VIDEO_FORMATS = ["Review", "Unboxing", "Hands-on", "Long-term Test"]
+STORES = ["Amazon", "Best Buy", "Walmart", "Target", "eBay"]
+REGIONS = ["USA", "UK", "Germany", "India", "Canada", "Australia", "South Korea", "Brazil"]
+AGE_GROUPS = ["18-24", "25-34", "35-44", "45+"]
+# J-shaped rating distribution typical of product reviews
+RATING_WEIGHTS = {5.0: 0.45, 4.0: 0.28, 3.0: 0.1, 2.0: 0.06, 1.0: 0.11}
+REVIEW_TITLES = {5.0: "Absolutely love it", 4.0: "Very good", 3.0: "Decent for the price",
+                 2.0: "Disappointing", 1.0: "Would not buy again"}
+
+# Kind codes embedded in generated ObjectIds
+PRODUCT, LISTING, ANALYTICS, REVIEW, VIDEO, VIDEO_LISTING, VIDEO_ANALYTICS = range(1, 8)
+
+
+def zipf_weights(count: int, skew: float):
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def object_id(seed: int, kind: int, index: int) -> ObjectId:
+    """A stable ObjectId for item ``index`` of ``kind`` in the catalog for ``seed``"""
+    return ObjectId(struct.pack(">IB", seed & 0xFFFFFFFF, kind) + index.to_bytes(7, "big"))
+
+
+def percent(value: float) -> str:
+    return f"{value:.1f}%"
+
+
+def compact(value: float) -> str:
+    for unit, size in (("B", 1e9), ("M", 1e6), ("K", 1e3)):
+        if value >= size:
+            return f"{value / size:.1f}{unit}"
+    return str(int(value))
+
+
+class ProductProfile(NamedTuple):
+    category: str
+    subcategory: str
+    brand: str
+    title: str
+    features: list
+    tier: str
+    price: float
+    popularity: float
+    reviews: int
+    listings: int
+
+
+class VideoProfile(NamedTuple):
+    product: ProductProfile
+    title: str
+    minutes: int
+    seconds: int
+
+
+class CatalogGenerator:
+    """
+    Streams a synthetic catalog as model-validated documents with their _id set.
+
+    ``products`` and ``videos`` set the catalog size; the number of listings
+    (1-3 per product) and reviews (heavy-tailed, mean ``mean_reviews``) follow
+    from them. Video listings and analytics are one per video.
+    """
+
+    def __init__(self, products: int = 1000, videos: int = 100, seed: int = DEFAULT_SEED,
+                 category_skew: float = CATEGORY_SKEW, feature_skew: float = FEATURE_SKEW,
+                 mean_reviews: float = MEAN_REVIEWS_PER_PRODUCT):
+        self.products = products
+        self.videos = videos
+        self.seed = seed
+        self.mean_reviews = mean_reviews
+        self.categories = list(TAXONOMY)
+        self.category_weights = zipf_weights(len(self.categories), category_skew)
+        self.feature_weights = {
+            category: zipf_weights(len(features), feature_skew)
+            for category, (_, _, _, features) in TAXONOMY.items()
+        }
+
+    def _rng(self, kind: int, index: int) -> random.Random:
+        return random.Random(f"{self.seed}:{kind}:{index}")
+
+    def profile(self, index: int) -> ProductProfile:
+        """Everything about product ``index`` that its child documents depend on"""
+        rng = self._rng(PRODUCT, index)
+        category = rng.choices(self.categories, self.category_weights)[0]
+        subcategories, brands, nouns, vocabulary = TAXONOMY[category]
+        weights = self.feature_weights[category]
+        features = []
+        feature_count = min(rng.randint(3, 5), len(vocabulary))
+        while len(features) < feature_count:
+            feature = rng.choices(vocabulary, weights)[0]
+            if feature not in features:
+                features.append(feature)
+        tier = rng.choices(PRICE_TIERS, (0.35, 0.45, 0.2))[0]
+        # Popularity is log-normal with mean 1; review counts scale with it and so get a long tail
+        popularity = rng.lognormvariate(0, POPULARITY_SIGMA) / math.exp(POPULARITY_SIGMA ** 2 / 2)
+        reviews = int(self.mean_reviews * popularity)
+        brand = rng.choice(brands)
+        return ProductProfile(
+            category=category,
+            subcategory=rng.choice(subcategories),
+            brand=brand,
+            title=f"{brand} {rng.choice(nouns)} {index}",
+            features=features,
+            tier=tier,
+            price=round(rng.uniform(*TIER_PRICES[tier]), 2),
+            popularity=popularity,
+            reviews=reviews,
+            listings=min(3, 1 + int(rng.expovariate(1.5))),
+        )
+
+    def product_id(self, index: int) -> str:
+        return str(object_id(self.seed, PRODUCT, index))
+
+    def product_docs(self) -> Iterator[Dict]:
+        for i in range(self.products):
+            profile = self.profile(i)
+            yield {"_id": object_id(self.seed, PRODUCT, i), **Product(
+                title=profile.title,
+                category=profile.category,
+                subcategory=profile.subcategory,
+                features=profile.features,
+                price_range=profile.tier,
+            ).model_dump()}
+
+    def listing_docs(self) -> Iterator[Dict]:
+        count = 0
+        for i in range(self.products):
+            profile = self.profile(i)
+            rng = self._rng(LISTING, i)
+            for store in rng.sample(STORES, profile.listings):
+                yield {"_id": object_id(self.seed, LISTING, count), **ProductListing(
+                    product_id=self.product_id(i),
+                    title=profile.title,
+                    price=f"${profile.price * rng.uniform(0.9, 1.1):.2f}",
+                    description=f"{profile.title} from {profile.brand}, sold by {store}. "
+                                f"{', '.join(profile.features)}.",
+                    features=profile.features,
+                ).model_dump()}
+                count += 1
+
+    def analytics_docs(self) -> Iterator[Dict]:
+        for i in range(self.products):
+            profile = self.profile(i)
+            rng = self._rng(ANALYTICS, i)
+            units = max(1, int(profile.popularity * rng.uniform(200, 2000)))
+            shares = [rng.random() for _ in AGE_GROUPS]
+            yield {"_id": object_id(self.seed, ANALYTICS, i), **Analytics(
+                product_id=self.product_id(i),
+                sales_performance=SalesPerformance(
+                    total_sales=str(units),
+                    revenue=f"${compact(units * profile.price)}",
+                    average_price=f"${profile.price:.2f}",
+                    growth_rate=percent(rng.gauss(8, 10)),
+                ),
+                customer_behavior=CustomerBehavior(
+                    view_to_purchase_rate=f"{rng.randint(10, 60)}:1",
+                    cart_abandonment_rate=percent(rng.uniform(15, 75)),
+                    repeat_purchase_rate=percent(rng.uniform(2, 40)),
+                    average_rating=round(rng.uniform(3.2, 4.9), 1),
+                ),
+                demographics=Demographics(
+                    age_groups={group: percent(100 * share / sum(shares)) for group, share in zip(AGE_GROUPS, shares)},
+                    top_locations=rng.sample(REGIONS, 3),
+                ),
+                marketing_metrics=MarketingMetrics(
+                    click_through_rate=percent(rng.uniform(0.3, 5)),
+                    conversion_rate=percent(rng.uniform(0.5, 8)),
+                    return_on_ad_spend=f"{rng.uniform(0.8, 6):.1f}",
+                    social_media_engagement=rng.choice(["Low", "Medium", "High"]),
+                ),
+            ).model_dump()}
+
+    def review_docs(self) -> Iterator[Dict]:
+        count = 0
+        ratings, weights = list(RATING_WEIGHTS), list(RATING_WEIGHTS.values())
+        for i in range(self.products):
+            profile = self.profile(i)
+            rng = self._rng(REVIEW, i)
+            for _ in range(profile.reviews):
+                rating = rng.choices(ratings, weights)[0]
+                feature = rng.choice(profile.features)
+                yield {"_id": object_id(self.seed, REVIEW, count), **RecentReview(
+                    product_id=self.product_id(i),
+                    # A small set of prolific reviewers and a long tail of one-off ones
+                    user_id=f"user_{int(rng.paretovariate(1.2) * 100)}",
+                    rating=rating,
+                    title=REVIEW_TITLES[rating],
+                    comment=f"The {feature.lower()} of this {profile.subcategory.lower()} is "
+                            f"{'great' if rating >= 4 else 'not what I expected'}.",
+                    verified_purchase=rng.random() < 0.8,
+                ).model_dump()}
+                count += 1
+
+    def video_profile(self, index: int) -> VideoProfile:
+        """The product video ``index`` is about, and what its listing shares with it"""
+        rng = self._rng(VIDEO, index)
+        product = self.profile(rng.randrange(self.products))
+        return VideoProfile(
+            product=product,
+            title=f"{product.title} {rng.choice(VIDEO_FORMATS)}",
+            minutes=rng.randint(1, 25),
+            seconds=rng.randint(0, 59),
+        )
+
+    def video_docs(self) -> Iterator[Dict]:
+        for i in range(self.videos):
+            video = self.video_profile(i)
+            profile = video.product
+            rng = self._rng(VIDEO, i)
+            yield {"_id": object_id(self.seed, VIDEO, i), **Video(
+                title=video.title,
+                category=profile.category,
+                subcategory=profile.subcategory,
+                duration=f"{video.minutes}:{video.seconds:02d}",
+                views=compact(rng.lognormvariate(10, 2)),
+                highlights=[f"{feature} demo" for feature in profile.features[:3]],
+                transcript_summary=f"A look at the {profile.title}: {', '.join(profile.features).lower()}.",
+                key_features=profile.features,
+                price_range=f"${profile.price:.0f} - ${profile.price * 1.2:.0f}",
+            ).model_dump()}
+
+    def video_listing_docs(self) -> Iterator[Dict]:
+        for i in range(self.videos):
+            video = self.video_profile(i)
+            profile = video.product
+            listing_rng = self._rng(VIDEO_LISTING, i)
+            marks = sorted(listing_rng.sample(range(video.minutes * 60), 3))
+            yield {"_id": object_id(self.seed, VIDEO_LISTING, i), **VideoListing(
+                video_id=str(object_id(self.seed, VIDEO, i)),
+                platform=listing_rng.choice(PLATFORMS),
+                title=video.title,
+                views=compact(listing_rng.lognormvariate(10, 2)),
+                rating=round(listing_rng.uniform(3.5, 5.0), 1),
+                key_timestamps={f"{mark // 60:02d}:{mark % 60:02d}": feature
+                                for mark, feature in zip(marks, profile.features)},
+                product_links=[
+                    ProductLink(store=store, price=f"${profile.price * listing_rng.uniform(0.9, 1.1):.2f}")
+                    for store in listing_rng.sample(STORES, 2)
+                ],
+            ).model_dump()}
+
+    def video_analytics_docs(self) -> Iterator[Dict]:
+        for i in range(self.videos):
+            rng = self._rng(VIDEO_ANALYTICS, i)
+            views = rng.lognormvariate(10, 2)
+            shares = [rng.random() for _ in AGE_GROUPS]
+            yield {"_id": object_id(self.seed, VIDEO_ANALYTICS, i), **VideoAnalytics(
+                video_id=str(object_id(self.seed, VIDEO, i)),
+                engagement=VideoEngagement(
+                    views=compact(views),
+                    likes=compact(views * rng.uniform(0.01, 0.08)),
+                    comments=compact(views * rng.uniform(0.001, 0.005)),
+                    average_watch_time=f"{rng.randint(0, 12)}:{rng.randint(0, 59):02d}",
+                ),
+                audience=VideoAudience(
+                    demographics={group: percent(100 * share / sum(shares)) for group, share in zip(AGE_GROUPS, shares)},
+                    top_regions=rng.sample(REGIONS, 4),
+                ),
+                performance=VideoPerformance(
+                    retention_rate=percent(rng.uniform(20, 80)),
+                    click_through_rate=percent(rng.uniform(1, 10)),
+                    conversion_rate=percent(rng.uniform(0.5, 5)),
+                ),
+            ).model_dump()}
+
+    def streams(self) -> Dict[str, Iterator[Dict]]:
+        """One lazy document stream per collection, parents first"""
+        return {
+            "products": self.product_docs(),
+            "videos": self.video_docs(),
+            "listings": self.listing_docs(),
+            "analytics": self.analytics_docs(),
+            "reviews": self.review_docs(),
+            "video_listings": self.video_listing_docs(),
+            "video_analytics": self.video_analytics_docs(),
+        }
+
+
+def write_mongo(db, generator: CatalogGenerator, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """Replace the catalog collections in ``db`` with the generated catalog and index them per the plan"""
+    from database_setup import insert_stream
+    from index_planner import apply_plan
+
+    streams = generator.streams()
+    for name in streams:
+        db[name].drop()
+    apply_plan(db)
+    return {name: insert_stream(db[name], documents, batch_size=batch_size)[0] for name, documents in streams.items()}
+
+
+def _json_default(value):
+    return str(value)
+
+
+def write_jsonl(directory, generator: CatalogGenerator) -> Dict[str, int]:
+    """One ``<collection>.jsonl`` file per collection, ObjectIds as strings"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    for name, documents in generator.streams().items():
+        count = 0
+        with open(directory / f"{name}.jsonl", "w", encoding="utf-8") as f:
+            for document in documents:
+                f.write(json.dumps(document, default=_json_default) + "\n")
+                count += 1
+        counts[name] = count
+        logger.info(f"{name}: wrote {count} documents to {directory / f'{name}.jsonl'}")
+    return counts
+
+
+# Mappings whose keys differ per document cannot share a Parquet struct type
+PARQUET_JSON_FIELDS = {"key_timestamps"}
+
+
+def write_parquet(directory, generator: CatalogGenerator, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """One ``<collection>.parquet`` file per collection, written in row groups of ``batch_size``"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet output requires pyarrow. Install it with: pip install pyarrow")
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    counts = {}
+    for name, documents in generator.streams().items():
+        writer = None
+        count = 0
+        batch = []
+        try:
+            for document in documents:
+                row = {key: json.dumps(value) if key in PARQUET_JSON_FIELDS else value for key, value in document.items()}
+                row["_id"] = str(row["_id"])
+                batch.append(row)
+                if len(batch) == batch_size:
+                    writer = _write_row_group(pa, pq, writer, directory / f"{name}.parquet", batch)
+                    count += len(batch)
+                    batch = []
+            if batch or writer is None:
+                writer = _write_row_group(pa, pq, writer, directory / f"{name}.parquet", batch)
+                count += len(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        counts[name] = count
+        logger.info(f"{name}: wrote {count} documents to {directory / f'{name}.parquet'}")
+    return counts
+
+
+def _write_row_group(pa, pq, writer, path, rows):
+    schema = writer.schema if writer is not None else None
+    table = pa.Table.from_pylist(rows, schema=schema)
+    if writer is None:
+        writer = pq.ParquetWriter(path, table.schema)
+    writer.write_table(table)
+    return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--videos", type=int, default=1_000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--mean-reviews", type=float, default=MEAN_REVIEWS_PER_PRODUCT)
+    parser.add_argument("--category-skew", type=float, default=CATEGORY_SKEW, help="Zipf exponent over categories")
+    parser.add_argument("--format", choices=["mongo", "jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--out", default="temp/catalog", help="Output directory for jsonl/parquet")
+    parser.add_argument("--db", default="sociosell_synthetic", help="Database for --format mongo")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    generator = CatalogGenerator(products=args.products, videos=args.videos, seed=args.seed,
+                                 category_skew=args.category_skew, mean_reviews=args.mean_reviews)
+    start = time.perf_counter()
+    if args.format == "mongo":
+        from database_setup import connect_to_mongodb
+        client = connect_to_mongodb()
+        try:
+            counts = write_mongo(client[args.db], generator, args.batch_size)
+        finally:
+            client.close()
+    elif args.format == "parquet":
+        counts = write_parquet(args.out, generator, args.batch_size)
+    else:
+        counts = write_jsonl(args.out, generator)
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(json.dumps({"documents": counts, "seconds": round(elapsed, 1),
+                      "documents_per_second": round(total / elapsed) if elapsed else None}, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,37 @@
+import pytest
+from PIL import Image
+
+from image_processor import ImageProcessor
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModelClient:
+    """Answers every call with ``text``, or with ``single_text`` for calls carrying one image"""
+
+    def __init__(self, text, single_text=None):
+        self.text = text
+        self.single_text = single_text
+        self.calls = []
+        self.kwargs = []
+
+    async def generate_content(self, contents, **kwargs):
+        images = [part for part in contents if isinstance(part, (Image.Image, dict))]
+        self.calls.append(len(images))
+        self.kwargs.append(kwargs)
+        if self.single_text is not None and len(images) <= 1:
+            return FakeResponse(self.single_text)
+        return FakeResponse(self.text)
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    monkeypatch.setenv("GOOGLE_API_KEY", "test_key")
+    return ImageProcessor()
+
+
+def images(count, size=32):
+    return [Image.new("RGB", (size, size), (i * 40, 0, 0)) for i in range(count)]
@@ -1,9 +1,11 @@
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from pymongo.server_api import ServerApi
+import argparse
 import logging
 import os
 import time
+from itertools import islice
 from models.listing import ProductListing
 from models.analytics import Analytics, SalesPerformance, CustomerBehavior, MarketingMetrics, Demographics
 from models.review import RecentReview
@@ -20,6 +22,7 @@ from video_data import(
     video_listings,
     video_analytics,
 )
+from index_planner import apply_plan
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -36,6 +39,10 @@ TIMEOUT_CONFIG = {
     "socketTimeoutMS": 10000
 }
 
+# Documents per unordered insert_many when seeding
+SEED_BATCH_SIZE = int(os.getenv("SEED_BATCH_SIZE", "5000"))
+SEED_COLLECTIONS = ["products", "listings", "analytics", "reviews", "videos", "video_listings", "video_analytics"]
+
 def exponential_backoff(attempt):
     """Calculate exponential backoff delay."""
     return min(INITIAL_RETRY_DELAY * (2 ** attempt), MAX_RETRY_DELAY)
@@ -68,279 +75,152 @@ def connect_to_mongodb():
             logger.error(f"Unexpected error while connecting to MongoDB: {e}")
             raise
 
-def setup_product_database():
-    """Setup product reference database with sample data"""
-    client = None
-    try:
-        client = connect_to_mongodb()
-        db = client.social_media_products
-        
-        # Create Collections
-        product_collection = db["products"]
-        listing_collection = db["listings"]
-        analytics_collection = db["analytics"]
-        review_collection = db["reviews"]
-        video_collection = db["videos"]
-        video_listings_collection = db["video_listings"]
-        video_analytics_collection = db["video_analytics"]
-
-        # Delete indexes
-        product_collection.drop_indexes()
-        listing_collection.drop_indexes()
-        analytics_collection.drop_indexes()
-        review_collection.drop_indexes()
-        video_collection.drop_indexes()
-        video_listings_collection.drop_indexes()
-        video_analytics_collection.drop_indexes()
-        
-        # Create indexes for products
-        product_collection.create_index([("id", ASCENDING)])
-        product_collection.create_index([("title", ASCENDING)])
-        product_collection.create_index([("category", ASCENDING)])
-        product_collection.create_index([("subcategory", ASCENDING)])
-        product_collection.create_index([("features", ASCENDING)])
-        product_collection.create_index([("price_range", ASCENDING)])
-        product_collection.create_index([("created_at", ASCENDING)])
-        product_collection.create_index([("updated_at", ASCENDING)])
-
-        # Create indexes for listings
-        listing_collection.create_index([("id", ASCENDING), ("product_id", ASCENDING)])
-        listing_collection.create_index([("product_id", ASCENDING), ("created_at", ASCENDING)])
-        listing_collection.create_index([("price", ASCENDING), ("updated_at", ASCENDING)])
-        listing_collection.create_index([("features", ASCENDING), ("title", ASCENDING)])
-        listing_collection.create_index([("id", ASCENDING)])
-        listing_collection.create_index([("title", ASCENDING)])
-        listing_collection.create_index([("price", ASCENDING)])
-        listing_collection.create_index([("features", ASCENDING)], name="features_index")
-
-        # Create indexes for analytics
-        analytics_collection.create_index([("id", ASCENDING), ("product_id", ASCENDING)])
-        analytics_collection.create_index([("product_id", ASCENDING), ("created_at", ASCENDING)])
-        analytics_collection.create_index([("id", ASCENDING)])
-        analytics_collection.create_index([("product_id", ASCENDING)], unique=True)          
-        analytics_collection.create_index([("created_at", ASCENDING)])          
-        analytics_collection.create_index([("updated_at", ASCENDING)])         
-        analytics_collection.create_index([("sales_performance.total_sales", ASCENDING)])     
-        analytics_collection.create_index([("sales_performance.revenue", ASCENDING)])          
-        analytics_collection.create_index([("sales_performance.average_price", ASCENDING)])    
-        analytics_collection.create_index([("customer_behavior.view_to_purchase_rate", ASCENDING)])  
-        analytics_collection.create_index([("customer_behavior.repeat_purchase_rate", ASCENDING)])   
-        analytics_collection.create_index([("customer_behavior.average_rating", ASCENDING)])         
-        analytics_collection.create_index([("marketing_metrics.click_through_rate", ASCENDING)])    
-        analytics_collection.create_index([("marketing_metrics.social_media_engagement", ASCENDING)])
-
-        # Create indexes for review
-        review_collection.create_index([("product_id", ASCENDING), ("rating", ASCENDING)])
-        review_collection.create_index([("user_id", ASCENDING), ("product_id", ASCENDING)])
-        review_collection.create_index([("id", ASCENDING)])      
-        review_collection.create_index([("product_id", ASCENDING)])      
-        review_collection.create_index([("user_id", ASCENDING)])         
-        review_collection.create_index([("rating", ASCENDING)])          
-        review_collection.create_index([("title", ASCENDING)])           
-        review_collection.create_index([("verified_purchase", ASCENDING)])  
-        review_collection.create_index([("created_at", ASCENDING)])   
-        review_collection.create_index([("updated_at", ASCENDING)])
-
-        # Create indexes for video
-        video_collection.create_index([("title", ASCENDING), ("views", ASCENDING)])
-        video_collection.create_index([("views", ASCENDING), ("rating", ASCENDING)])
-        video_collection.create_index([("id", ASCENDING)])               
-        video_collection.create_index([("title", ASCENDING)])                 
-        video_collection.create_index([("category", ASCENDING)])              
-        video_collection.create_index([("subcategory", ASCENDING)])           
-        video_collection.create_index([("duration", ASCENDING)])              
-        video_collection.create_index([("views", ASCENDING)])                 
-        video_collection.create_index([("transcript_summary", "text")])       
-        video_collection.create_index([("price_range", ASCENDING)])           
-        video_collection.create_index([("created_at", ASCENDING)])            
-        video_collection.create_index([("updated_at", ASCENDING)])           
-        video_collection.create_index([("key_features", ASCENDING)])
-        video_collection.create_index([("highlights", ASCENDING)])
-
-        # Create indexes for video listing
-        video_listings_collection.create_index([("video_id", ASCENDING), ("id", ASCENDING)])
-        video_listings_collection.create_index([("id", ASCENDING)])                  
-        video_listings_collection.create_index([("video_id", ASCENDING)], unique=True)                  
-        video_listings_collection.create_index([("platform", ASCENDING)])                    
-        video_listings_collection.create_index([("title", ASCENDING)])                       
-        video_listings_collection.create_index([("views", ASCENDING)])                       
-        video_listings_collection.create_index([("rating", ASCENDING)])                      
-        video_listings_collection.create_index([("created_at", ASCENDING)])                  
-        video_listings_collection.create_index([("updated_at", ASCENDING)])                  
-        video_listings_collection.create_index([("product_links.price", ASCENDING)])
-
-        # Create indexes for video analytics
-        video_analytics_collection.create_index([("id", ASCENDING), ("video_id", ASCENDING)])
-        video_analytics_collection.create_index([("id", ASCENDING), ("video_id", ASCENDING)])
-        video_analytics_collection.create_index([("engagement.views", ASCENDING), ("engagement.likes", ASCENDING)])
-        video_analytics_collection.create_index([("performance.retention_rate", ASCENDING), ("performance.click_through_rate", ASCENDING)])
-        video_analytics_collection.create_index([("id", ASCENDING)])                
-        video_analytics_collection.create_index([("video_id", ASCENDING)], unique=True)                
-        video_analytics_collection.create_index([("created_at", ASCENDING)])                
-        video_analytics_collection.create_index([("updated_at", ASCENDING)])                
-        video_analytics_collection.create_index([("engagement.views", ASCENDING)])          
-        video_analytics_collection.create_index([("engagement.likes", ASCENDING)])          
-        video_analytics_collection.create_index([("engagement.comments", ASCENDING)])       
-        video_analytics_collection.create_index([("engagement.average_watch_time", ASCENDING)])  
-        video_analytics_collection.create_index([("audience.demographics", ASCENDING)])    
-        video_analytics_collection.create_index([("audience.top_regions", ASCENDING)])     
-        video_analytics_collection.create_index([("performance.retention_rate", ASCENDING)])  
-        video_analytics_collection.create_index([("performance.click_through_rate", ASCENDING)])
-
-        logger.info("All indexes created successfully")
-
-        # Clear Existing Products
-        product_collection.delete_many({})
-        # Insert Sample Products
-        product_collection.insert_many([product.model_dump() for product in sample_products])
-        logger.info("sample_products inserted")
-
-        # Clear Existing Product Listings
-        listing_collection.delete_many({})
-
-        # Generate sample_product_listings
-        sample_product_listings = []
+def replica_title(title, copy):
+    """Title of a sample document in copy ``copy`` of the catalog; copy 0 keeps the original"""
+    return title if copy == 0 else f"{title} #{copy}"
+
+def insert_stream(collection, documents, key=None, batch_size=SEED_BATCH_SIZE):
+    """
+    Insert a stream of documents with unordered insert_many batches.
+
+    Returns the number inserted and, when ``key`` is given, a map from each
+    document's ``key`` to its new _id taken from the insert results, so child
+    documents can reference it without querying the parent back.
+    """
+    documents = iter(documents)
+    ids = {}
+    inserted = 0
+    start = time.perf_counter()
+    for batch in iter(lambda: list(islice(documents, batch_size)), []):
+        result = collection.insert_many(batch, ordered=False)
+        if key is not None:
+            ids.update(zip((document[key] for document in batch), result.inserted_ids))
+        inserted += len(result.inserted_ids)
+    elapsed = time.perf_counter() - start
+    logger.info(f"{collection.name}: inserted {inserted} documents in {elapsed:.1f}s")
+    return inserted, ids
+
+def generate_products(scale):
+    for copy in range(scale):
+        for product in sample_products:
+            yield product.model_copy(update={"title": replica_title(product.title, copy)}).model_dump()
+
+def generate_product_listings(product_ids, scale):
+    for copy in range(scale):
         for listing in product_listings:
-            # Fetch the _id of the product from the database
-            result = product_collection.find_one({"title": listing["title"]}, {"_id": 1})
-            
-            if result:
-                sample_product_listings.append(
-                    ProductListing(
-                        product_id=str(result["_id"]),
-                        title=listing["title"],
-                        price=listing["price"],
-                        description=listing["description"],
-                        features=listing["features"]
-                    )
-                )
-        
-        # Insert sample_product_listings 
-        listing_collection.insert_many([listing.model_dump() for listing in sample_product_listings])
-        logger.info("sample_product_listings inserted")
-
-        # Clear Existing Analytics
-        analytics_collection.delete_many({})
-
-        # Generate sample_product_analytics
-        sample_product_analytics = [] 
-        for analytic in product_analytics:  
-            # Fetch the _id of the product from the database
-            result = product_collection.find_one({"title": analytic["title"]}, {"_id": 1})
-            
-            if result:
-                sample_product_analytics.append(
-                    Analytics(
-                        product_id=str(result["_id"]),
-                        sales_performance=SalesPerformance(
-                            total_sales=analytic["sales_performance"]["total_sales"],
-                            revenue=analytic["sales_performance"]["revenue"],
-                            average_price=analytic["sales_performance"]["average_price"],
-                            growth_rate=analytic["sales_performance"]["growth_rate"]
-                        ),
-                        customer_behavior=CustomerBehavior(
-                            view_to_purchase_rate=analytic["customer_behavior"]["view_to_purchase_rate"],
-                            cart_abandonment_rate=analytic["customer_behavior"]["cart_abandonment_rate"],
-                            repeat_purchase_rate=analytic["customer_behavior"]["repeat_purchase_rate"],
-                            average_rating=analytic["customer_behavior"]["average_rating"]
-                        ),
-                        demographics=Demographics(
-                            age_groups=analytic["demographics"]["age_groups"],
-                            top_locations=analytic["demographics"]["top_locations"]
-                        ),
-                        marketing_metrics=MarketingMetrics(
-                            click_through_rate=analytic["marketing_metrics"]["click_through_rate"],
-                            conversion_rate=analytic["marketing_metrics"]["conversion_rate"],
-                            return_on_ad_spend=analytic["marketing_metrics"]["return_on_ad_spend"],
-                            social_media_engagement=analytic["marketing_metrics"]["social_media_engagement"]
-                        )
-                    )
-                )
-        
-        # Insert sample_product_analytics
-        analytics_collection.insert_many([analytic.model_dump() for analytic in sample_product_analytics])
-        logger.info("sample_product_analytics inserted")
-
-        # Clear Existing Reviews
-        review_collection.delete_many({})
-
-        # Generate sample_reviews
-        sample_reviews = []
-        for review in product_reviews: 
-            # Fetch the _id of the product from the database
-            result = product_collection.find_one({"title": review["product_title"]}, {"_id": 1})
-            if result:
-                sample_reviews.append(
-                    RecentReview(
-                        product_id=str(result["_id"]),
-                        user_id=review["user_id"],
-                        rating=review["rating"],
-                        title=review["title"],
-                        comment=review["comment"],
-                        verified_purchase=review["verified_purchase"]
-                    )
-                )
-        # Insert sample_reviews
-        review_collection.insert_many([review.model_dump() for review in sample_reviews])
-        logger.info("sample_reviews inserted")
-
-        # Clear Existing Videos
-        video_collection.delete_many({})
-        # Insert sample_videos
-        video_collection.insert_many([video.model_dump() for video in sample_videos])
-        logger.info("sample_videos inserted")        
-
-        # Clear Existing video_listings
-        video_listings_collection.delete_many({})
-
-        # Generate sample_video_listings
-        sample_video_listings = []
+            title = replica_title(listing["title"], copy)
+            if title in product_ids:
+                yield ProductListing(
+                    product_id=str(product_ids[title]),
+                    title=title,
+                    price=listing["price"],
+                    description=listing["description"],
+                    features=listing["features"]
+                ).model_dump()
+
+def generate_product_analytics(product_ids, scale):
+    for copy in range(scale):
+        for analytic in product_analytics:
+            title = replica_title(analytic["title"], copy)
+            if title in product_ids:
+                yield Analytics(
+                    product_id=str(product_ids[title]),
+                    sales_performance=SalesPerformance(**analytic["sales_performance"]),
+                    customer_behavior=CustomerBehavior(**analytic["customer_behavior"]),
+                    demographics=Demographics(**analytic["demographics"]),
+                    marketing_metrics=MarketingMetrics(**analytic["marketing_metrics"])
+                ).model_dump()
+
+def generate_reviews(product_ids, scale):
+    for copy in range(scale):
+        for review in product_reviews:
+            title = replica_title(review["product_title"], copy)
+            if title in product_ids:
+                yield RecentReview(
+                    product_id=str(product_ids[title]),
+                    user_id=review["user_id"],
+                    rating=review["rating"],
+                    title=review["title"],
+                    comment=review["comment"],
+                    verified_purchase=review["verified_purchase"]
+                ).model_dump()
+
+def generate_videos(scale):
+    for copy in range(scale):
+        for video in sample_videos:
+            yield video.model_copy(update={"title": replica_title(video.title, copy)}).model_dump()
+
+def generate_video_listings(video_ids, scale):
+    for copy in range(scale):
         for video_listing in video_listings:
-            # Fetch the _id of the video from the database
-            result = video_collection.find_one({"title": video_listing["title"]}, {"_id": 1})
-            if result:
-                sample_video_listings.append(
-                    VideoListing(
-                        video_id=str(result["_id"]),
-                        platform=video_listing["platform"],
-                        title=video_listing["title"],
-                        views=video_listing["views"],
-                        rating=video_listing["rating"],
-                        key_timestamps={
-                            "00:00": "Introduction",
-                            "02:00": "Main features",
-                            "04:00": "Conclusion"
-                        },
-                        product_links=[
-                            ProductLink(store="Amazon", price="$199"),
-                            ProductLink(store="Best Buy", price="$205"),
-                        ]
-                    )
-                )
-        # Insert sample_video_listings
-        video_listings_collection.insert_many([video_listing.model_dump() for video_listing in sample_video_listings])
-        logger.info("sample_video_listings inserted")
-
-        # Clear Existing video_analytics
-        video_analytics_collection.delete_many({}) 
-
-        # Generate sample_video_analytics
-        sample_video_analytics = []
+            title = replica_title(video_listing["title"], copy)
+            if title in video_ids:
+                yield VideoListing(
+                    video_id=str(video_ids[title]),
+                    platform=video_listing["platform"],
+                    title=title,
+                    views=video_listing["views"],
+                    rating=video_listing["rating"],
+                    key_timestamps={
+                        "00:00": "Introduction",
+                        "02:00": "Main features",
+                        "04:00": "Conclusion"
+                    },
+                    product_links=[
+                        ProductLink(store="Amazon", price="$199"),
+                        ProductLink(store="Best Buy", price="$205"),
+                    ]
+                ).model_dump()
+
+def generate_video_analytics(video_ids, scale):
+    for copy in range(scale):
         for video_analytic in video_analytics:
-            # Fetch the _id of the video from the database
-            result = video_collection.find_one({"title": video_analytic["title"]}, {"_id": 1})
-            if result:
-                analytics = VideoAnalytics(
-                    video_id=str(result["_id"]),
+            title = replica_title(video_analytic["title"], copy)
+            if title in video_ids:
+                yield VideoAnalytics(
+                    video_id=str(video_ids[title]),
                     engagement=VideoEngagement(**video_analytic["engagement"]),
                     audience=VideoAudience(**video_analytic["audience"]),
                     performance=VideoPerformance(**video_analytic["performance"])
-                )
-                sample_video_analytics.append(analytics)
+                ).model_dump()
+
+def setup_product_database(scale=1, batch_size=SEED_BATCH_SIZE, db_name="social_media_products"):
+    """
+    Setup product reference database with sample data.
 
-        # Insert sample_video_analytics
-        video_analytics_collection.insert_many([video_analytic.model_dump() for video_analytic in sample_video_analytics])
-        logger.info("sample_video_analytics inserted")
+    ``scale`` loads that many copies of the sample catalog (titles of the
+    extra copies get a " #n" suffix), for benchmark datasets.
+    """
+    client = None
+    try:
+        client = connect_to_mongodb()
+        db = client[db_name]
+        start = time.perf_counter()
+
+        # Dropping is far cheaper than delete_many on a large catalog; the
+        # planned indexes are then built on the empty collections
+        for name in SEED_COLLECTIONS:
+            db[name].drop()
+        apply_plan(db)
+        logger.info("Indexes match the index plan")
+
+        # Parents first; their _ids come back from insert_many, so children never query them
+        counts = {}
+        counts["products"], product_ids = insert_stream(db["products"], generate_products(scale), "title", batch_size)
+        counts["videos"], video_ids = insert_stream(db["videos"], generate_videos(scale), "title", batch_size)
+
+        children = {
+            "listings": generate_product_listings(product_ids, scale),
+            "analytics": generate_product_analytics(product_ids, scale),
+            "reviews": generate_reviews(product_ids, scale),
+            "video_listings": generate_video_listings(video_ids, scale),
+            "video_analytics": generate_video_analytics(video_ids, scale),
+        }
+        for name, documents in children.items():
+            counts[name], _ = insert_stream(db[name], documents, batch_size=batch_size)
+
+        logger.info(f"Seeded {sum(counts.values())} documents in {time.perf_counter() - start:.1f}s: {counts}")
+        return counts
 
     except Exception as e:
         logger.error(f"Error setting up database: {e}")
@@ -351,4 +231,9 @@ def setup_product_database():
             logger.info("MongoDB connection closed")
 
 if __name__ == "__main__":
-    setup_product_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed the product database with the sample catalog")
+    parser.add_argument("--scale", type=int, default=1, help="Copies of the sample catalog to load")
+    parser.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE, help="Documents per insert_many")
+    parser.add_argument("--db", default="social_media_products", help="Database to seed")
+    args = parser.parse_args()
+    setup_product_database(scale=args.scale, batch_size=args.batch_size, db_name=args.db)
@@ -0,0 +1,131 @@
+import cv2
+import numpy as np
+import logging
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import List
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+FRAME_SAMPLING_STRATEGY = os.getenv("FRAME_SAMPLING_STRATEGY", "sequential")
+SCENE_CHANGE_THRESHOLD = float(os.getenv("SCENE_CHANGE_THRESHOLD", "0.3"))
+# Sampled frames are scaled down to this width as they are decoded; the model doesn't need more
+FFMPEG_FRAME_MAX_WIDTH = 1280
+
+STRATEGIES = ("sequential", "keyframe", "scene")
+
+
+def _downscale(frame: np.ndarray, max_width: int = FFMPEG_FRAME_MAX_WIDTH) -> np.ndarray:
+    height, width = frame.shape[:2]
+    if width <= max_width:
+        return frame
+    return cv2.resize(frame, (max_width, round(height * max_width / width)), interpolation=cv2.INTER_AREA)
+
+
+def _evenly_spaced(items: list, count: int) -> list:
+    if len(items) <= count:
+        return list(items)
+    indices = np.unique(np.linspace(0, len(items) - 1, count).round().astype(int))
+    return [items[i] for i in indices]
+
+
+class FrameSampler:
+    """
+    Picks representative frames from a video without per-frame seeking.
+
+    Strategies:
+    - ``sequential``: one decode pass with grab/retrieve. Only every ``stride``-th
+      frame is converted and downscaled before it is buffered, and the stride
+      doubles whenever more than twice the requested frames are held. Memory
+      stays bounded and the sampling stays even without trusting
+      CAP_PROP_FRAME_COUNT.
+    - ``keyframe``: FFmpeg decodes keyframes only (``-skip_frame nokey``).
+    - ``scene``: FFmpeg keeps frames whose scene-change score is above a threshold.
+
+    The FFmpeg strategies fall back to ``sequential`` when they yield fewer
+    frames than requested. All methods are blocking; run them in a worker thread.
+    """
+
+    def __init__(self, ffmpeg_path: str, strategy: str = FRAME_SAMPLING_STRATEGY,
+                 scene_threshold: float = SCENE_CHANGE_THRESHOLD):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown frame sampling strategy: {strategy}. Expected one of {STRATEGIES}")
+        self.ffmpeg_path = ffmpeg_path
+        self.strategy = strategy
+        self.scene_threshold = scene_threshold
+
+    def sample(self, video_path, num_frames: int = 5, strategy: str = None) -> List[Image.Image]:
+        strategy = strategy or self.strategy
+        if strategy == "keyframe":
+            frames = self.sample_keyframes(video_path, num_frames)
+        elif strategy == "scene":
+            frames = self.sample_scene_changes(video_path, num_frames)
+        else:
+            return self.sample_sequential(video_path, num_frames)
+
+        if len(frames) < num_frames:
+            logger.info(f"{strategy} sampling found {len(frames)} frame(s), falling back to sequential")
+            return self.sample_sequential(video_path, num_frames)
+        return frames
+
+    def sample_sequential(self, video_path, num_frames: int = 5) -> List[Image.Image]:
+        kept = []
+        stride = 1
+        index = 0
+        cap = cv2.VideoCapture(str(video_path))
+        try:
+            while cap.grab():
+                if index % stride == 0:
+                    ok, frame = cap.retrieve()
+                    if not ok:
+                        # Hold the position so kept[i] stays frame i * stride; the next frame takes this slot
+                        continue
+                    kept.append(_downscale(frame))
+                    if len(kept) > 2 * num_frames:
+                        # kept[0] is frame 0, so this keeps exactly the multiples of 2 * stride
+                        kept = kept[::2]
+                        stride *= 2
+                index += 1
+        finally:
+            cap.release()
+
+        return [
+            Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            for frame in _evenly_spaced(kept, num_frames)
+        ]
+
+    def sample_keyframes(self, video_path, num_frames: int = 5) -> List[Image.Image]:
+        return self._ffmpeg_frames(video_path, num_frames, input_args=["-skip_frame", "nokey"], filters=[])
+
+    def sample_scene_changes(self, video_path, num_frames: int = 5) -> List[Image.Image]:
+        return self._ffmpeg_frames(
+            video_path, num_frames, input_args=[],
+            filters=[f"select='gt(scene,{self.scene_threshold})'"],
+        )
+
+    def _ffmpeg_frames(self, video_path, num_frames, input_args, filters) -> List[Image.Image]:
+        scale = f"scale='min({FFMPEG_FRAME_MAX_WIDTH},iw)':-2"
+        with tempfile.TemporaryDirectory() as out_dir:
+            command = [
+                str(self.ffmpeg_path), "-hide_banner", "-loglevel", "error",
+                *input_args,
+                "-i", str(video_path),
+                "-vf", ",".join(filters + [scale]),
+                "-fps_mode", "passthrough",
+                "-q:v", "2",
+                str(Path(out_dir) / "%06d.jpg"),
+            ]
+            result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if result.returncode != 0:
+                logger.error(f"FFmpeg frame extraction failed: {result.stderr.decode(errors='ignore')[-500:]}")
+                return []
+
+            paths = _evenly_spaced(sorted(Path(out_dir).glob("*.jpg")), num_frames)
+            frames = []
+            for path in paths:
+                with Image.open(path) as image:
+                    frames.append(image.convert("RGB"))
+            return frames
@@ -0,0 +1,134 @@
+import logging
+import os
+from typing import Dict, List, NamedTuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Frames whose 64-bit perceptual hashes differ in at most this many bits count as duplicates
+PHASH_DUPLICATE_DISTANCE = int(os.getenv("PHASH_DUPLICATE_DISTANCE", "10"))
+# Frames less sharp than this fraction of the sharpest candidate count as blurry
+BLUR_SHARPNESS_RATIO = float(os.getenv("BLUR_SHARPNESS_RATIO", "0.2"))
+
+HASH_SIZE = 8
+DCT_SIZE = 32
+SHARPNESS_MAX_EDGE = 256
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(DCT_SIZE)
+
+
+def phash(image: Image.Image) -> int:
+    """64-bit DCT perceptual hash: low frequencies above or below their median"""
+    gray = np.asarray(image.convert("L").resize((DCT_SIZE, DCT_SIZE), Image.BILINEAR), dtype=np.float64)
+    coefficients = (_DCT @ gray @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].flatten()
+    # The DC term only encodes overall brightness
+    bits = coefficients > np.median(coefficients[1:])
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def sharpness(image: Image.Image) -> float:
+    """Variance of the Laplacian of a downscaled grayscale copy; low means blurry"""
+    gray = image.convert("L")
+    scale = SHARPNESS_MAX_EDGE / max(gray.size)
+    if scale < 1:
+        gray = gray.resize((max(1, round(gray.width * scale)), max(1, round(gray.height * scale))), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.float64)
+    if pixels.shape[0] < 3 or pixels.shape[1] < 3:
+        return 0.0
+    laplacian = (
+        pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:]
+        - 4 * pixels[1:-1, 1:-1]
+    )
+    return float(laplacian.var())
+
+
+class Selection(NamedTuple):
+    frames: List[Image.Image]
+    indices: List[int]
+    duplicates: int
+    blurry: int
+
+
+class FrameSelector:
+    """
+    Chooses which sampled frames are worth a model call.
+
+    Blurry frames are dropped first, then near-duplicates (keeping the sharper
+    frame). If more than ``budget`` frames remain, a greedy farthest-point
+    pass over hash distance, seeded with the sharpest frame, keeps the most
+    mutually different ones. Selected frames stay in their original order.
+    """
+
+    def __init__(self, duplicate_distance: int = PHASH_DUPLICATE_DISTANCE,
+                 blur_ratio: float = BLUR_SHARPNESS_RATIO):
+        self.duplicate_distance = duplicate_distance
+        self.blur_ratio = blur_ratio
+        self.videos = 0
+        self.candidates = 0
+        self.selected = 0
+        self.duplicates_dropped = 0
+        self.blurry_dropped = 0
+        self.model_calls_saved = 0
+
+    def select(self, frames: List[Image.Image], budget: int) -> Selection:
+        if not frames or budget <= 0:
+            return Selection([], [], 0, 0)
+
+        hashes = [phash(frame) for frame in frames]
+        scores = [sharpness(frame) for frame in frames]
+
+        # Blur is judged relative to the sharpest candidate, as absolute levels vary by source
+        threshold = self.blur_ratio * max(scores)
+        sharp = [i for i, score in enumerate(scores) if score >= threshold]
+        blurry = len(frames) - len(sharp)
+
+        unique: List[int] = []
+        for i in sorted(sharp, key=lambda i: scores[i], reverse=True):
+            if all(hamming(hashes[i], hashes[j]) > self.duplicate_distance for j in unique):
+                unique.append(i)
+        duplicates = len(sharp) - len(unique)
+
+        chosen = unique[:1]
+        remaining = unique[1:]
+        while remaining and len(chosen) < budget:
+            farthest = max(remaining, key=lambda i: min(hamming(hashes[i], hashes[j]) for j in chosen))
+            chosen.append(farthest)
+            remaining.remove(farthest)
+        chosen.sort()
+
+        self.videos += 1
+        self.candidates += len(frames)
+        self.selected += len(chosen)
+        self.duplicates_dropped += duplicates
+        self.blurry_dropped += blurry
+        # Without selection the first `budget` frames would each have cost a call
+        self.model_calls_saved += min(len(frames), budget) - len(chosen)
+        if len(chosen) < min(len(frames), budget):
+            logger.info(f"Frame selection kept {len(chosen)}/{len(frames)} frames "
+                        f"({duplicates} duplicate, {blurry} blurry)")
+        return Selection([frames[i] for i in chosen], chosen, duplicates, blurry)
+
+    def stats(self) -> Dict:
+        return {
+            "videos": self.videos,
+            "candidates": self.candidates,
+            "selected": self.selected,
+            "duplicates_dropped": self.duplicates_dropped,
+            "blurry_dropped": self.blurry_dropped,
+            "model_calls_saved": self.model_calls_saved,
+        }
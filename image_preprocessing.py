@@ -0,0 +1,149 @@
+import asyncio
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, NamedTuple, Optional
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Set IMAGE_PREPROCESSING=0 to hand the SDK the original images (it re-encodes them as lossless WebP)
+IMAGE_PREPROCESSING = os.getenv("IMAGE_PREPROCESSING", "1") == "1"
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1536"))
+IMAGE_UPLOAD_FORMAT = os.getenv("IMAGE_UPLOAD_FORMAT", "JPEG").upper()
+IMAGE_UPLOAD_QUALITY = int(os.getenv("IMAGE_UPLOAD_QUALITY", "85"))
+IMAGE_PREPROCESS_WORKERS = int(os.getenv("IMAGE_PREPROCESS_WORKERS", "2"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+FLATTEN_BACKGROUND = (255, 255, 255)
+
+
+class PreparedImage(NamedTuple):
+    part: Dict
+    width: int
+    height: int
+    original_width: int
+    original_height: int
+    encoded_bytes: int
+    seconds: float
+
+
+def normalize_image(image: Image.Image, max_edge: int = IMAGE_MAX_EDGE) -> Image.Image:
+    """Apply EXIF orientation, flatten transparency onto white and cap the longest edge"""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        flattened = Image.new("RGB", rgba.size, FLATTEN_BACKGROUND)
+        flattened.paste(rgba, mask=rgba.getchannel("A"))
+        image = flattened
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if max(image.size) > max_edge:
+        image = ImageOps.contain(image, (max_edge, max_edge), Image.LANCZOS)
+    return image
+
+
+def encode_image(image: Image.Image, fmt: str = IMAGE_UPLOAD_FORMAT, quality: int = IMAGE_UPLOAD_QUALITY) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+class ImagePreprocessor:
+    """
+    Prepares images for a model request: EXIF orientation, alpha flattening,
+    a max-edge downscale and a lossy re-encode, done on a small thread pool.
+
+    ``prepare`` returns an inline-data part the Gemini SDK sends as is, which
+    also spares the SDK its own lossless WebP encode of the full image.
+    """
+
+    def __init__(self, max_edge: int = IMAGE_MAX_EDGE, fmt: str = IMAGE_UPLOAD_FORMAT,
+                 quality: int = IMAGE_UPLOAD_QUALITY, workers: int = IMAGE_PREPROCESS_WORKERS,
+                 enabled: bool = IMAGE_PREPROCESSING):
+        if fmt not in MIME_TYPES:
+            raise ValueError(f"Unsupported image upload format: {fmt}. Expected one of {sorted(MIME_TYPES)}")
+        self.max_edge = max_edge
+        self.fmt = fmt
+        self.quality = quality
+        self.enabled = enabled
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-prep")
+        self._lock = threading.Lock()
+        self.images = 0
+        self.resized = 0
+        self.pixels_in = 0
+        self.pixels_out = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def prepare_sync(self, image: Image.Image) -> PreparedImage:
+        start = time.perf_counter()
+        original_width, original_height = image.size
+        normalized = normalize_image(image, self.max_edge)
+        data = encode_image(normalized, self.fmt, self.quality)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.images += 1
+            self.resized += normalized.size != (original_width, original_height)
+            self.pixels_in += original_width * original_height
+            self.pixels_out += normalized.width * normalized.height
+            self.bytes_out += len(data)
+            self.seconds += elapsed
+
+        return PreparedImage(
+            part={"mime_type": MIME_TYPES[self.fmt], "data": data},
+            width=normalized.width,
+            height=normalized.height,
+            original_width=original_width,
+            original_height=original_height,
+            encoded_bytes=len(data),
+            seconds=elapsed,
+        )
+
+    async def prepare(self, image: Image.Image) -> PreparedImage:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.prepare_sync, image)
+
+    async def to_part(self, image: Image.Image):
+        """What to put in a generate_content request for this image"""
+        if not self.enabled:
+            return image
+        return (await self.prepare(image)).part
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "format": self.fmt,
+            "quality": self.quality,
+            "max_edge": self.max_edge,
+            "images": self.images,
+            "resized": self.resized,
+            # Uncompressed RGB bytes before and after the downscale
+            "raw_bytes_in": self.pixels_in * 3,
+            "raw_bytes_after_resize": self.pixels_out * 3,
+            "encoded_bytes_out": self.bytes_out,
+            "mean_ms": round(1000 * self.seconds / self.images, 2) if self.images else None,
+        }
+
+
+_preprocessor: Optional[ImagePreprocessor] = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_image_preprocessor() -> ImagePreprocessor:
+    """The process-wide preprocessor shared by the image and video pipelines"""
+    global _preprocessor
+    if _preprocessor is None:
+        with _preprocessor_lock:
+            if _preprocessor is None:
+                _preprocessor = ImagePreprocessor()
+    return _preprocessor
@@ -1,30 +1,27 @@
-import google.generativeai as genai
+import asyncio
+import hashlib
 import os
+import re
+from typing import List
 from dotenv import load_dotenv
 import logging
 from PIL import Image
+from model_client import configure, get_model_client
+from result_cache import ResultCache
+from image_preprocessing import get_image_preprocessor
+from pydantic import ValidationError
+from response_parser import (Field, ResponseSchema, LIST, STRUCTURED_OUTPUT, strip_code_fence,
+                             structured_config, validate_response)
+from models.analysis import ProductAnalysis, ProductAnalysisBatch
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class ImageProcessor:
-    def __init__(self):
-        load_dotenv()
-        api_key = os.getenv('GOOGLE_API_KEY')
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY not found in environment variables")
-        
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-1.5-pro-latest")
-    
-    async def analyze_product(self, image: Image.Image):
-        """Analyze product image and return structured data"""
-        try:
-            analysis_prompt = [
-                """Analyze this product image and provide detailed information in the following format exactly:
+# Bump whenever the analysis prompt changes so cached results are not reused
+PROMPT_VERSION = "2"
 
-BEGIN_ANALYSIS
-Product Name: [exact product name]
+# Fields requested for every analyzed image
+ANALYSIS_FIELDS = """Product Name: [exact product name]
 Category: [main category]
 Subcategory: [sub category]
 Description: [2-3 sentences about the product]
@@ -36,14 +33,75 @@ Key Features:
 Search Keywords:
 - [keyword 1]
 - [keyword 2]
-- [keyword 3]
+- [keyword 3]"""
+
+IMAGE_ANALYSIS_SCHEMA = ResponseSchema([
+    Field("product_name", "Product Name"),
+    Field("category", "Category"),
+    Field("subcategory", "Subcategory"),
+    Field("description", "Description"),
+    Field("price", "Price"),
+    Field("key_features", "Key Features", LIST),
+    Field("search_keywords", "Search Keywords", LIST),
+])
+
+# Upper bound on images sent in a single batch request
+MAX_BATCH_IMAGES = 5
+
+BATCH_BLOCK_PATTERN = re.compile(r"BEGIN_ANALYSIS\s+(\d+)(.*?)END_ANALYSIS\s+\1", re.DOTALL)
+
+def image_cache_key(image: Image.Image) -> str:
+    """Hash the decoded RGB pixels so re-encoded copies of the same photo share a key"""
+    normalized = image if image.mode == "RGB" else image.convert("RGB")
+    digest = hashlib.sha256()
+    digest.update(f"{normalized.width}x{normalized.height}".encode())
+    digest.update(normalized.tobytes())
+    return f"{digest.hexdigest()}:v{PROMPT_VERSION}"
+
+class ImageProcessor:
+    def __init__(self, cache: ResultCache = None):
+        load_dotenv()
+        api_key = os.getenv('GOOGLE_API_KEY')
+        if not api_key:
+            raise ValueError("GOOGLE_API_KEY not found in environment variables")
+        
+        configure(api_key)
+        self.model_client = get_model_client("gemini-1.5-pro-latest")
+        self.cache = cache if cache is not None else ResultCache("image_analysis")
+        # Downscaled, re-encoded copies are what gets uploaded to the model
+        self.preprocessor = get_image_preprocessor()
+        # JSON-mode responses validated into models.analysis, with the text format as fallback
+        self.structured = STRUCTURED_OUTPUT
+    
+    async def analyze_product(self, image: Image.Image):
+        """Analyze product image and return structured data"""
+        try:
+            cache_key = await asyncio.to_thread(image_cache_key, image)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Image analysis served from cache")
+                return cached
+
+            part = await self.preprocessor.to_part(image)
+            if self.structured:
+                response = await self.model_client.generate_content(
+                    ["Analyze this product image for an e-commerce listing.", part],
+                    generation_config=structured_config(ProductAnalysis),
+                )
+                analysis_dict = validate_response(response.text, ProductAnalysis, IMAGE_ANALYSIS_SCHEMA).model_dump()
+            else:
+                analysis_prompt = [
+                    f"""Analyze this product image and provide detailed information in the following format exactly:
+
+BEGIN_ANALYSIS
+{ANALYSIS_FIELDS}
 END_ANALYSIS""",
-                image
-            ]
-            
-            response = self.model.generate_content(analysis_prompt)
-            analysis_dict = self._parse_analysis(response.text)
+                    part
+                ]
+                response = await self.model_client.generate_content(analysis_prompt)
+                analysis_dict = self._parse_analysis(response.text)
             analysis_dict['status'] = 'success'
+            await self.cache.set(cache_key, analysis_dict)
             
             return analysis_dict
             
@@ -54,54 +112,101 @@ END_ANALYSIS""",
                 'message': str(e)
             }
     
-    def _parse_analysis(self, text):
-        """Parse the analysis text into structured format"""
-        analysis_dict = {
-            'product_name': '',
-            'category': '',
-            'subcategory': '',
-            'description': '',
-            'price': '',
-            'key_features': [],
-            'search_keywords': []
-        }
-        
-        try:
-            if 'BEGIN_ANALYSIS' in text and 'END_ANALYSIS' in text:
-                content = text.split('BEGIN_ANALYSIS')[-1].split('END_ANALYSIS')[0].strip()
+    async def analyze_products(self, images: List[Image.Image]):
+        """Analyze several product images, sending uncached ones in a single model call.
+
+        Returns one analysis dict per input image, in order. Falls back to
+        per-image calls when the batch response cannot be matched to every image.
+        """
+        keys = await asyncio.gather(*(asyncio.to_thread(image_cache_key, image) for image in images))
+        results = [await self.cache.get(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        for start in range(0, len(pending), MAX_BATCH_IMAGES):
+            chunk = pending[start:start + MAX_BATCH_IMAGES]
+            if len(chunk) == 1:
+                results[chunk[0]] = await self.analyze_product(images[chunk[0]])
+                continue
+
+            analyses = await self._analyze_batch([images[i] for i in chunk])
+            if analyses is None:
+                logger.warning(f"Batch analysis of {len(chunk)} images did not parse, analyzing individually")
+                analyses = await asyncio.gather(*(self.analyze_product(images[i]) for i in chunk))
             else:
-                content = text.strip()
-            
-            lines = content.split('\n')
-            current_section = None
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if line.startswith('Product Name:'):
-                    analysis_dict['product_name'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Category:'):
-                    analysis_dict['category'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Subcategory:'):
-                    analysis_dict['subcategory'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Description:'):
-                    analysis_dict['description'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Price:'):
-                    analysis_dict['price'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Key Features:'):
-                    current_section = 'features'
-                elif line.startswith('Search Keywords:'):
-                    current_section = 'keywords'
-                elif line.startswith('- '):
-                    if current_section == 'features':
-                        analysis_dict['key_features'].append(line.strip('- '))
-                    elif current_section == 'keywords':
-                        analysis_dict['search_keywords'].append(line.strip('- '))
-            
-            return analysis_dict
-            
+                for i, analysis in zip(chunk, analyses):
+                    await self.cache.set(keys[i], analysis)
+
+            for i, analysis in zip(chunk, analyses):
+                results[i] = analysis
+
+        return results
+
+    async def _analyze_batch(self, images: List[Image.Image]):
+        """Analyze several images in one request; returns None if the response doesn't parse"""
+        if self.structured:
+            prompt = [f"""You will be shown {len(images)} product images, each preceded by its number.
+Analyze every image separately for an e-commerce listing."""]
+            kwargs = {"generation_config": structured_config(ProductAnalysisBatch)}
+        else:
+            prompt = [
+                f"""You will be shown {len(images)} product images, each preceded by its number.
+Analyze every image separately and provide detailed information for each one in the following format exactly, replacing N with the image number:
+
+BEGIN_ANALYSIS N
+{ANALYSIS_FIELDS}
+END_ANALYSIS N"""
+            ]
+            kwargs = {}
+        try:
+            parts = await asyncio.gather(*(self.preprocessor.to_part(image) for image in images))
+            for number, part in enumerate(parts, start=1):
+                prompt.extend([f"Image {number}:", part])
+
+            response = await self.model_client.generate_content(prompt, **kwargs)
+            text = response.text
         except Exception as e:
-            logger.error(f"Error parsing analysis: {str(e)}")
-            return analysis_dict
+            logger.error(f"Error in batch analysis: {str(e)}")
+            return None
+
+        if self.structured:
+            analyses = self._parse_batch_json(text, len(images))
+            if analyses is not None:
+                return analyses
+        return self._parse_batch_blocks(text, len(images))
+
+    def _parse_batch_json(self, text, count):
+        try:
+            batch = ProductAnalysisBatch.model_validate_json(strip_code_fence(text))
+        except (ValidationError, ValueError) as e:
+            logger.warning(f"Structured batch response did not validate, scraping text instead: {str(e)[:200]}")
+            return None
+
+        by_number = {analysis.image_number: analysis for analysis in batch.analyses}
+        if set(by_number) != set(range(1, count + 1)):
+            return None
+        analyses = []
+        for number in range(1, count + 1):
+            analysis_dict = by_number[number].model_dump(exclude={"image_number"})
+            if not analysis_dict['product_name']:
+                return None
+            analysis_dict['status'] = 'success'
+            analyses.append(analysis_dict)
+        return analyses
+
+    def _parse_batch_blocks(self, text, count):
+        blocks = {int(number): body for number, body in BATCH_BLOCK_PATTERN.findall(text)}
+        if set(blocks) != set(range(1, count + 1)):
+            return None
+
+        analyses = []
+        for number in range(1, count + 1):
+            analysis_dict = self._parse_analysis(blocks[number])
+            if not analysis_dict['product_name']:
+                return None
+            analysis_dict['status'] = 'success'
+            analyses.append(analysis_dict)
+        return analyses
+
+    def _parse_analysis(self, text):
+        """Parse the analysis text into structured format"""
+        return IMAGE_ANALYSIS_SCHEMA.parse(text)
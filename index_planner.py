@@ -0,0 +1,343 @@
+"""
+Index plan for the catalog collections, derived from the queries the app runs.
+
+Every query the API issues against these collections is listed in
+QUERY_SHAPES. ``plan_indexes`` turns them into the smallest index set that
+serves them: keys follow the equality, sort, range order, an index whose keys
+are a prefix of another planned index is folded into it, ``_id`` lookups use
+the built-in index, and a shape whose fields are not in the stored model is
+reported instead of indexed. ``apply_plan`` brings a database to the plan
+without dropping the indexes that are already right.
+
+Usage:
+    python index_planner.py              # compare the live indexes with the plan
+    python index_planner.py --apply      # create missing indexes, drop unplanned ones
+"""
+import argparse
+import json
+import logging
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import bson
+from pymongo import ASCENDING, IndexModel
+
+from models.analytics import Analytics
+from models.analyticsVideo import VideoAnalytics
+from models.listing import ProductListing
+from models.product import Product
+from models.review import RecentReview
+from models.video import Video
+from models.videoListing import VideoListing
+from search import TEXT_INDEXES, text_index_model
+
+logger = logging.getLogger(__name__)
+
+# What each collection stores, used to reject queries on fields that never exist
+COLLECTION_MODELS = {
+    "products": Product,
+    "listings": ProductListing,
+    "analytics": Analytics,
+    "reviews": RecentReview,
+    "videos": Video,
+    "video_listings": VideoListing,
+    "video_analytics": VideoAnalytics,
+}
+
+# Documents sampled per collection when estimating index entries and sizes
+SAMPLE_SIZE = 1000
+# Per-entry overhead on top of the key itself (record id and page bookkeeping), for estimates only
+INDEX_ENTRY_OVERHEAD_BYTES = 16
+TEXT_TOKEN = re.compile(r"\w+")
+
+
+class QueryShape(NamedTuple):
+    """
+    The filter and sort of one query. ``text`` marks a $text search, and
+    ``indexable=False`` a query no index can serve (``note`` says why).
+    """
+    collection: str
+    source: str
+    equality: Tuple[str, ...] = ()
+    sort: Tuple[Tuple[str, int], ...] = ()
+    range: Tuple[str, ...] = ()
+    unique: bool = False
+    text: bool = False
+    indexable: bool = True
+    note: str = ""
+
+
+class PlannedIndex(NamedTuple):
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    name: str
+    unique: bool
+    text: bool
+    sources: Tuple[str, ...]
+
+    def model(self) -> IndexModel:
+        if self.text:
+            return text_index_model(self.collection)
+        return IndexModel(list(self.keys), name=self.name, unique=self.unique)
+
+
+class IndexPlan(NamedTuple):
+    indexes: Dict[str, List[PlannedIndex]]
+    skipped: List[Dict]
+
+
+UNINDEXABLE_OR = "$or with an unanchored case-insensitive title regex; the regex branch scans every document"
+
+QUERY_SHAPES = [
+    QueryShape("products", "schemas/image.py:get_product_details", equality=("_id",)),
+    QueryShape("products", "schemas/image.py:get_categories", equality=("category",)),
+    QueryShape("products", "recommendations.py:build_recommendation_pipeline", equality=("category", "subcategory")),
+    QueryShape("products", "schemas/image.py:get_product_recommendations", equality=("product_id",)),
+    QueryShape("products", "schemas/image.py:get_comparable_products", indexable=False, note=UNINDEXABLE_OR),
+    QueryShape("products", "search.py:search_collection_range", text=True),
+    QueryShape("products", "search.py:search_collection_after", text=True),
+
+    QueryShape("listings", "schemas/image.py:get_product_listings", equality=("product_id",)),
+    QueryShape("listings", "content_processor.py:get_product_listings",
+               equality=("product_id",), sort=(("created_at", -1),)),
+    QueryShape("listings", "search.py:search_collection_range", text=True),
+
+    QueryShape("analytics", "schemas/image.py:get_product_analytics", equality=("product_id",), unique=True),
+
+    QueryShape("reviews", "schemas/image.py:get_product_reviews", equality=("product_id",)),
+
+    QueryShape("videos", "schemas/video.py:get_comparable_videos", equality=("_id",)),
+    QueryShape("videos", "schemas/image.py:get_categories", equality=("category",)),
+    QueryShape("videos", "schemas/video.py:upload_video", equality=("category", "subcategory")),
+    QueryShape("videos", "schemas/video.py:get_comparable_videos", indexable=False, note=UNINDEXABLE_OR),
+    QueryShape("videos", "search.py:search_collection_range", text=True),
+    QueryShape("videos", "search.py:search_collection_after", text=True),
+
+    QueryShape("video_listings", "schemas/video.py:get_video_listings", equality=("video_id",), unique=True),
+
+    QueryShape("video_analytics", "schemas/video.py:get_video_analytics", equality=("video_id",), unique=True),
+]
+
+
+def index_name(keys) -> str:
+    """MongoDB's default name for a key pattern"""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def stored_fields(model) -> set:
+    """Top-level and dotted field paths of a pydantic model"""
+    fields = {"_id"}
+    for name, info in model.model_fields.items():
+        fields.add(name)
+        nested = getattr(info.annotation, "model_fields", None)
+        if nested:
+            fields.update(f"{name}.{child}" for child in stored_fields(info.annotation) if child != "_id")
+    return fields
+
+
+def plan_indexes(shapes: List[QueryShape] = QUERY_SHAPES) -> IndexPlan:
+    candidates: Dict[str, Dict[Tuple, PlannedIndex]] = {}
+    skipped = []
+    for shape in shapes:
+        by_keys = candidates.setdefault(shape.collection, {})
+        if not shape.indexable:
+            skipped.append({"collection": shape.collection, "source": shape.source, "reason": shape.note})
+            continue
+        if shape.text:
+            keys = (("$text", 1),)
+            planned = PlannedIndex(shape.collection, keys, TEXT_INDEXES[shape.collection]["name"], False, True, ())
+        else:
+            keys = tuple((field, ASCENDING) for field in shape.equality) + shape.sort + tuple(
+                (field, ASCENDING) for field in shape.range)
+            missing = [field for field, _ in keys if field not in stored_fields(COLLECTION_MODELS[shape.collection])]
+            if missing:
+                skipped.append({"collection": shape.collection, "source": shape.source,
+                                "reason": f"{', '.join(missing)} not in stored documents"})
+                continue
+            if keys == (("_id", ASCENDING),):
+                continue
+            planned = PlannedIndex(shape.collection, keys, index_name(keys), shape.unique, False, ())
+
+        previous = by_keys.get(keys)
+        if previous is not None:
+            planned = planned._replace(unique=planned.unique or previous.unique, sources=previous.sources)
+        by_keys[keys] = planned._replace(sources=planned.sources + (shape.source,))
+
+    indexes = {}
+    for collection, by_keys in candidates.items():
+        kept = []
+        for keys, planned in by_keys.items():
+            # A non-unique index whose keys prefix a longer planned index is served by that index
+            wider = next((other for other_keys, other in by_keys.items()
+                          if not planned.text and not other.text and len(other_keys) > len(keys)
+                          and other_keys[:len(keys)] == keys), None)
+            if wider is not None and not planned.unique:
+                by_keys[wider.keys] = wider._replace(sources=wider.sources + planned.sources)
+                continue
+            kept.append(keys)
+        indexes[collection] = [by_keys[keys] for keys in kept]
+    return IndexPlan(indexes, skipped)
+
+
+def _is_text(info: Dict) -> bool:
+    return any(kind == "text" for _, kind in info.get("key", []))
+
+
+def _matches(info: Dict, planned: PlannedIndex) -> bool:
+    if planned.text:
+        return _is_text(info)
+    return list(info.get("key", [])) == list(planned.keys) and bool(info.get("unique")) == planned.unique
+
+
+def apply_plan(db, plan: Optional[IndexPlan] = None) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Bring each planned collection's indexes to the plan and return what changed.
+
+    Indexes that already match are left alone, so running it twice changes
+    nothing the second time. Indexes that would block a planned one (same
+    name or keys with other options, or another text index) are dropped
+    before it is created; other unplanned indexes are dropped last so
+    queries are never left without their index.
+    """
+    plan = plan or plan_indexes()
+    changes = {}
+    for collection_name, planned_indexes in plan.indexes.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        planned_by_name = {planned.name: planned for planned in planned_indexes}
+        planned_keys = [list(planned.keys) for planned in planned_indexes if not planned.text]
+        kept, dropped, created = set(), [], []
+
+        for name, info in existing.items():
+            if name == "_id_":
+                continue
+            planned = planned_by_name.get(name)
+            if planned is not None and _matches(info, planned):
+                kept.add(name)
+            elif planned is not None or _is_text(info) or list(info.get("key", [])) in planned_keys:
+                collection.drop_index(name)
+                dropped.append(name)
+
+        missing = [planned for planned in planned_indexes if planned.name not in kept]
+        if missing:
+            collection.create_indexes([planned.model() for planned in missing])
+            created = [planned.name for planned in missing]
+
+        for name in existing:
+            if name != "_id_" and name not in kept and name not in dropped:
+                collection.drop_index(name)
+                dropped.append(name)
+
+        changes[collection_name] = {"kept": sorted(kept), "created": created, "dropped": dropped}
+        if created or dropped:
+            logger.info(f"{collection_name}: created {created or 'none'}, dropped {dropped or 'none'}")
+    return changes
+
+
+def _value(doc: Dict, path: str):
+    for part in path.split("."):
+        if isinstance(doc, list):
+            doc = [item.get(part) if isinstance(item, dict) else None for item in doc]
+        elif isinstance(doc, dict):
+            doc = doc.get(part)
+        else:
+            return None
+    return doc
+
+
+def index_entries(doc: Dict, info: Dict, text_fields=()) -> Tuple[int, int]:
+    """Entries an insert of ``doc`` adds to an index, and their approximate size in bytes"""
+    if _is_text(info) or "weights" in info:
+        tokens = set()
+        for field in info.get("weights") or text_fields:
+            value = _value(doc, field)
+            for text in value if isinstance(value, list) else [value]:
+                if isinstance(text, str):
+                    tokens.update(token.lower() for token in TEXT_TOKEN.findall(text))
+        entries = len(tokens)
+        return entries, sum(len(token) + 8 for token in tokens) + entries * INDEX_ENTRY_OVERHEAD_BYTES
+
+    values = [_value(doc, field) for field, _ in info["key"]]
+    # Multikey: one entry per element of the (single) array field in the key
+    entries = 1
+    for value in values:
+        if isinstance(value, list):
+            entries *= max(1, len(value))
+    key_bytes = len(bson.encode({str(i): value for i, value in enumerate(values)}))
+    return entries, entries * (key_bytes + INDEX_ENTRY_OVERHEAD_BYTES)
+
+
+def collection_report(db, collection_name: str, sample_size: int = SAMPLE_SIZE) -> Dict:
+    """
+    Index count, index entries written per inserted document and index size.
+
+    Sizes come from collStats when the server provides them and are otherwise
+    estimated from a sample of the documents.
+    """
+    collection = db[collection_name]
+    indexes = collection.index_information()
+    docs = list(collection.find({}).limit(sample_size))
+    text_fields = TEXT_INDEXES.get(collection_name, {}).get("weights", {})
+    entries = 0
+    estimated_bytes = 0
+    for doc in docs:
+        for info in indexes.values():
+            doc_entries, doc_bytes = index_entries(doc, info, text_fields)
+            entries += doc_entries
+            estimated_bytes += doc_bytes
+
+    report = {
+        "indexes": len(indexes),
+        "documents_sampled": len(docs),
+        # The document write itself plus one write per index entry
+        "writes_per_insert": round(1 + entries / len(docs), 2) if docs else 1 + len(indexes),
+        "index_bytes": None,
+        "estimated_index_bytes": estimated_bytes,
+    }
+    try:
+        stats = db.command("collStats", collection_name)
+        report["index_bytes"] = stats.get("totalIndexSize")
+    except Exception:
+        pass
+    return report
+
+
+def database_report(db, plan: Optional[IndexPlan] = None) -> Dict[str, Dict]:
+    plan = plan or plan_indexes()
+    return {name: collection_report(db, name) for name in plan.indexes}
+
+
+def describe_plan(plan: IndexPlan) -> Dict:
+    return {
+        "indexes": {
+            collection: [{"name": p.name, "unique": p.unique, "serves": list(p.sources)} for p in planned]
+            for collection, planned in plan.indexes.items()
+        },
+        "not_indexed": plan.skipped,
+    }
+
+
+def main():
+    from database_setup import connect_to_mongodb
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="social_media_products")
+    parser.add_argument("--apply", action="store_true", help="Apply the plan instead of only reporting")
+    args = parser.parse_args()
+
+    plan = plan_indexes()
+    client = connect_to_mongodb()
+    try:
+        db = client[args.db]
+        output = {"plan": describe_plan(plan), "before": database_report(db, plan)}
+        if args.apply:
+            output["changes"] = apply_plan(db, plan)
+            output["after"] = database_report(db, plan)
+        print(json.dumps(output, indent=2))
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# How many recent queue latencies the percentiles are computed over
+LATENCY_SAMPLES = 1000
+
+
+class MicroBatchScheduler:
+    """
+    Collects work items from concurrent callers into micro-batches.
+
+    Callers ``await submit(item)``. A single collector task takes the first
+    waiting item, then keeps gathering until the batch holds ``max_batch_size``
+    items or ``max_wait_ms`` has passed since that first item was queued. The
+    batch goes to ``run_batch`` on ``executor``, and each result is routed
+    back to the caller that submitted it. A failure in ``run_batch`` is
+    raised in every caller of that batch.
+
+    Only one batch runs at a time, so ``run_batch`` can use a single shared
+    model without locking.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]], max_batch_size: int,
+                 max_wait_ms: float, executor: Optional[Executor] = None, name: str = "batch"):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.name = name
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop = None
+
+        self.batches = 0
+        self.items = 0
+        self.failures = 0
+        self.batch_sizes = Counter()
+        self.queue_latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.batch_seconds = deque(maxlen=LATENCY_SAMPLES)
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        # Queues and tasks belong to one loop; start afresh if we are on a new one
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._collect())
+
+    async def submit(self, item: Any) -> Any:
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        return await future
+
+    async def submit_many(self, items: List[Any]) -> List[Any]:
+        return list(await asyncio.gather(*(self.submit(item) for item in items)))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already waiting before considering the deadline
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            # Callers that gave up (e.g. a cancelled job) don't need a slot in the batch
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, queued_at in batch:
+                self.queue_latencies.append(started - queued_at)
+            try:
+                results = await loop.run_in_executor(self.executor, self.run_batch, [item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name} returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"{self.name} batch of {len(batch)} failed: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            finally:
+                self.batches += 1
+                self.items += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                self.batch_seconds.append(time.perf_counter() - started)
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict:
+        def percentiles(values):
+            if not values:
+                return {"p50": None, "p95": None, "max": None}
+            p50, p95 = np.percentile(list(values), [50, 95])
+            return {"p50": round(p50 * 1000, 2), "p95": round(p95 * 1000, 2), "max": round(max(values) * 1000, 2)}
+
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "failures": self.failures,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_latency_ms": percentiles(self.queue_latencies),
+            "batch_run_ms": percentiles(self.batch_seconds),
+        }
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Sample event-loop lag continuously and capture the stack of anything that blocks the loop
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "1") == "1"
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+# Opt-in: asyncio debug mode (slow callback and never-awaited coroutine warnings) and full stacks in the log
+LOOP_DEBUG = os.getenv("LOOP_DEBUG", "0") == "1"
+
+# How many recent lag samples the percentiles are computed over
+LAG_SAMPLES = 1000
+# How many blocking events (with their stacks) are kept for /metrics
+BLOCKING_EVENTS = 50
+STACK_DEPTH = 12
+
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def blocking_site(stack: traceback.StackSummary) -> str:
+    """The innermost frame in this codebase, or the innermost frame if none is ours"""
+    for frame in reversed(stack):
+        path = os.path.abspath(frame.filename)
+        if path.startswith(APP_ROOT) and "site-packages" not in path and path != os.path.abspath(__file__):
+            return f"{os.path.relpath(path, APP_ROOT)}:{frame.lineno} in {frame.name}"
+    if stack:
+        frame = stack[-1]
+        return f"{frame.filename}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and catches callbacks that hold the loop.
+
+    A task on the loop sleeps for ``interval_ms`` at a time and records how
+    late it wakes up; every wake-up is a heartbeat. A watchdog thread checks
+    the heartbeat and, once it is ``threshold_ms`` overdue, captures the loop
+    thread's stack, which is the code that is blocking it. The event is closed
+    with its total duration at the next heartbeat.
+
+    C code that holds the GIL also stops the watchdog, so such stalls show up
+    only as late ticks, without a stack.
+    """
+
+    def __init__(self, interval_ms: float = LOOP_MONITOR_INTERVAL_MS,
+                 threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS, debug: bool = LOOP_DEBUG):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.debug = debug
+        self._loop = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._loop_thread_id = None
+        self._heartbeat = 0.0
+        self._stall: Optional[Dict] = None
+
+        self.ticks = 0
+        self.late_ticks = 0
+        self.max_lag = 0.0
+        self.lags = deque(maxlen=LAG_SAMPLES)
+        self.blocking_events = deque(maxlen=BLOCKING_EVENTS)
+        self.blocking_sites = Counter()
+        self.blocked_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start monitoring the running loop"""
+        loop = asyncio.get_running_loop()
+        if self.running and self._loop is loop:
+            return
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        if self.debug:
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.threshold
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = loop.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event-loop monitor started (interval {self.interval * 1000:.0f}ms, "
+                    f"threshold {self.threshold * 1000:.0f}ms, debug {self.debug})")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    def reset(self):
+        """Forget the samples and blocking events collected so far"""
+        with self._lock:
+            self.ticks = self.late_ticks = 0
+            self.max_lag = self.blocked_seconds = 0.0
+            self.lags.clear()
+            self.blocking_events.clear()
+            self.blocking_sites.clear()
+
+    async def _sample(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - start - self.interval)
+            with self._lock:
+                self._heartbeat = now
+                self.ticks += 1
+                self.lags.append(lag)
+                self.max_lag = max(self.max_lag, lag)
+                if lag >= self.threshold:
+                    self.late_ticks += 1
+                stall, self._stall = self._stall, None
+                if stall is not None:
+                    stall["blocked_ms"] = round(lag * 1000, 1)
+                    self.blocked_seconds += lag
+            if stall is not None:
+                self._report(stall)
+
+    def _watch(self):
+        while not self._stopped.wait(self.threshold / 2):
+            with self._lock:
+                if self._stall is not None:
+                    continue
+                heartbeat = self._heartbeat
+            if time.monotonic() - heartbeat - self.interval < self.threshold:
+                continue
+            # Building the stack reads source lines from disk, so keep it out of the lock the loop takes every tick
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.extract_stack(frame)[-STACK_DEPTH:] if frame is not None else []
+            del frame
+            site = blocking_site(stack)
+            stall = {
+                "detected_at": datetime.utcnow().isoformat(),
+                "site": site,
+                "blocked_ms": None,
+                "stack": [f"{f.filename}:{f.lineno} in {f.name}: {f.line}" for f in stack],
+            }
+            with self._lock:
+                # The loop woke up while the stack was being built, so it is no longer blocked there
+                if self._stall is not None or self._heartbeat != heartbeat:
+                    continue
+                self._stall = stall
+                self.blocking_events.append(stall)
+                self.blocking_sites[site] += 1
+
+    def _report(self, stall: Dict):
+        message = f"Event loop blocked for {stall['blocked_ms']}ms at {stall['site']}"
+        if self.debug:
+            logger.warning(message + "\n" + "\n".join(stall["stack"]))
+        else:
+            logger.warning(message)
+
+    def stats(self, recent: int = 10) -> Dict:
+        with self._lock:
+            lags = list(self.lags)
+            events = [dict(event) for event in self.blocking_events][-recent:]
+            top_sites = self.blocking_sites.most_common(10)
+            total_events = sum(self.blocking_sites.values())
+            blocked_seconds = self.blocked_seconds
+        if lags:
+            p50, p95, p99 = np.percentile(lags, [50, 95, 99])
+            lag_ms = {"p50": round(p50 * 1000, 2), "p95": round(p95 * 1000, 2), "p99": round(p99 * 1000, 2),
+                      "max": round(self.max_lag * 1000, 2)}
+        else:
+            lag_ms = {"p50": None, "p95": None, "p99": None, "max": None}
+        return {
+            "running": self.running,
+            "debug": self.debug,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "lag_ms": lag_ms,
+            "blocking": {
+                "events": total_events,
+                "blocked_ms_total": round(blocked_seconds * 1000, 1),
+                "top_sites": [{"site": site, "count": count} for site, count in top_sites],
+                "recent": events[::-1],
+            },
+        }
+
+
+_monitor: Optional[LoopMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_loop_monitor() -> LoopMonitor:
+    """The process-wide event-loop monitor"""
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                _monitor = LoopMonitor()
+    return _monitor
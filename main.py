@@ -10,10 +10,20 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from PIL import Image
 from dotenv import load_dotenv
 from time import time
-from image_processor import ImageProcessor
-from routers import image, video, combined
-from pymongo import MongoClient
-from pymongo.server_api import ServerApi
+from warmup import WARMUP_ON_STARTUP, import_timer, get_import_timings, schedule_warmup, warmup_status
+with import_timer("image_processor"):
+    from image_processor import ImageProcessor
+from result_cache import ResultCache
+from recommendations import fetch_recommendations
+from search import ensure_text_indexes
+from video_jobs import VideoJobQueue
+from upload_ingest import read_image_upload, UploadLimitMiddleware
+from image_preprocessing import get_image_preprocessor
+from response_parser import structured_output_stats
+from loop_monitor import LOOP_MONITOR, get_loop_monitor
+with import_timer("routers"):
+    from routers import image, video, combined
+from schemas.video import run_video_job, transcription_stats, frame_selection_stats
 
 
 # Configure logging
@@ -53,13 +63,25 @@ review_collection = db["reviews"]
 video_collection = db["videos"]
 video_listings_collection = db["video_listings"]
 video_analytics_collection = db["video_analytics"]
+# Model result cache
+analysis_cache_collection = db["analysis_cache"]
+# Background video analysis jobs
+video_jobs_collection = db["video_jobs"]
 
 # Static files and templates setup
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 # Initialize Image Processor
-image_processor = ImageProcessor()
+image_processor = ImageProcessor(
+    cache=ResultCache("image_analysis", collection=analysis_cache_collection)
+)
+
+# Per-stage video pipeline outputs, keyed by the video's content hash
+video_stage_cache = ResultCache("video_stages", collection=analysis_cache_collection)
+
+# Background queue for video analysis
+video_job_queue = VideoJobQueue(video_jobs_collection, handler=run_video_job)
 
 # Include Routers
 app.include_router(image.router, prefix="/upload/image", tags=["Image"])
@@ -67,6 +89,48 @@ app.include_router(video.router, prefix="/upload/video", tags=["Video"])
 app.include_router(combined.router, prefix="/search/all", tags=["Combined"])
 
 
+app.add_middleware(UploadLimitMiddleware)
+
+
+@app.on_event("startup")
+async def ensure_cache_indexes():
+    await image_processor.cache.ensure_indexes()
+
+
+@app.on_event("startup")
+async def ensure_search_indexes():
+    await ensure_text_indexes(db)
+
+
+@app.on_event("startup")
+async def start_video_jobs():
+    await video_job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_video_jobs():
+    await video_job_queue.stop()
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    if LOOP_MONITOR:
+        get_loop_monitor().start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await get_loop_monitor().stop()
+
+
+@app.on_event("startup")
+async def warm_up_models():
+    # Fast start by default; the video and speech stacks load on first use unless preloading is enabled
+    if WARMUP_ON_STARTUP:
+        from schemas.video import warm_up_video_stack
+        schedule_warmup(warm_up_video_stack)
+
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -123,14 +187,52 @@ async def pool_stats():
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
 
+@app.get("/startup-stats", tags=["Monitoring"])
+async def startup_stats():
+    """
+    Endpoint to report import/load time per subsystem and the warm-up state.
+    """
+    return JSONResponse(
+        content={"import_timings_s": get_import_timings(), "warmup": warmup_status()},
+        status_code=200,
+    )
+
+
+@app.get("/inference-stats", tags=["Monitoring"])
+async def inference_stats():
+    """
+    Endpoint to report transcription micro-batching metrics (batch sizes, queue latency),
+    the model calls saved by frame selection, image preprocessing totals and how
+    many structured responses validated versus fell back to text scraping.
+    """
+    return JSONResponse(
+        content={
+            "transcription": transcription_stats(),
+            "frame_selection": frame_selection_stats(),
+            "image_preprocessing": get_image_preprocessor().stats(),
+            "structured_output": structured_output_stats(),
+        },
+        status_code=200,
+    )
+
+
+@app.get("/metrics", tags=["Monitoring"])
+async def metrics():
+    """
+    Endpoint to report event-loop lag percentiles and the calls that blocked the loop,
+    with the code location and stack of each.
+    """
+    return JSONResponse(content={"event_loop": get_loop_monitor().stats()}, status_code=200)
+
+
 @app.post("/upload_image")
 async def upload_image(request: Request, file: UploadFile):
     """
     Handle image upload, analyze the product, and generate personalized recommendations.
     """
     try:
-        # Open the uploaded image
-        image = Image.open(file.file)
+        # Read the uploaded image under the size and pixel caps
+        image, _ = await read_image_upload(file)
 
         # Analyze the image using ImageProcessor
         raw_response = await image_processor.analyze_product(image)
@@ -153,6 +255,8 @@ async def upload_image(request: Request, file: UploadFile):
                 "result.html",
                 {"request": request, "result": result}
             )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}")
         return JSONResponse(
@@ -167,60 +271,10 @@ async def generate_recommendations(data):
     Ensures at least 3-5 recommendations.
     """
     try:
-        # Establish MongoDB connection
-        uri = os.getenv("MONGODB_URL")
-        client = MongoClient(uri, server_api=ServerApi('1'))
-        db = client.social_media_products
-        product_collection = db["products"]
-
-        category = data.get("category", None)
-        subcategory = data.get("subcategory", None)
-        key_features = data.get("key_features", [])
-
-        if not category:
-            logger.warning("No category provided for recommendation. Returning default response.")
-            return [{"name": "No recommendations available", "price": "N/A", "url": "#"}]
-
-        # Primary query: match category and at least one key feature
-        primary_query = {
-            "category": category,
-            "subcategory": subcategory,
-            "common_features": {"$in": key_features}
-        }
-
-        # Fallback query: match only the category if primary query has insufficient results
-        fallback_query = {"category": category,
-                          "subcategory": subcategory}
-
-        # Fetch recommendations
-        recommendations = list(product_collection.find(primary_query).limit(5))
-        if len(recommendations) < 3:
-            additional_recommendations = list(
-                product_collection.find(fallback_query).limit(5 - len(recommendations))
-            )
-            recommendations.extend(additional_recommendations)
-
-        # Format recommendations
-        formatted_recommendations = [
-            {
-                "name": product.get("brand_options", ["Unknown Product"])[0],
-                "price": product.get("price_ranges", {}).get("mid_range", {}).get("min", "N/A"),
-                "features": product.get("common_features", []),
-            }
-            for product in recommendations
-        ]
-
-        # Return default if still insufficient recommendations
-        if not formatted_recommendations:
-            formatted_recommendations = [{"name": "No recommendations available", "price": "N/A", "url": "#"}]
-
-        return formatted_recommendations
-
+        return await fetch_recommendations(product_collection, data)
     except Exception as e:
         logger.error(f"Error generating recommendations: {str(e)}")
         return [{"name": "Error generating recommendations", "price": "N/A", "url": "#"}]
-    finally:
-        client.close()
 
 
 # def _parse_recommendations(response_text):
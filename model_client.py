@@ -0,0 +1,101 @@
+import google.generativeai as genai
+import asyncio
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "gemini-1.5-pro-latest"
+MODEL_TIMEOUT_SECONDS = float(os.getenv("MODEL_TIMEOUT_SECONDS", "120"))
+MODEL_MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "8"))
+
+
+class ModelTimeoutError(Exception):
+    """Raised when a model call does not finish within its timeout"""
+
+
+class ModelClient:
+    """Async wrapper around a Gemini GenerativeModel.
+
+    Calls go through the SDK's async path when it is available and fall back
+    to a bounded thread pool otherwise, so the event loop is never blocked by
+    a model request. Every call is subject to a timeout and a shared
+    concurrency limit.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, timeout=MODEL_TIMEOUT_SECONDS,
+                 max_concurrency=MODEL_MAX_CONCURRENCY, model=None):
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.model = model or genai.GenerativeModel(model_name)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="model")
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        # Created lazily so it binds to the running loop rather than the import-time one
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def generate_content(self, contents, timeout: Optional[float] = None, **kwargs):
+        """
+        Generate content without blocking the event loop.
+
+        The concurrency slot is held until the underlying call has finished,
+        not just until it timed out: a thread-pool call cannot be interrupted,
+        so it keeps its slot until its thread is free.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        semaphore = self._get_semaphore()
+        await semaphore.acquire()
+        try:
+            call = self._start(contents, semaphore.release, **kwargs)
+        except BaseException:
+            semaphore.release()
+            raise
+        try:
+            return await asyncio.wait_for(call, timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Model call to {self.model_name} timed out after {timeout}s")
+            raise ModelTimeoutError(f"Model call timed out after {timeout}s")
+
+    def _start(self, contents, release, **kwargs) -> asyncio.Future:
+        """Start a model call and run ``release`` on the loop once it has finished"""
+        loop = asyncio.get_running_loop()
+        generate_async = getattr(self.model, "generate_content_async", None)
+        if generate_async is not None:
+            task = asyncio.ensure_future(generate_async(contents, **kwargs))
+            task.add_done_callback(lambda _: release())
+            return task
+
+        future = self._executor.submit(self.model.generate_content, contents, **kwargs)
+        future.add_done_callback(lambda _: _call_soon(loop, release))
+        return asyncio.wrap_future(future, loop=loop)
+
+
+def _call_soon(loop, callback):
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        # The loop has been closed, along with the semaphore that belonged to it
+        pass
+
+
+_clients: Dict[str, ModelClient] = {}
+
+
+def configure(api_key):
+    """Configure the Gemini SDK with the given API key"""
+    genai.configure(api_key=api_key)
+
+
+def get_model_client(model_name=DEFAULT_MODEL_NAME) -> ModelClient:
+    """Return the process-wide ModelClient for a model name"""
+    client = _clients.get(model_name)
+    if client is None:
+        client = ModelClient(model_name)
+        _clients[model_name] = client
+    return client
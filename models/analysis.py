@@ -0,0 +1,87 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+from models.video import Video
+from models.videoListing import VideoListing, ProductLink, KeyTimestamp
+
+# Structured (JSON-mode) model responses. The field descriptions are sent to
+# Gemini as part of the response schema, so they double as the prompt.
+
+class ProductAnalysis(BaseModel):
+    product_name: str = Field("", description="Exact product name")
+    category: str = Field("", description="Main category")
+    subcategory: str = Field("", description="Sub category")
+    description: str = Field("", description="2-3 sentences about the product")
+    price: str = Field("", description="Visible pricing information, empty if none")
+    key_features: List[str] = Field(default_factory=list, description="Three key features")
+    search_keywords: List[str] = Field(default_factory=list, description="Three search keywords")
+
+class NumberedProductAnalysis(ProductAnalysis):
+    image_number: int = Field(description="Number of the image this analysis is for")
+
+class ProductAnalysisBatch(BaseModel):
+    analyses: List[NumberedProductAnalysis] = Field(description="One analysis per image, in image order")
+
+class TextAnalysis(BaseModel):
+    product_name: str = Field("", description="Product name")
+    category: str = Field("", description="Main category/subcategory")
+    key_features: List[str] = Field(default_factory=list, description="Three key features")
+    target_audience: str = Field("", description="Intended users")
+    price_range: str = Field("", description="Price range, empty if not mentioned")
+    usp: str = Field("", description="Unique selling proposition")
+    keywords: List[str] = Field(default_factory=list, description="Three keywords")
+
+NOT_AVAILABLE = "Not Available"
+
+class VideoAnalysis(BaseModel):
+    product_name: str = Field(NOT_AVAILABLE, description="Exact product name of visible product in video")
+    category: str = Field(NOT_AVAILABLE, description="Main category of visible product in video")
+    subcategory: str = Field(NOT_AVAILABLE, description="Sub category of visible product in video")
+    platform: str = Field(NOT_AVAILABLE, description="Platform where similar video is available, only name")
+    duration: str = Field(NOT_AVAILABLE, description="Duration of video on that platform")
+    views: str = Field(NOT_AVAILABLE, description="Visible views of video on that platform")
+    transcript_summary: str = Field(NOT_AVAILABLE, description="2-3 sentences about the product")
+    price: str = Field(NOT_AVAILABLE, description="Visible pricing information")
+    key_timestamps: List[KeyTimestamp] = Field(default_factory=list, description="Visible timestamps information")
+    highlights: List[str] = Field(default_factory=list, description="Three highlights")
+    key_features: List[str] = Field(default_factory=list, description="Three key features")
+    search_keywords: List[str] = Field(default_factory=list, description="Three search keywords")
+    product_links: List[ProductLink] = Field(default_factory=list, description="Up to three stores and their price")
+
+    @field_validator("key_timestamps", mode="before")
+    @classmethod
+    def timestamps_from_mapping(cls, value):
+        # Text-scraped and cached results keep timestamps as {"00:15": "Intro"}
+        if isinstance(value, dict):
+            return [{"timestamp": k, "description": v} for k, v in value.items()]
+        return value
+
+    def to_result(self) -> dict:
+        """The analysis dict returned by VideoProcessor"""
+        result = self.model_dump()
+        result["key_timestamps"] = {t.timestamp: t.description for t in self.key_timestamps}
+        return result
+
+    def to_video(self, title: str, id: Optional[str] = None) -> Video:
+        return Video(
+            id=id,
+            title=title,
+            category=self.category,
+            subcategory=self.subcategory,
+            duration=self.duration,
+            views=self.views,
+            highlights=self.highlights,
+            transcript_summary=self.transcript_summary,
+            key_features=self.key_features,
+            price_range=self.price,
+        )
+
+    def to_video_listing(self, video_id: str, title: str, rating: float) -> VideoListing:
+        return VideoListing(
+            video_id=video_id,
+            platform=self.platform,
+            title=title,
+            views=self.views,
+            rating=rating,
+            key_timestamps={t.timestamp: t.description for t in self.key_timestamps},
+            product_links=self.product_links,
+        )
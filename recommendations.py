@@ -0,0 +1,81 @@
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+MAX_RECOMMENDATIONS = 5
+MIN_PRIMARY_RECOMMENDATIONS = 3
+
+# Only the fields used to format a recommendation are sent back by the server (see models.product.Product)
+RECOMMENDATION_PROJECTION = {"_id": 0, "title": 1, "price_range": 1, "features": 1}
+
+NO_RECOMMENDATIONS = [{"name": "No recommendations available", "price": "N/A", "url": "#"}]
+
+
+def build_recommendation_pipeline(category, subcategory, key_features,
+                                  limit=MAX_RECOMMENDATIONS,
+                                  min_primary=MIN_PRIMARY_RECOMMENDATIONS) -> List[Dict]:
+    """
+    Build an aggregation pipeline that resolves the primary/fallback lookup server-side.
+
+    Primary matches share the category, subcategory and at least one key feature.
+    When fewer than ``min_primary`` of them exist, the result is topped up with
+    category/subcategory matches that share none of the key features (so none
+    repeat a primary match), up to ``limit`` documents in total.
+    """
+    return [
+        {"$match": {"category": category, "subcategory": subcategory}},
+        {"$facet": {
+            "primary": [
+                {"$match": {"features": {"$in": key_features}}},
+                {"$limit": limit},
+                {"$project": RECOMMENDATION_PROJECTION},
+            ],
+            "fallback": [
+                {"$match": {"features": {"$nin": key_features}}},
+                {"$limit": limit},
+                {"$project": RECOMMENDATION_PROJECTION},
+            ],
+        }},
+        {"$project": {
+            "recommendations": {
+                "$cond": [
+                    {"$gte": [{"$size": "$primary"}, min_primary]},
+                    "$primary",
+                    {"$slice": [{"$concatArrays": ["$primary", "$fallback"]}, limit]},
+                ]
+            }
+        }},
+    ]
+
+
+def format_recommendations(products) -> List[Dict]:
+    """Shape product documents into the recommendation format used by the UI"""
+    return [
+        {
+            "name": product.get("title", "Unknown Product"),
+            "price": product.get("price_range", "N/A"),
+            "features": product.get("features", []),
+        }
+        for product in products
+    ]
+
+
+async def fetch_recommendations(product_collection, data) -> List[Dict]:
+    """
+    Generate personalized recommendations based on the product's category and features.
+    Runs a single aggregation on the shared Motor connection pool.
+    """
+    category = data.get("category", None)
+    subcategory = data.get("subcategory", None)
+    key_features = data.get("key_features", [])
+
+    if not category:
+        logger.warning("No category provided for recommendation. Returning default response.")
+        return list(NO_RECOMMENDATIONS)
+
+    pipeline = build_recommendation_pipeline(category, subcategory, key_features)
+    result = await product_collection.aggregate(pipeline).to_list(length=1)
+    recommendations = result[0]["recommendations"] if result else []
+
+    return format_recommendations(recommendations) or list(NO_RECOMMENDATIONS)
@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+# Set STRUCTURED_OUTPUT=0 to go back to the labelled BEGIN_ANALYSIS prompts
+STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "1") == "1"
+
+TEXT = "text"
+LIST = "list"
+MAP = "map"
+
+BLOCK_START = "BEGIN_ANALYSIS"
+BLOCK_END = "END_ANALYSIS"
+
+CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL | re.IGNORECASE)
+
+
+class Field(NamedTuple):
+    """
+    One entry of a response schema.
+
+    ``label`` is how the prompt names it (``Product Name``) and ``key`` where it
+    lands in the parsed dict. TEXT fields take the value after the colon, LIST
+    fields collect the bullet items below their header and MAP fields collect
+    ``key: value`` lines below their header. ``parse_item`` converts each list
+    item.
+    """
+    key: str
+    label: str
+    kind: str = TEXT
+    parse_item: Optional[Callable[[str], Any]] = None
+
+
+class ResponseSchema:
+    """
+    Parser for a model's labelled-section responses, compiled from a field list.
+
+    The labels are compiled into one regex that classifies every line of the
+    BEGIN_ANALYSIS block in a single pass: a labelled field, a bullet item, or
+    other text. Labels match case-insensitively and may be wrapped in Markdown
+    bold or headings. A response that is a JSON object, optionally in a code
+    fence as returned by JSON mode, is decoded directly. Parsing never raises;
+    fields that are not found keep ``default``.
+    """
+
+    def __init__(self, fields: Iterable[Field], default: Any = ""):
+        self.fields = list(fields)
+        self.default = default
+        self._by_label = {field.label.lower(): field for field in self.fields}
+        self._by_key = {field.key: field for field in self.fields}
+        labels = "|".join(re.escape(label) for label in sorted(self._by_label, key=len, reverse=True))
+        bold = r"(?:\*\*|__)?"
+        self._line = re.compile(
+            rf"^[ \t]*(?:[#>]+[ \t]*)?{bold}(?P<label>{labels}){bold}[ \t]*:{bold}(?P<value>[^\n]*)"
+            rf"|^[ \t]*(?:[-*•]|\d+[.)])[ \t]+(?P<item>[^\n]*)"
+            rf"|^(?P<other>[^\n]+)",
+            re.MULTILINE | re.IGNORECASE,
+        )
+
+    def empty(self) -> Dict:
+        result = {}
+        for field in self.fields:
+            if field.kind == LIST:
+                result[field.key] = []
+            elif field.kind == MAP:
+                result[field.key] = {}
+            else:
+                result[field.key] = self.default
+        return result
+
+    def parse(self, text: str) -> Dict:
+        result = self.empty()
+        try:
+            if not isinstance(text, str):
+                return result
+            decoded = self._decode_json(text)
+            if decoded is not None:
+                return self._from_json(decoded, result)
+            return self._from_text(text, result)
+        except Exception as e:
+            logger.error(f"Error parsing analysis: {str(e)}")
+            return self.empty()
+
+    def _decode_json(self, text: str) -> Optional[Dict]:
+        candidate = strip_code_fence(text).strip()
+        if not candidate.startswith("{"):
+            return None
+        try:
+            decoded = json.loads(candidate)
+        except ValueError:
+            return None
+        return decoded if isinstance(decoded, dict) else None
+
+    def _from_json(self, data: Dict, result: Dict) -> Dict:
+        for name, value in data.items():
+            field = self._by_key.get(name) or self._by_label.get(str(name).lower())
+            if field is None or value is None:
+                continue
+            if field.kind == LIST:
+                values = value if isinstance(value, list) else [value]
+                result[field.key] = [self._item(field, v) for v in values if v not in (None, "")]
+            elif field.kind == MAP:
+                if isinstance(value, dict):
+                    result[field.key] = {str(k): str(v) for k, v in value.items()}
+            else:
+                result[field.key] = value if isinstance(value, str) else json.dumps(value)
+        return result
+
+    @staticmethod
+    def _item(field: Field, value: Any) -> Any:
+        if field.parse_item is None:
+            return value if isinstance(value, str) else json.dumps(value)
+        return value if isinstance(value, dict) else field.parse_item(str(value))
+
+    def _from_text(self, text: str, result: Dict) -> Dict:
+        text = text.replace("\r\n", "\n")
+        # Same block boundaries as before: after the last start marker, up to the next end marker
+        start = text.rfind(BLOCK_START)
+        if start != -1 and BLOCK_END in text:
+            start += len(BLOCK_START)
+            end = text.find(BLOCK_END, start)
+            text = text[start:end if end != -1 else len(text)]
+
+        section: Optional[Field] = None
+        for match in self._line.finditer(text):
+            label = match.group("label")
+            if label is not None:
+                field = self._by_label[label.lower()]
+                if field.kind == TEXT:
+                    result[field.key] = match.group("value").strip()
+                    section = None
+                else:
+                    section = field
+                continue
+
+            item = match.group("item")
+            if item is not None:
+                if section is not None and section.kind == LIST:
+                    item = item.strip().strip("- ")
+                    if item:
+                        result[section.key].append(self._item(section, item))
+                    continue
+                # A bullet in a MAP section is just a "key: value" line
+                other = item
+            else:
+                other = match.group("other")
+
+            if section is not None and section.kind == MAP and ":" in other:
+                # "00:15: Intro" keys on the whole timestamp, not just "00"
+                key, value = other.split(": ", 1) if ": " in other else other.split(":", 1)
+                result[section.key][key.strip()] = value.strip()
+        return result
+
+
+# JSON-schema keywords the Gemini response schema understands
+GEMINI_SCHEMA_KEYS = ("type", "format", "description", "enum", "items", "properties", "required", "minItems", "maxItems")
+
+
+def _gemini_schema(node: Dict, defs: Dict) -> Dict:
+    if "$ref" in node:
+        node = defs[node["$ref"].rsplit("/", 1)[-1]]
+    nullable = False
+    if "anyOf" in node:
+        options = [option for option in node["anyOf"] if option.get("type") != "null"]
+        nullable = len(options) < len(node["anyOf"])
+        node = {**options[0], **{k: v for k, v in node.items() if k != "anyOf"}}
+        if "$ref" in node:
+            node = {**defs[node.pop("$ref").rsplit("/", 1)[-1]], **node}
+
+    schema = {}
+    for key in GEMINI_SCHEMA_KEYS:
+        if key not in node:
+            continue
+        value = node[key]
+        if key == "items":
+            value = _gemini_schema(value, defs)
+        elif key == "properties":
+            value = {name: _gemini_schema(prop, defs) for name, prop in value.items()}
+        schema[{"minItems": "min_items", "maxItems": "max_items"}.get(key, key)] = value
+    if nullable:
+        schema["nullable"] = True
+    if schema.get("type") == "object" and "properties" in schema:
+        # Every field is requested; pydantic defaults only matter for the text fallback
+        schema["required"] = list(schema["properties"])
+    return schema
+
+
+@lru_cache(maxsize=None)
+def gemini_schema(model: Type[BaseModel]) -> Dict:
+    """
+    The response schema for a pydantic model, in the OpenAPI subset Gemini
+    accepts: references are inlined and titles and defaults dropped.
+    """
+    json_schema = model.model_json_schema()
+    return _gemini_schema(json_schema, json_schema.get("$defs", {}))
+
+
+def structured_config(model: Type[BaseModel]) -> Dict:
+    """generation_config asking Gemini for JSON that matches ``model``"""
+    return {"response_mime_type": "application/json", "response_schema": gemini_schema(model)}
+
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(outcome: str):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def strip_code_fence(text: str) -> str:
+    fenced = CODE_FENCE.match(text)
+    return fenced.group(1) if fenced else text
+
+
+def validate_json(text: str, model: Type[BaseModel]) -> Optional[BaseModel]:
+    """``text`` validated as ``model``, or None when it is not valid JSON for the model"""
+    try:
+        result = model.model_validate_json(strip_code_fence(text))
+        _count("validated")
+        return result
+    except (ValidationError, TypeError, ValueError) as e:
+        logger.warning(f"Structured response did not validate as {model.__name__}, scraping text instead: {str(e)[:200]}")
+    return None
+
+
+def scrape_response(text: str, model: Type[BaseModel], fallback: ResponseSchema) -> BaseModel:
+    """Build ``model`` from whatever the text scraper ``fallback`` finds in a response; counted as a fallback"""
+    _count("fallback")
+    data = fallback.parse(text)
+    try:
+        return model.model_validate(data)
+    except ValidationError as e:
+        # e.g. a JSON product link without a price: reset just the offending fields
+        empty = fallback.empty()
+        for error in e.errors():
+            if error["loc"] and error["loc"][0] in empty:
+                data[error["loc"][0]] = empty[error["loc"][0]]
+        return model.model_validate(data)
+
+
+def validate_response(text: str, model: Type[BaseModel], fallback: ResponseSchema) -> BaseModel:
+    """
+    Validate a JSON-mode response into ``model``.
+
+    A response that is not valid JSON for the model (a drifting model, or one
+    that ignored the schema) goes through the text scraper ``fallback``
+    instead, and the fallback is logged and counted.
+    """
+    result = validate_json(text, model)
+    if result is not None:
+        return result
+    return scrape_response(text, model, fallback)
+
+
+def structured_output_stats() -> Dict:
+    with _stats_lock:
+        return {"enabled": STRUCTURED_OUTPUT, "validated": _stats["validated"], "fallback": _stats["fallback"]}
@@ -0,0 +1,113 @@
+import copy
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "512"))
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+class ResultCache:
+    """Two-tier cache for model analysis results.
+
+    The first tier is a bounded in-memory LRU whose entries expire after
+    ``ttl_seconds``. The optional second tier is a Mongo collection whose
+    documents expire through a TTL index on ``created_at``. Values must be
+    BSON/JSON serializable dicts or lists.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = ANALYSIS_CACHE_SIZE,
+                 collection=None, ttl_seconds: int = ANALYSIS_CACHE_TTL_SECONDS):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.collection = collection
+        self.ttl_seconds = ttl_seconds
+        # key -> (monotonic expiry, value)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def attach_collection(self, collection):
+        """Enable the persistent tier"""
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        """Create the TTL index backing the persistent tier"""
+        if self.collection is None:
+            return
+        try:
+            await self.collection.create_index(
+                "created_at", expireAfterSeconds=self.ttl_seconds, name="created_at_ttl"
+            )
+        except Exception as e:
+            logger.error(f"Failed to create TTL index for {self.namespace} cache: {e}")
+
+    def _doc_id(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(value)
+            del self._entries[key]
+
+        if self.collection is not None:
+            try:
+                doc = await self.collection.find_one({"_id": self._doc_id(key)}, {"value": 1, "created_at": 1})
+            except Exception as e:
+                logger.error(f"Error reading {self.namespace} cache: {e}")
+                doc = None
+            # Mongo's TTL monitor only runs once a minute, so expired documents can still be found
+            remaining = self._remaining(doc) if doc is not None else 0
+            if remaining > 0:
+                self._remember(key, doc["value"], remaining)
+                self.hits += 1
+                return copy.deepcopy(doc["value"])
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any):
+        self._remember(key, copy.deepcopy(value))
+        if self.collection is None:
+            return
+        try:
+            await self.collection.replace_one(
+                {"_id": self._doc_id(key)},
+                {"namespace": self.namespace, "value": value, "created_at": datetime.utcnow()},
+                upsert=True,
+            )
+        except Exception as e:
+            logger.error(f"Error writing {self.namespace} cache: {e}")
+
+    def _remaining(self, doc) -> float:
+        """Seconds until a persisted entry expires"""
+        created_at = doc.get("created_at")
+        if created_at is None:
+            return self.ttl_seconds
+        return self.ttl_seconds - (datetime.utcnow() - created_at).total_seconds()
+
+    def _remember(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl is None else ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            "namespace": self.namespace,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent": self.collection is not None,
+        }
@@ -1,11 +1,14 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from search import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 from schemas.combined import search_all_content
 
 router = APIRouter()
 
 @router.get("/{query}",
     summary="Search All Content",
-    description="Search both products and videos across all categories."
+    description="Search both products and videos across all categories. Pass next_cursor back as cursor to fetch the next page."
 )
-async def search_all_content_(query: str):
-    return await search_all_content(query)
\ No newline at end of file
+async def search_all_content_(query: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                              cursor: Optional[str] = None):
+    return await search_all_content(query, limit, cursor)
\ No newline at end of file
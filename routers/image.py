@@ -1,5 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from fastapi import File, UploadFile, Form
+from search import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from typing import List, Optional
 import logging
 from schemas.image import (
@@ -33,8 +34,9 @@ async def upload_image_route(
     summary="Search Products",
     description="Search for products by title across different categories."
 )
-async def search_products_route(title: str):
-    return await search_products(title)
+async def search_products_route(title: str, page: int = Query(1, ge=1),
+                                page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    return await search_products(title, page, page_size)
 
 @router.get("/listings/{product_id}",
     summary="Get Product Listings",
@@ -1,8 +1,10 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from search import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from typing import Optional
 from fastapi import File, UploadFile, Form
 from schemas.video import (
     upload_video,
+    get_video_job,
     search_videos,
     get_video_listings,
     get_comparable_videos,
@@ -13,7 +15,7 @@ router = APIRouter()
 
 @router.post("/", 
     summary="Upload Product Video",
-    description="Upload and analyze a product video for listing generation."
+    description="Upload a product video and queue it for analysis. Poll the returned job for the listing."
 )
 async def upload_video_route(
     file: Optional[UploadFile] = File(None),  # Made file optional
@@ -22,12 +24,20 @@ async def upload_video_route(
 ):
     return await upload_video(file, title, description)
 
+@router.get("/jobs/{job_id}",
+    summary="Get Video Job Status",
+    description="Get the status and per-stage progress of a queued video analysis."
+)
+async def get_video_job_route(job_id: str):
+    return await get_video_job(job_id)
+
 @router.get("/search/{title}",
     summary="Search Videos",
     description="Search for product videos by title."
 )
-async def search_videos_route(title: str):
-    return await search_videos(title)
+async def search_videos_route(title: str, page: int = Query(1, ge=1),
+                              page_size: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    return await search_videos(title, page, page_size)
 
 @router.get("/listings/{video_id}",
     summary="Get Video Listings",
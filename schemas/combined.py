@@ -1,33 +1,140 @@
 from fastapi import APIRouter, HTTPException
+from bson import ObjectId
+from search import search_collection_after, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Dict, Optional
+import asyncio
+import base64
+import json
 
 router = APIRouter()
 
+# Only the fields the search results UI renders
+PRODUCT_FIELDS = {"title": 1, "category": 1, "subcategory": 1, "price_range": 1, "features": 1}
+VIDEO_FIELDS = {"title": 1, "category": 1, "subcategory": 1, "duration": 1, "views": 1, "price_range": 1}
+
+def encode_cursor(product_state: Optional[Dict], video_state: Optional[Dict]) -> str:
+    """
+    Each collection's state is the (score, id) of the last result already
+    returned from it plus its top score for the query, which later pages
+    keep normalising against.
+    """
+    raw = json.dumps({"p": product_state, "v": video_state}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_state(state) -> Optional[Dict]:
+    if state is None:
+        return None
+    score, top = state["score"], state["top"]
+    if score is not None:
+        score = float(score)
+    if top is not None:
+        top = float(top)
+    _id = state["id"]
+    if not isinstance(_id, str):
+        raise ValueError("id must be a string")
+    return {"score": score, "id": _id, "top": top}
+
+def decode_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None, None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        states = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return _decode_state(states["p"]), _decode_state(states["v"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _after(state: Optional[Dict]):
+    if state is None:
+        return None
+    _id = ObjectId(state["id"]) if ObjectId.is_valid(state["id"]) else state["id"]
+    return state["score"], _id
+
+def normalise_scores(items, top: Optional[float]):
+    """
+    Scale text scores by the collection's best score for the query.
+
+    Scores from different text indexes are not comparable, so each item's
+    ``relevance`` is relative to its own collection's top match.
+    """
+    for item in items:
+        score = item.get("score")
+        item["relevance"] = score / top if score is not None and top else 0.0
+    return items
+
+def top_score(state: Optional[Dict], items) -> Optional[float]:
+    if state is not None:
+        return state["top"]
+    return items[0].get("score") if items else None
+
+def next_state(state: Optional[Dict], items, used: int, top: Optional[float]) -> Optional[Dict]:
+    if not used:
+        return state
+    last = items[used - 1]
+    return {"score": last.get("score"), "id": str(last["_id"]), "top": top}
+
+def merge_ranked(products, videos, limit):
+    """Merge two lists sorted by normalised relevance, returning the top ``limit`` items and how many came from each"""
+    merged = []
+    p = v = 0
+    while len(merged) < limit and (p < len(products) or v < len(videos)):
+        take_product = v >= len(videos) or (
+            p < len(products) and products[p]["relevance"] >= videos[v]["relevance"]
+        )
+        if take_product:
+            merged.append(("product", products[p]))
+            p += 1
+        else:
+            merged.append(("video", videos[v]))
+            v += 1
+    return merged, p, v
+
 # Search both products and videos across all categories.
-async def search_all_content(query: str):
+async def search_all_content(query: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None):
     from main import product_collection, video_collection
-    
+
     search_term = query.lower()
+    limit = min(max(1, limit), MAX_PAGE_SIZE)
+    product_state, video_state = decode_cursor(cursor)
 
     try:
-        # Search products in MongoDB
-        product_cursor = product_collection.find({"title": {"$regex": search_term, "$options": "i"}})
-        product_results = await product_cursor.to_list(length=None)  # Convert cursor to list
-        for product in product_results:
-            product["_id"] = str(product["_id"])  # Convert ObjectId to string
-
-        # Search videos in MongoDB
-        video_cursor = video_collection.find({"title": {"$regex": search_term, "$options": "i"}})
-        video_results = await video_cursor.to_list(length=None)  # Convert cursor to list
-        for video in video_results:
-            video["_id"] = str(video["_id"])  # Convert ObjectId to string
-
-        return {
-            "status": "success",
-            "results": {
-                "products": product_results,
-                "videos": video_results
-            }
-        }
+        # Search products and videos concurrently; each returns at most `limit` documents
+        product_results, video_results = await asyncio.gather(
+            search_collection_after(product_collection, search_term, _after(product_state), limit, PRODUCT_FIELDS),
+            search_collection_after(video_collection, search_term, _after(video_state), limit, VIDEO_FIELDS),
+        )
     except Exception as e:
         print(f"Error fetching data: {e}")
-        raise HTTPException(status_code=500, detail="Error fetching data from database")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Error fetching data from database")
+
+    # The first page fixes each collection's top score; later pages reuse it from the cursor
+    product_top = top_score(product_state, product_results)
+    video_top = top_score(video_state, video_results)
+    normalise_scores(product_results, product_top)
+    normalise_scores(video_results, video_top)
+    merged, products_used, videos_used = merge_ranked(product_results, video_results, limit)
+
+    # More results may exist if either side filled its batch or was only partly consumed
+    has_more = (
+        len(product_results) == limit or len(video_results) == limit
+        or products_used < len(product_results) or videos_used < len(video_results)
+    )
+    next_cursor = encode_cursor(
+        next_state(product_state, product_results, products_used, product_top),
+        next_state(video_state, video_results, videos_used, video_top),
+    ) if has_more else None
+
+    results = {"products": [], "videos": []}
+    for kind, item in merged:
+        item["_id"] = str(item["_id"])  # Convert ObjectId to string
+        item["id"] = item["_id"]
+        item["type"] = kind
+        results["products" if kind == "product" else "videos"].append(item)
+
+    return {
+        "status": "success",
+        "results": results,
+        "ranked": [{"type": kind, "id": item["id"], "score": item.get("score"),
+                    "relevance": item["relevance"]} for kind, item in merged],
+        "next_cursor": next_cursor,
+    }
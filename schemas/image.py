@@ -8,6 +8,8 @@ from fastapi import File, UploadFile, Form
 from image_data import SAMPLE_RESPONSES
 from typing import List, Optional
 from datetime import datetime
+from upload_ingest import read_image_upload, MAX_IMAGES_PER_UPLOAD
+from search import search_collection, escape_search_term, DEFAULT_PAGE_SIZE
 import logging
 
 router = APIRouter()
@@ -20,34 +22,39 @@ async def upload_image(
     title: str = Form(...),
     caption: Optional[str] = Form(None)
 ):
-    from main import db  
+    from main import db, image_processor
     search_term = title.lower()  
     
     try:
         logger.info(f"Received upload request - Files: {len(files)}, Title: {title}")
 
         # Validate file count
-        if len(files) > 5:
+        if len(files) > MAX_IMAGES_PER_UPLOAD:
             logger.warning(f"Upload rejected - Too many files: {len(files)}")
             raise HTTPException(
                 status_code=400,
-                detail="Max 5 images are allowed. Please remove extra files and try again."
+                detail=f"Max {MAX_IMAGES_PER_UPLOAD} images are allowed. Please remove extra files and try again."
             )
         
         # Process the uploaded files
         processed_files = []
+        images = []
         for file in files:
+            # Read each image under the size and pixel caps
+            image, _ = await read_image_upload(file)
+            images.append(image)
             processed_files.append(file.filename)
             logger.info(f"Processed file: {file.filename}")
 
+        # Analyze all images together in as few model calls as possible
+        analyses = await image_processor.analyze_products(images)
+
         # Search for listings with similar titles in the database
         try:
-            listings_cursor = db["listings"].find({"title": {"$regex": search_term, "$options": "i"}})
+            listings = await search_collection(db["listings"], search_term)
         except Exception as db_error:
             logger.error(f"Database error: {db_error}")
             raise HTTPException(status_code=500, detail="Database error occurred")
-        
-        listings = await listings_cursor.to_list(length=None)
 
         if listings:
             # Convert ObjectId to string for JSON compatibility and return listings
@@ -58,6 +65,7 @@ async def upload_image(
                 "status": "success",
                 "message": f"Successfully processed {len(files)} image(s)",
                 "processed_files": processed_files,
+                "analyses": analyses,
                 "listings": [ProductListing(**listing) for listing in listings]
             }
         else:
@@ -75,23 +83,26 @@ async def upload_image(
                 "status": "success",
                 "message": f"Successfully processed {len(files)} image(s)",
                 "processed_files": processed_files,
+                "analyses": analyses,
                 "listings": [default_listing]  # Convert Pydantic model to dictionary
             }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing upload: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Search for products by title across different categories.
-async def search_products(title: str):
+async def search_products(title: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE):
     from main import db
     search_term = title.lower()
     results = []
 
     try:
-        products_cursor = db["products"].find({"title": {"$regex": search_term, "$options": "i"}})
+        products = await search_collection(db["products"], search_term, page, page_size)
 
-        async for product in products_cursor:
+        for product in products:
             product["id"] = str(product["_id"])  # Convert _id to id
 
             try:
@@ -175,7 +186,7 @@ async def get_comparable_products(product_id: str, limit: int = 3):
     # Construct the query for finding similar products
     query = {
         "$or": [
-            {"title": {"$regex": target_product["title"], "$options": "i"}},
+            {"title": {"$regex": escape_search_term(target_product["title"]), "$options": "i"}},
             {"subcategory": target_product.get("subcategory")},
             {"category": target_product.get("category")},
             {"features": {"$in": target_product.get("features", [])}},
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from models.video import Video
 from models.videoListing import VideoListing, ProductLink
+from models.analysis import VideoAnalysis
 from models.analyticsVideo import VideoAnalytics, VideoAudience, VideoEngagement, VideoPerformance  
 from bson import ObjectId
 from typing import Optional
@@ -9,67 +10,115 @@ from video_data import VIDEO_DATABASE
 from datetime import datetime
 from schemas.image import get_categories
 from fastapi import APIRouter, HTTPException, UploadFile
-from video_processor import VideoProcessor
+from warmup import import_timer
+from upload_ingest import stream_upload_to_file, MAX_VIDEO_BYTES
+from search import search_collection, escape_search_term, DEFAULT_PAGE_SIZE
+import asyncio
 import os
-video_processor = VideoProcessor(os.getenv("GOOGLE_API_KEY"))
+import threading
+from pathlib import Path
 router = APIRouter()
 from fastapi.encoders import jsonable_encoder
 
-# Upload and analyze a product video for listing generation.
+# The video stack (cv2, librosa, FFmpeg, wav2vec2) is created on first use
+_video_processor = None
+_video_processor_lock = threading.Lock()
+
+def get_video_processor():
+    global _video_processor
+    if _video_processor is None:
+        with _video_processor_lock:
+            if _video_processor is None:
+                with import_timer("video_processor"):
+                    from main import video_stage_cache
+                    from video_processor import VideoProcessor
+                    _video_processor = VideoProcessor(os.getenv("GOOGLE_API_KEY"), cache=video_stage_cache)
+    return _video_processor
+
+def warm_up_video_stack():
+    """Preload the video processor and its speech model"""
+    get_video_processor().load_audio_models()
+
+def transcription_stats():
+    """Micro-batching metrics for the shared speech model, without loading the video stack"""
+    if _video_processor is None:
+        return {"loaded": False}
+    return _video_processor.transcriber.stats()
+
+def frame_selection_stats():
+    """How many frames were dropped before frame analysis and the model calls that saved"""
+    if _video_processor is None:
+        return {"loaded": False}
+    return _video_processor.frame_selector.stats()
+
+# Store the analysis of an uploaded video as a Video and its VideoListing.
+async def store_video_analysis(raw_response: dict, title: str):
+    from main import db
+
+    unique_id = f"video_{abs(hash(title))}"[:15]
+    analysis = VideoAnalysis.model_validate(raw_response)
+
+    video_data = analysis.to_video(title, id=unique_id).model_dump()
+
+    video = await db["videos"].insert_one(video_data)
+    video_id = str(video.inserted_id)
+
+    video_listing_data = analysis.to_video_listing(video_id, title, rating=4.8).model_dump()
+
+    await db["video_listings"].insert_one(video_listing_data)
+
+    # Ensure ObjectId fields are serialized before returning the response
+    video_data["_id"] = str(video_data.get("_id"))
+    video_listing_data["_id"] = str(video_listing_data.get("_id"))
+
+    return jsonable_encoder({
+        "status": "success",
+        "message": "Video analyzed successfully",
+        "video_info": video_data,
+        "video_listing": video_listing_data,
+    })
+
+# Background job handler: run the video pipeline and store its result.
+async def run_video_job(job: dict, progress):
+    video_processor = await asyncio.to_thread(get_video_processor)
+    raw_response = await video_processor.process_video_path(
+        job["video_path"], progress, content_hash=job["params"].get("content_hash")
+    )
+    if raw_response.get("status") == "error":
+        raise RuntimeError(raw_response.get("message", "Video analysis failed"))
+
+    await progress("storing", "running")
+    result = await store_video_analysis(raw_response, job["params"]["title"])
+    await progress("storing", "done")
+    return result
+
+# Upload a product video and queue it for analysis.
 async def upload_video(
     file: Optional[UploadFile] = File(None),  # Made file optional
     title: str = Form(...),
     description: Optional[str] = Form(None)
 ):
     from main import logger
-    from main import db
+    from main import db, video_job_queue
     try:
-        raw_response = await video_processor.process_video(file)
-
-        if raw_response:
-            unique_id = f"video_{abs(hash(title))}"[:15]
-
-            video_data = Video(
-                id=unique_id,
-                title=title,
-                category=raw_response.get("category", "N/A"),
-                subcategory=raw_response.get("subcategory", "N/A"),
-                duration=raw_response.get("duration", "N/A"),
-                views=raw_response.get("views", "N/A"),
-                highlights=raw_response.get("highlights", []),
-                transcript_summary=raw_response.get("description", "N/A"),
-                key_features=raw_response.get("key_features", []),
-                price_range=raw_response.get("price", "N/A"),
-            ).model_dump()
-
-            video = await db["videos"].insert_one(video_data)
-            video_id = str(video.inserted_id)
-
-            video_listing_data = VideoListing(
-                video_id=video_id,
-                platform=raw_response.get("platform", "N/A"),
-                title=title,
-                views=raw_response.get("views", "N/A"),
-                rating=4.8,
-                key_timestamps={},
-                product_links=[
-                    ProductLink(store=link.get("store", "Unknown"), price=link.get("price", "Not Available"))
-                    for link in raw_response.get("product_links", [])
-                ],
-            ).model_dump()
-
-            await db["video_listings"].insert_one(video_listing_data)
+        if file is not None and file.filename:
+            job_id = video_job_queue.new_job_id()
+            video_path = video_job_queue.new_upload_path(job_id, Path(file.filename).suffix or ".mp4")
+            upload = await stream_upload_to_file(file, video_path, MAX_VIDEO_BYTES)
+            await video_job_queue.enqueue(job_id, video_path, {
+                "title": title,
+                "description": description,
+                "content_hash": upload.sha256,
+                "size": upload.size,
+            })
 
-            # Ensure ObjectId fields are serialized before returning the response
-            video_data["_id"] = str(video_data.get("_id"))
-            video_listing_data["_id"] = str(video_listing_data.get("_id"))
+            return {
+                "status": "queued",
+                "message": "Video queued for analysis",
+                "job_id": job_id,
+                "status_url": f"/upload/video/jobs/{job_id}",
+            }
 
-            return jsonable_encoder({
-                "status": "success",
-                "message": "Video analyzed successfully",
-                "video_info": video_data,
-                "video_listing": video_listing_data,
-            })
         # Common keywords for each category
         category_keywords = {
             "electronics": ["iphone", "macbook", "samsung", "laptop", "phone", "computer", "tech"],
@@ -254,6 +303,8 @@ async def upload_video(
             "video_listing": video_listing_data,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing video request: {str(e)}")
         return {
@@ -261,16 +312,36 @@ async def upload_video(
             "message": str(e)
         }
 
+# Get the status and per-stage progress of a queued video analysis.
+async def get_video_job(job_id: str):
+    from main import video_job_queue
+
+    job = await video_job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Video job not found")
+
+    return jsonable_encoder({
+        "status": "success",
+        "job_id": job["_id"],
+        "job_status": job["status"],
+        "progress": job["progress"],
+        "stages": job["stages"],
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    })
+
 # Search for product videos by title.
-async def search_videos(title: str):
+async def search_videos(title: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE):
     from main import db
     results = []
     search_term = title.lower()
     
-    # Fetching videos from the database
-    video_cursor = db["videos"].find({"title": {"$regex": search_term, "$options": "i"}})
+    # Fetching videos from the database, ranked by text relevance
+    videos = await search_collection(db["videos"], search_term, page, page_size)
     
-    async for video in video_cursor:
+    for video in videos:
         video["id"] = str(video["_id"])  # Convert ObjectId to string
 
         try:
@@ -373,7 +444,7 @@ async def get_comparable_videos(video_id: str, limit: int = 3):
     # Build the query to find comparable videos
     query = {
         "$or": [
-            {"title": {"$regex": target_video["title"], "$options": "i"}},
+            {"title": {"$regex": escape_search_term(target_video["title"]), "$options": "i"}},
             {"category": target_video.get("category")},
             {"subcategory": target_video.get("subcategory")},
             {"duration": target_video.get("duration")},
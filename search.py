@@ -0,0 +1,167 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import IndexModel, TEXT
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# MongoDB error code returned by $text when the collection has no text index
+INDEX_NOT_FOUND = 27
+
+# One weighted text index per searchable collection (MongoDB allows only one)
+TEXT_INDEXES = {
+    "products": {
+        "name": "products_text_search",
+        "weights": {"title": 10, "category": 5, "subcategory": 5, "features": 2},
+    },
+    "listings": {
+        "name": "listings_text_search",
+        "weights": {"title": 10, "features": 2, "description": 1},
+    },
+    "videos": {
+        "name": "videos_text_search",
+        "weights": {"title": 10, "category": 5, "subcategory": 5, "key_features": 2,
+                    "highlights": 1, "transcript_summary": 1},
+    },
+}
+
+
+def text_index_model(collection_name: str) -> IndexModel:
+    spec = TEXT_INDEXES[collection_name]
+    return IndexModel(
+        [(field, TEXT) for field in spec["weights"]],
+        name=spec["name"],
+        weights=spec["weights"],
+        default_language="english",
+    )
+
+
+def escape_search_term(term: str) -> str:
+    """Escape user input so it is matched literally when used in a $regex"""
+    return re.escape(term.strip())
+
+
+def text_search_term(term: str) -> str:
+    """
+    Make user input match as plain words in a $text query.
+
+    $text reads a leading ``-`` as negation and ``"..."`` as a phrase, so
+    ``-phone`` would exclude phones instead of finding them. Quotes and
+    leading hyphens are dropped; hyphens inside a word are kept.
+    """
+    words = (word.lstrip("-") for word in term.replace('"', " ").split())
+    return " ".join(word for word in words if word)
+
+
+def clamp_page(page: int, page_size: int):
+    page = max(1, page)
+    page_size = min(max(1, page_size), MAX_PAGE_SIZE)
+    return page, page_size
+
+
+async def ensure_text_indexes(db):
+    """Create the weighted text indexes, replacing any older text index on the same collection"""
+    for collection_name, spec in TEXT_INDEXES.items():
+        collection = db[collection_name]
+        try:
+            existing = await collection.index_information()
+            for name, info in existing.items():
+                is_text = any(kind == "text" for _, kind in info.get("key", []))
+                if is_text and name != spec["name"]:
+                    logger.info(f"Replacing text index {name} on {collection_name}")
+                    await collection.drop_index(name)
+            if spec["name"] not in existing:
+                await collection.create_indexes([text_index_model(collection_name)])
+        except Exception as e:
+            logger.error(f"Failed to ensure text index on {collection_name}: {e}")
+
+
+async def search_collection(collection, term: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE,
+                            projection: Optional[Dict] = None) -> List[Dict]:
+    """Relevance-ranked search over a collection's text index, one page at a time"""
+    page, page_size = clamp_page(page, page_size)
+    return await search_collection_range(collection, term, (page - 1) * page_size, page_size, projection)
+
+
+async def search_collection_range(collection, term: str, skip: int, limit: int,
+                                  projection: Optional[Dict] = None) -> List[Dict]:
+    """
+    Return up to ``limit`` matches starting at offset ``skip``, best first.
+
+    Text matches carry their relevance in ``score``. Falls back to a literal
+    (escaped) case-insensitive title match only when the text index is
+    missing; that is a collection scan, so a query with no text matches just
+    returns nothing.
+    """
+    skip = max(0, skip)
+    limit = min(max(1, limit), MAX_PAGE_SIZE)
+
+    text_projection = dict(projection or {})
+    text_projection["score"] = {"$meta": "textScore"}
+    try:
+        cursor = (
+            collection.find({"$text": {"$search": text_search_term(term)}}, text_projection)
+            .sort([("score", {"$meta": "textScore"})])
+            .skip(skip)
+            .limit(limit)
+        )
+        return await cursor.to_list(length=limit)
+    except OperationFailure as e:
+        if e.code != INDEX_NOT_FOUND:
+            raise
+        logger.warning(f"No text index on {collection.name}, using escaped regex search")
+
+    cursor = (
+        collection.find({"title": {"$regex": escape_search_term(term), "$options": "i"}}, projection)
+        .skip(skip)
+        .limit(limit)
+    )
+    return await cursor.to_list(length=limit)
+
+
+async def search_collection_after(collection, term: str, after: Optional[Tuple[Optional[float], Any]], limit: int,
+                                  projection: Optional[Dict] = None) -> List[Dict]:
+    """
+    Return up to ``limit`` matches ranked after ``after``, best first.
+
+    Results are ordered by (score desc, _id asc) and ``after`` is the
+    (score, _id) of the last result already returned, so a deep page does not
+    skip over everything before it and documents inserted meanwhile do not
+    shift the pages. Without a text index it falls back to the escaped title
+    regex, ordered by _id.
+    """
+    limit = min(max(1, limit), MAX_PAGE_SIZE)
+    after_score, after_id = after if after is not None else (None, None)
+
+    pipeline = [
+        {"$match": {"$text": {"$search": text_search_term(term)}}},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if after_id is not None:
+        if after_score is None:
+            pipeline.append({"$match": {"_id": {"$gt": after_id}}})
+        else:
+            pipeline.append({"$match": {"$or": [
+                {"score": {"$lt": after_score}},
+                {"score": after_score, "_id": {"$gt": after_id}},
+            ]}})
+    pipeline += [{"$sort": {"score": -1, "_id": 1}}, {"$limit": limit}]
+    if projection:
+        pipeline.append({"$project": {**projection, "score": 1}})
+    try:
+        return await collection.aggregate(pipeline).to_list(length=limit)
+    except OperationFailure as e:
+        if e.code != INDEX_NOT_FOUND:
+            raise
+        logger.warning(f"No text index on {collection.name}, using escaped regex search")
+
+    query = {"title": {"$regex": escape_search_term(term), "$options": "i"}}
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+    cursor = collection.find(query, projection).sort([("_id", 1)]).limit(limit)
+    return await cursor.to_list(length=limit)
@@ -0,0 +1,180 @@
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Type
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# torch: fp32 PyTorch, int8: dynamically quantized PyTorch, onnx: ONNX Runtime
+SPEECH_BACKEND = os.getenv("SPEECH_BACKEND", "torch")
+SPEECH_MODEL_NAME = os.getenv("SPEECH_MODEL_NAME", "facebook/wav2vec2-base-960h")
+SPEECH_ONNX_DIR = Path(os.getenv("SPEECH_ONNX_DIR", "temp/onnx"))
+SAMPLE_RATE = 16000
+
+
+class SpeechBackend(ABC):
+    """
+    A CTC speech model behind a small interface: load it, turn a batch of
+    equal-length 16 kHz windows into greedy token ids, and decode ids to text.
+
+    Subclasses only differ in how the acoustic model runs; all of them share
+    the Hugging Face processor for feature normalization and decoding.
+    """
+
+    name = "base"
+
+    def __init__(self, model_name: str, num_threads: int = 0):
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self.processor = None
+        self.model = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    @abstractmethod
+    def load(self):
+        ...
+
+    @abstractmethod
+    def predict_ids(self, batch: List[np.ndarray]) -> np.ndarray:
+        """Greedy CTC ids for a batch of equal-length windows, shape (batch, frames)"""
+
+    def decode(self, ids: np.ndarray) -> str:
+        return self.processor.decode(ids)
+
+    @property
+    def word_delimiter_id(self) -> Optional[int]:
+        tokenizer = getattr(self.processor, "tokenizer", None)
+        return getattr(tokenizer, "word_delimiter_token_id", None)
+
+    def _load_processor(self):
+        from transformers import Wav2Vec2Processor
+        self.processor = Wav2Vec2Processor.from_pretrained(self.model_name)
+
+
+class TorchBackend(SpeechBackend):
+    """The reference fp32 PyTorch model"""
+
+    name = "torch"
+
+    def _load_torch_model(self):
+        import torch
+        from transformers import Wav2Vec2ForCTC
+        if self.num_threads > 0:
+            torch.set_num_threads(self.num_threads)
+        model = Wav2Vec2ForCTC.from_pretrained(self.model_name)
+        model.eval()
+        return model
+
+    def load(self):
+        self._load_processor()
+        self.model = self._load_torch_model()
+
+    def predict_ids(self, batch):
+        import torch
+        inputs = self.processor(batch, sampling_rate=SAMPLE_RATE, return_tensors="pt")
+        with torch.inference_mode():
+            logits = self.model(inputs.input_values).logits
+        return torch.argmax(logits, dim=-1).numpy()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    PyTorch with the Linear layers dynamically quantized to int8.
+
+    The transformer blocks are almost all Linear, so this covers most of the
+    compute; the convolutional feature encoder stays fp32.
+    """
+
+    name = "int8"
+
+    def load(self):
+        import torch
+        self._load_processor()
+        model = self._load_torch_model()
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend(SpeechBackend):
+    """
+    ONNX Runtime on CPU.
+
+    The model is exported once to ``SPEECH_ONNX_DIR`` (this step needs torch)
+    and later loads only need onnxruntime.
+    """
+
+    name = "onnx"
+    OPSET = 14
+
+    def __init__(self, model_name: str, num_threads: int = 0, onnx_dir: Path = SPEECH_ONNX_DIR):
+        super().__init__(model_name, num_threads)
+        self.onnx_path = Path(onnx_dir) / f"{model_name.replace('/', '__')}.onnx"
+
+    def export(self):
+        """
+        Export to a temporary file next to ``onnx_path`` and move it into place,
+        so an interrupted export never leaves a truncated model to be loaded.
+        """
+        self.onnx_path.parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Exporting {self.model_name} to {self.onnx_path}")
+        fd, tmp_path = tempfile.mkstemp(dir=self.onnx_path.parent, prefix=f"{self.onnx_path.stem}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            self._export_to(Path(tmp_path))
+            os.replace(tmp_path, self.onnx_path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    def _export_to(self, path: Path):
+        import torch
+        from transformers import Wav2Vec2ForCTC
+        model = Wav2Vec2ForCTC.from_pretrained(self.model_name)
+        model.eval()
+        torch.onnx.export(
+            model,
+            torch.zeros(1, SAMPLE_RATE),
+            str(path),
+            input_names=["input_values"],
+            output_names=["logits"],
+            dynamic_axes={"input_values": {0: "batch", 1: "samples"}, "logits": {0: "batch", 1: "frames"}},
+            opset_version=self.OPSET,
+        )
+
+    def load(self):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("SPEECH_BACKEND=onnx requires the onnxruntime package")
+        self._load_processor()
+        if not self.onnx_path.exists():
+            self.export()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads > 0:
+            options.intra_op_num_threads = self.num_threads
+        self.model = ort.InferenceSession(str(self.onnx_path), options, providers=["CPUExecutionProvider"])
+
+    def predict_ids(self, batch):
+        inputs = self.processor(batch, sampling_rate=SAMPLE_RATE, return_tensors="np")
+        (logits,) = self.model.run(["logits"], {"input_values": inputs.input_values.astype(np.float32)})
+        return logits.argmax(axis=-1)
+
+
+BACKENDS: Dict[str, Type[SpeechBackend]] = {
+    backend.name: backend for backend in (TorchBackend, QuantizedTorchBackend, OnnxBackend)
+}
+
+
+def create_backend(name: str = SPEECH_BACKEND, model_name: str = SPEECH_MODEL_NAME,
+                   num_threads: int = 0) -> SpeechBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown speech backend: {name}. Expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model_name, num_threads=num_threads)
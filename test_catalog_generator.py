@@ -0,0 +1,93 @@
+import json
+from collections import Counter
+
+import pytest
+
+from catalog_generator import CatalogGenerator, TAXONOMY, write_jsonl, write_mongo, write_parquet
+
+def collect(generator):
+    return {name: list(documents) for name, documents in generator.streams().items()}
+
+def without_timestamps(documents):
+    return [{k: v for k, v in d.items() if k not in ("created_at", "updated_at")} for d in documents]
+
+def test_same_seed_same_catalog():
+    first = collect(CatalogGenerator(products=50, videos=10, seed=7))
+    second = collect(CatalogGenerator(products=50, videos=10, seed=7))
+    other = collect(CatalogGenerator(products=50, videos=10, seed=8))
+    for name in first:
+        assert without_timestamps(first[name]) == without_timestamps(second[name])
+    assert without_timestamps(first["products"]) != without_timestamps(other["products"])
+
+def test_children_reference_generated_parents():
+    catalog = collect(CatalogGenerator(products=200, videos=40))
+    product_ids = {str(p["_id"]) for p in catalog["products"]}
+    video_ids = {str(v["_id"]) for v in catalog["videos"]}
+    for name in ("listings", "analytics", "reviews"):
+        assert {d["product_id"] for d in catalog[name]} <= product_ids
+    for name in ("video_listings", "video_analytics"):
+        assert [d["video_id"] for d in catalog[name]] == [str(v["_id"]) for v in catalog["videos"]]
+    assert len({d["_id"] for name in catalog for d in catalog[name]}) == sum(map(len, catalog.values()))
+
+def test_listing_and_video_match_their_product():
+    generator = CatalogGenerator(products=100, videos=20)
+    products = {str(p["_id"]): p for p in generator.product_docs()}
+    for listing in generator.listing_docs():
+        assert listing["title"] == products[listing["product_id"]]["title"]
+    for video, listing in zip(generator.video_docs(), generator.video_listing_docs()):
+        assert video["title"] == listing["title"]
+
+def test_distributions_are_skewed():
+    generator = CatalogGenerator(products=3000, videos=0, mean_reviews=8)
+    categories = Counter(p["category"] for p in generator.product_docs())
+    assert categories.most_common(1)[0][0] == list(TAXONOMY)[0]
+    assert categories.most_common()[0][1] > 3 * categories.most_common()[-1][1]
+
+    reviews = Counter(r["product_id"] for r in generator.review_docs())
+    counts = sorted(reviews.values(), reverse=True)
+    assert 6 < sum(counts) / 3000 < 10
+    # Long tail: the busiest products have many times the average
+    assert counts[0] > 10 * 8
+    ratings = Counter(r["rating"] for r in generator.review_docs())
+    assert ratings[5.0] > ratings[4.0] > ratings[3.0] and ratings[1.0] > ratings[2.0]
+
+def test_jsonl_output(tmp_path):
+    counts = write_jsonl(tmp_path, CatalogGenerator(products=20, videos=5))
+    lines = (tmp_path / "reviews.jsonl").read_text().splitlines()
+    assert counts["reviews"] == len(lines)
+    assert counts["products"] == 20
+    product = json.loads((tmp_path / "products.jsonl").read_text().splitlines()[0])
+    assert isinstance(product["_id"], str)
+
+def test_mongo_output():
+    mongomock = pytest.importorskip("mongomock")
+    db = mongomock.MongoClient().catalog_test
+    counts = write_mongo(db, CatalogGenerator(products=30, videos=6), batch_size=7)
+    assert db.products.count_documents({}) == counts["products"] == 30
+    assert db.reviews.count_documents({}) == counts["reviews"]
+    assert "video_id_1" in db.video_analytics.index_information()
+
+def test_parquet_output(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    counts = write_parquet(tmp_path, CatalogGenerator(products=20, videos=5), batch_size=8)
+    assert pq.read_table(tmp_path / "listings.parquet").num_rows == counts["listings"]
+    assert pq.read_table(tmp_path / "video_listings.parquet").num_rows == 5
+
+@pytest.mark.asyncio
+async def test_seeded_catalog_serves_recommendations():
+    mongomock = pytest.importorskip("mongomock")
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from recommendations import NO_RECOMMENDATIONS, fetch_recommendations
+
+    client = mongomock.MongoClient()
+    generator = CatalogGenerator(products=200, videos=0)
+    write_mongo(client.catalog_test, generator)
+    products = mongomock_motor.AsyncMongoMockClient(mock_mongo_client=client).catalog_test.products
+
+    profile = generator.profile(0)
+    recommendations = await fetch_recommendations(products, {
+        "category": profile.category, "subcategory": profile.subcategory, "key_features": profile.features[:1],
+    })
+    assert recommendations != NO_RECOMMENDATIONS
+    assert profile.title in [r["name"] for r in recommendations]
+    assert all(profile.features[0] in r["features"] for r in recommendations)
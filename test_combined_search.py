@@ -0,0 +1,66 @@
+import os
+import pytest
+
+os.environ.setdefault("GOOGLE_API_KEY", "test_key")
+import main  # noqa: F401,E402  (schemas import their collections from main)
+from fastapi import HTTPException
+from schemas.combined import encode_cursor, decode_cursor, merge_ranked, normalise_scores, search_all_content
+
+def docs(prefix, scores):
+    return [{"_id": f"{prefix}{i}", "title": f"{prefix}{i}", "score": score} for i, score in enumerate(scores)]
+
+def keyset(source, after, limit):
+    ranked = sorted(source, key=lambda doc: (-doc["score"], doc["_id"]))
+    if after is not None:
+        score, last_id = after
+        ranked = [doc for doc in ranked if (-doc["score"], doc["_id"]) > (-score, last_id)]
+    return [dict(doc) for doc in ranked[:limit]]
+
+def test_cursor_round_trip():
+    product_state = {"score": 1.5, "id": "p3", "top": 9.0}
+    assert decode_cursor(encode_cursor(product_state, None)) == (product_state, None)
+    assert decode_cursor(None) == (None, None)
+
+def test_invalid_cursor_rejected():
+    with pytest.raises(HTTPException):
+        decode_cursor("not-a-cursor")
+    with pytest.raises(HTTPException):
+        decode_cursor(encode_cursor({"score": "high", "id": "p3", "top": 9.0}, None))
+
+def test_merge_ranked_by_normalised_score():
+    products = normalise_scores(docs("p", [10, 5]), 10)
+    videos = normalise_scores(docs("v", [2, 1.8]), 2)
+    merged, products_used, videos_used = merge_ranked(products, videos, 3)
+    assert [item["_id"] for _, item in merged] == ["p0", "v0", "v1"]
+    assert (products_used, videos_used) == (1, 2)
+
+@pytest.fixture
+def collections(monkeypatch):
+    sources = {"products": docs("p", [9, 7, 5, 3]), "videos": docs("v", [0.8, 0.6])}
+
+    async def fake_after(collection, term, after, limit, projection=None):
+        return keyset(sources[collection], after, limit)
+
+    monkeypatch.setattr("schemas.combined.search_collection_after", fake_after)
+    monkeypatch.setattr("main.product_collection", "products")
+    monkeypatch.setattr("main.video_collection", "videos")
+    return sources
+
+@pytest.mark.asyncio
+async def test_pagination_walks_both_collections(collections):
+    seen, cursor = [], None
+    while True:
+        page = await search_all_content("term", limit=2, cursor=cursor)
+        seen.extend(item["id"] for item in page["ranked"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    # Videos score on a different scale, so they interleave by relevance rather than raw score
+    assert seen == ["p0", "v0", "p1", "v1", "p2", "p3"]
+
+@pytest.mark.asyncio
+async def test_inserts_do_not_shift_later_pages(collections):
+    first = await search_all_content("term", limit=2)
+    collections["products"].append({"_id": "p9", "title": "p9", "score": 10})
+    second = await search_all_content("term", limit=2, cursor=first["next_cursor"])
+    assert [item["id"] for item in first["ranked"] + second["ranked"]] == ["p0", "v0", "p1", "v1"]
@@ -0,0 +1,58 @@
+import pytest
+from bson import ObjectId
+
+import database_setup
+from image_data import sample_products, product_reviews
+from video_data import sample_videos
+
+mongomock = pytest.importorskip("mongomock")
+
+@pytest.fixture
+def client(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(client, "close", lambda: None)
+    monkeypatch.setattr(database_setup, "connect_to_mongodb", lambda: client)
+    return client
+
+def test_seed_resolves_parents_without_querying_them(client, monkeypatch):
+    lookups = []
+    find_one = mongomock.Collection.find_one
+    monkeypatch.setattr(mongomock.Collection, "find_one",
+                        lambda self, *args, **kwargs: lookups.append(self.name) or find_one(self, *args, **kwargs))
+
+    counts = database_setup.setup_product_database(scale=1, batch_size=3, db_name="seed_test")
+
+    assert lookups == []
+    db = client.seed_test
+    assert counts["products"] == len(sample_products) == db.products.count_documents({})
+    assert counts["reviews"] == len(product_reviews)
+    product_ids = {str(p["_id"]) for p in db.products.find({}, {"_id": 1})}
+    video_ids = {str(v["_id"]) for v in db.videos.find({}, {"_id": 1})}
+    for name, parents in [("listings", product_ids), ("analytics", product_ids), ("reviews", product_ids)]:
+        assert {doc["product_id"] for doc in db[name].find()} <= parents
+    for name in ("video_listings", "video_analytics"):
+        assert {doc["video_id"] for doc in db[name].find()} <= video_ids
+
+def test_scale_replicates_the_catalog_with_distinct_titles(client):
+    counts = database_setup.setup_product_database(scale=3, db_name="seed_test")
+    base = database_setup.setup_product_database(scale=1, db_name="seed_base")
+
+    assert all(counts[name] == 3 * base[name] for name in base)
+    db = client.seed_test
+    assert len(db.videos.distinct("title")) == 3 * len(sample_videos)
+    title = sample_products[0].title
+    product = db.products.find_one({"title": f"{title} #2"})
+    assert db.listings.find_one({"product_id": str(product["_id"])})["title"] == f"{title} #2"
+
+def test_reseeding_replaces_the_data(client):
+    database_setup.setup_product_database(scale=2, db_name="seed_test")
+    database_setup.setup_product_database(scale=1, db_name="seed_test")
+    assert client.seed_test.products.count_documents({}) == len(sample_products)
+    assert "products_text_search" in client.seed_test.products.index_information()
+
+def test_insert_stream_maps_keys_to_inserted_ids(client):
+    inserted, ids = database_setup.insert_stream(
+        client.seed_test.items, ({"title": f"t{i}"} for i in range(7)), key="title", batch_size=2)
+    assert inserted == 7
+    assert isinstance(ids["t6"], ObjectId)
+    assert client.seed_test.items.find_one({"_id": ids["t6"]})["title"] == "t6"
@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+import frame_sampler
+from frame_sampler import FrameSampler, _evenly_spaced
+
+
+@pytest.fixture
+def numbered_video(tmp_path):
+    """A 90-frame video whose frame i is filled with gray level 2 * i"""
+    path = tmp_path / "numbered.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30, (32, 32))
+    for i in range(90):
+        writer.write(np.full((32, 32, 3), 2 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def frame_index(image):
+    return round(np.asarray(image).mean() / 2)
+
+
+def test_evenly_spaced():
+    assert _evenly_spaced(list(range(10)), 3) == [0, 4, 9]
+    assert _evenly_spaced([1, 2], 5) == [1, 2]
+
+
+def test_sequential_samples_whole_video_without_seeking(numbered_video):
+    sampler = FrameSampler("ffmpeg", strategy="sequential")
+    with patch.object(cv2.VideoCapture, "set") as mock_set:
+        frames = sampler.sample(numbered_video, num_frames=5)
+    mock_set.assert_not_called()
+
+    indices = [frame_index(frame) for frame in frames]
+    assert len(indices) == 5
+    assert indices == sorted(indices)
+    # Spread over the whole video despite the bounded buffer
+    assert indices[0] == 0
+    assert indices[-1] >= 60
+
+
+def test_ffmpeg_strategy_falls_back_to_sequential(numbered_video):
+    sampler = FrameSampler("ffmpeg", strategy="keyframe")
+    with patch.object(sampler, "sample_keyframes", return_value=[]):
+        frames = sampler.sample(numbered_video, num_frames=3)
+    assert len(frames) == 3
+
+
+def test_unknown_strategy_rejected():
+    with pytest.raises(ValueError):
+        FrameSampler("ffmpeg", strategy="random")
+
+
+
+def fake_capture(total, failing=()):
+    """A VideoCapture stand-in whose frame i is 2560 px wide with value i; retrieve fails on ``failing``"""
+    class FakeCapture:
+        def __init__(self, path):
+            self.position = -1
+
+        def grab(self):
+            self.position += 1
+            return self.position < total
+
+        def retrieve(self):
+            if self.position in failing:
+                return False, None
+            return True, np.full((20, 2560, 3), self.position, dtype=np.uint8)
+
+        def release(self):
+            pass
+    return FakeCapture
+
+
+def sampled_positions(total, failing=()):
+    with patch("frame_sampler.cv2.VideoCapture", fake_capture(total, failing)):
+        images = FrameSampler("ffmpeg").sample_sequential("video.mp4", num_frames=4)
+    assert all(image.size == (1280, 10) for image in images)
+    return [int(np.asarray(image)[0, 0, 0]) for image in images]
+
+
+def test_sequential_downscales_each_frame_before_buffering():
+    buffered = []
+    real_downscale = frame_sampler._downscale
+    with patch("frame_sampler._downscale", side_effect=lambda f: buffered.append(f.shape) or real_downscale(f)):
+        sampled_positions(100)
+    # Every retrieved frame is downscaled on the way in, and only a bounded number are retrieved
+    assert buffered and all(shape == (20, 2560, 3) for shape in buffered)
+    assert len(buffered) < 30
+
+
+def test_failed_retrieve_does_not_shift_the_stride():
+    assert sampled_positions(100) == [0, 32, 64, 96]
+    # A failed frame's slot is taken by the next one, so the spacing stays even
+    positions = sampled_positions(100, failing={0, 16})
+    assert positions == [1, 33, 65, 97]
+    assert len({b - a for a, b in zip(positions, positions[1:])}) == 1
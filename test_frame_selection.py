@@ -0,0 +1,66 @@
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+from frame_selection import FrameSelector, hamming, phash, sharpness
+
+
+def scene(seed, size=(160, 120)):
+    """A blocky synthetic 'product shot' that is distinct per seed"""
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(blocks).resize(size, Image.NEAREST)
+
+
+def test_phash_tolerates_small_changes_but_separates_scenes():
+    base = scene(1)
+    brighter = ImageEnhance.Brightness(base).enhance(1.1)
+    rescaled = base.resize((320, 240), Image.BILINEAR)
+
+    assert hamming(phash(base), phash(brighter)) <= 6
+    assert hamming(phash(base), phash(rescaled)) <= 6
+    assert hamming(phash(base), phash(scene(2))) > 15
+
+
+def test_sharpness_detects_blur():
+    base = scene(3)
+    assert sharpness(base.filter(ImageFilter.GaussianBlur(4))) < 0.2 * sharpness(base)
+
+
+def test_near_duplicates_are_dropped_and_savings_recorded():
+    selector = FrameSelector()
+    static = scene(4)
+    frames = [static, ImageEnhance.Brightness(static).enhance(1.05), static.copy(), scene(5)]
+
+    selection = selector.select(frames, budget=3)
+
+    assert len(selection.frames) == 2
+    assert selection.duplicates == 2
+    assert 3 in selection.indices
+    assert selector.stats()["model_calls_saved"] == 1
+
+
+def test_blurry_frames_are_dropped():
+    selector = FrameSelector()
+    frames = [scene(6), scene(7).filter(ImageFilter.GaussianBlur(5)), scene(8)]
+
+    selection = selector.select(frames, budget=3)
+
+    assert selection.indices == [0, 2]
+    assert selection.blurry == 1
+
+
+def test_budget_keeps_distinct_frames_in_temporal_order():
+    selector = FrameSelector()
+    frames = [scene(seed) for seed in range(10, 18)]
+
+    selection = selector.select(frames, budget=3)
+
+    assert len(selection.frames) == 3
+    assert selection.indices == sorted(selection.indices)
+    assert selector.stats()["model_calls_saved"] == 0
+
+
+def test_uniform_frames_keep_one():
+    selector = FrameSelector()
+    frames = [Image.new("RGB", (64, 64), (128, 128, 128)) for _ in range(5)]
+    assert len(selector.select(frames, budget=3).frames) == 1
@@ -0,0 +1,44 @@
+import pytest
+from conftest import FakeModelClient, images
+
+def block(number, name):
+    return f"""BEGIN_ANALYSIS {number}
+Product Name: {name}
+Category: Electronics
+Subcategory: Audio
+Description: A product.
+Price: $10
+Key Features:
+- Feature A
+Search Keywords:
+- keyword
+END_ANALYSIS {number}"""
+
+SINGLE = """BEGIN_ANALYSIS
+Product Name: Single
+Category: Electronics
+END_ANALYSIS"""
+
+@pytest.mark.asyncio
+async def test_batch_uses_one_call(processor):
+    processor.model_client = FakeModelClient("\n".join(block(i, f"Item {i}") for i in (1, 2, 3)), SINGLE)
+    results = await processor.analyze_products(images(3))
+    assert processor.model_client.calls == [3]
+    assert [r["product_name"] for r in results] == ["Item 1", "Item 2", "Item 3"]
+    assert all(r["status"] == "success" for r in results)
+
+@pytest.mark.asyncio
+async def test_unparseable_batch_falls_back_to_single_calls(processor):
+    processor.model_client = FakeModelClient(block(1, "Only one"), SINGLE)
+    results = await processor.analyze_products(images(2))
+    assert processor.model_client.calls == [2, 1, 1]
+    assert [r["product_name"] for r in results] == ["Single", "Single"]
+
+@pytest.mark.asyncio
+async def test_cached_images_are_not_resent(processor):
+    processor.model_client = FakeModelClient("\n".join(block(i, f"Item {i}") for i in (1, 2)), SINGLE)
+    batch = images(2)
+    await processor.analyze_products(batch)
+    results = await processor.analyze_products(batch)
+    assert processor.model_client.calls == [2]
+    assert [r["product_name"] for r in results] == ["Item 1", "Item 2"]
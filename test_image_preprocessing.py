@@ -0,0 +1,56 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from image_preprocessing import ImagePreprocessor, normalize_image
+
+
+def test_large_image_is_downscaled_and_reencoded():
+    preprocessor = ImagePreprocessor(max_edge=512, fmt="JPEG", quality=80)
+    prepared = preprocessor.prepare_sync(Image.new("RGB", (4000, 3000), (200, 30, 30)))
+
+    assert (prepared.width, prepared.height) == (512, 384)
+    assert prepared.part["mime_type"] == "image/jpeg"
+    decoded = Image.open(io.BytesIO(prepared.part["data"]))
+    assert decoded.format == "JPEG"
+    assert decoded.size == (512, 384)
+    stats = preprocessor.stats()
+    assert stats["images"] == 1 and stats["resized"] == 1
+    assert stats["encoded_bytes_out"] == prepared.encoded_bytes
+
+
+def test_exif_orientation_is_applied():
+    image = Image.new("RGB", (300, 100))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise on display
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", exif=exif)
+    buffer.seek(0)
+
+    assert normalize_image(Image.open(buffer), max_edge=1000).size == (100, 300)
+
+
+def test_transparency_is_flattened_onto_white():
+    image = Image.new("RGBA", (10, 10), (0, 0, 0, 0))
+    flattened = normalize_image(image)
+    assert flattened.mode == "RGB"
+    assert flattened.getpixel((5, 5)) == (255, 255, 255)
+
+
+def test_webp_output():
+    preprocessor = ImagePreprocessor(fmt="WEBP")
+    prepared = asyncio.run(preprocessor.prepare(Image.new("RGB", (64, 64))))
+    assert prepared.part["mime_type"] == "image/webp"
+    assert Image.open(io.BytesIO(prepared.part["data"])).format == "WEBP"
+
+
+def test_disabled_passes_the_original_through():
+    image = Image.new("RGB", (64, 64))
+    assert asyncio.run(ImagePreprocessor(enabled=False).to_part(image)) is image
+
+
+def test_unknown_format_rejected():
+    with pytest.raises(ValueError):
+        ImagePreprocessor(fmt="GIF")
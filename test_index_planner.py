@@ -0,0 +1,74 @@
+import pytest
+from pymongo import ASCENDING
+
+from index_planner import QueryShape, apply_plan, collection_report, plan_indexes
+from search import text_index_model
+
+mongomock = pytest.importorskip("mongomock")
+
+def names(plan, collection):
+    return [planned.name for planned in plan.indexes[collection]]
+
+def test_plan_folds_prefixes_and_skips_id_lookups():
+    plan = plan_indexes()
+    assert names(plan, "products") == ["category_1_subcategory_1", "products_text_search"]
+    assert names(plan, "listings") == ["product_id_1_created_at_-1", "listings_text_search"]
+    assert names(plan, "reviews") == ["product_id_1"]
+    assert [p.unique for p in plan.indexes["video_analytics"]] == [True]
+
+def test_fields_missing_from_the_model_are_reported_not_indexed():
+    plan = plan_indexes()
+    reasons = {skip["source"]: skip["reason"] for skip in plan.skipped}
+    assert reasons["schemas/image.py:get_product_recommendations"] == "product_id not in stored documents"
+    assert "schemas/image.py:get_comparable_products" in reasons
+
+def test_unique_index_is_not_folded_into_a_wider_one():
+    plan = plan_indexes([
+        QueryShape("analytics", "a", equality=("product_id",), unique=True),
+        QueryShape("analytics", "b", equality=("product_id",), sort=(("created_at", -1),)),
+    ])
+    assert names(plan, "analytics") == ["product_id_1", "product_id_1_created_at_-1"]
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().planner_test
+    db["listings"].insert_many([
+        {"product_id": str(i), "title": f"Lamp {i}", "price": "$10", "description": "Warm light",
+         "features": ["Dimmable", "USB-C", "Brass"], "created_at": "2024-01-01"}
+        for i in range(20)
+    ])
+    # A few of the indexes the old setup script created
+    listings = db["listings"]
+    listings.create_index([("id", ASCENDING), ("product_id", ASCENDING)])
+    listings.create_index([("product_id", ASCENDING), ("created_at", ASCENDING)])
+    listings.create_index([("features", ASCENDING), ("title", ASCENDING)])
+    listings.create_index([("features", ASCENDING)], name="features_index")
+    listings.create_index([("title", ASCENDING)])
+    listings.create_indexes([text_index_model("listings")])
+    db["analytics"].create_index([("product_id", ASCENDING)])
+    return db
+
+def test_apply_plan_converges_and_is_idempotent(db):
+    plan = plan_indexes()
+    changes = apply_plan(db, plan)
+
+    assert changes["listings"]["kept"] == ["listings_text_search"]
+    assert changes["listings"]["created"] == ["product_id_1_created_at_-1"]
+    assert set(changes["listings"]["dropped"]) == {
+        "id_1_product_id_1", "product_id_1_created_at_1", "features_1_title_1", "features_index", "title_1"}
+    # Same name, missing the unique option: replaced
+    assert changes["analytics"]["dropped"] == ["product_id_1"]
+    assert db["analytics"].index_information()["product_id_1"]["unique"]
+
+    again = apply_plan(db, plan)
+    assert all(not change["created"] and not change["dropped"] for change in again.values())
+
+def test_report_shows_fewer_index_writes_after_applying(db):
+    before = collection_report(db, "listings")
+    apply_plan(db)
+    after = collection_report(db, "listings")
+
+    assert (before["indexes"], after["indexes"]) == (7, 3)
+    # The features indexes are multikey: one entry per feature, per index
+    assert after["writes_per_insert"] < before["writes_per_insert"] - 6
+    assert after["estimated_index_bytes"] < before["estimated_index_bytes"]
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+
+from inference_scheduler import MicroBatchScheduler
+
+
+def test_full_batches_go_out_without_waiting():
+    seen = []
+
+    def run_batch(items):
+        seen.append(list(items))
+        return [item * 2 for item in items]
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=4, max_wait_ms=5000)
+
+    async def run():
+        start = time.perf_counter()
+        results = await scheduler.submit_many(list(range(8)))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+    assert results == [i * 2 for i in range(8)]
+    assert seen == [[0, 1, 2, 3], [4, 5, 6, 7]]
+    assert elapsed < 1
+
+
+def test_partial_batch_flushes_at_deadline():
+    scheduler = MicroBatchScheduler(lambda items: items, max_batch_size=16, max_wait_ms=30)
+
+    async def run():
+        return await asyncio.gather(scheduler.submit("a"), scheduler.submit("b"))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    stats = scheduler.stats()
+    assert stats["batches"] == 1
+    assert stats["batch_size_histogram"] == {"2": 1}
+    assert stats["queue_latency_ms"]["max"] >= 25
+
+
+def test_late_arrivals_join_the_open_batch():
+    seen = []
+    scheduler = MicroBatchScheduler(lambda items: seen.append(len(items)) or items, max_batch_size=8, max_wait_ms=100)
+
+    async def late(item):
+        await asyncio.sleep(0.02)
+        return await scheduler.submit(item)
+
+    async def run():
+        return await asyncio.gather(scheduler.submit(1), late(2), late(3))
+
+    assert asyncio.run(run()) == [1, 2, 3]
+    assert seen == [3]
+
+
+def test_batch_failure_reaches_every_caller():
+    def run_batch(items):
+        raise RuntimeError("model exploded")
+
+    scheduler = MicroBatchScheduler(run_batch, max_batch_size=4, max_wait_ms=10)
+
+    async def run():
+        return await asyncio.gather(scheduler.submit(1), scheduler.submit(2), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert scheduler.stats()["failures"] == 1
+
+
+def test_scheduler_survives_a_new_event_loop():
+    scheduler = MicroBatchScheduler(lambda items: items, max_batch_size=2, max_wait_ms=5)
+    assert asyncio.run(scheduler.submit(1)) == 1
+    assert asyncio.run(scheduler.submit(2)) == 2
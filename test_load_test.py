@@ -0,0 +1,60 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.load_test import fake_instance, fake_text, percentile, plan_requests, parse_mix
+from catalog_generator import CatalogGenerator
+from image_processor import IMAGE_ANALYSIS_SCHEMA
+from models.analysis import ProductAnalysis, ProductAnalysisBatch
+from response_parser import gemini_schema
+
+def test_fake_batch_response_has_one_analysis_per_image():
+    batch = ProductAnalysisBatch.model_validate(fake_instance(gemini_schema(ProductAnalysisBatch), images=3))
+    assert [a.image_number for a in batch.analyses] == [1, 2, 3]
+    assert batch.analyses[0].key_features == ["Synthetic key features"] * 3
+
+def test_fake_analysis_describes_a_catalog_product():
+    generator = CatalogGenerator(50, 5)
+    profile = generator.profile(7)
+    analysis = ProductAnalysis.model_validate(fake_instance(gemini_schema(ProductAnalysis), profile=profile))
+    assert (analysis.category, analysis.subcategory) == (profile.category, profile.subcategory)
+    assert analysis.key_features == profile.features
+
+def test_fake_text_response_parses():
+    assert IMAGE_ANALYSIS_SCHEMA.parse(fake_text())["product_name"] == "Synthetic exact product name"
+
+def test_plan_is_reproducible_and_follows_the_mix():
+    generator = CatalogGenerator(50, 5)
+    mix = parse_mix("search_all=1,product_details=1")
+    first = plan_requests(40, generator, mix, seed=3)
+    assert [r.url for r in first] == [r.url for r in plan_requests(40, generator, mix, seed=3)]
+    assert {r.scenario for r in first} == {"search_all", "product_details"}
+    with pytest.raises(ValueError):
+        parse_mix("nope=1")
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 99), percentile([7], 95)) == (50, 99, 7)
+
+def test_cli_reports_latency_throughput_and_loop_lag():
+    pytest.importorskip("mongomock_motor")
+    pytest.importorskip("httpx")
+    run = subprocess.run(
+        [sys.executable, "-m", "benchmarks.load_test", "--requests", "40", "--concurrency", "4", "--warmup", "2",
+         "--latency-ms", "5", "--error-rate", "1", "--products", "50", "--videos", "5", "--image-size", "32",
+         "--mix", "upload_image=1,search_all=1"],
+        capture_output=True, text=True, timeout=120,
+    )
+    assert run.returncode == 0, run.stderr
+    report = json.loads(run.stdout)
+    assert report["requests"] == 40
+    assert set(report["endpoints"]) == {"upload_image", "search_all"}
+    assert set(report["latency_ms"]) == {"p50", "p95", "p99", "max", "mean"}
+    assert report["event_loop_lag_ms"]["max"] >= 0
+    assert set(report["blocking"]) == {"events", "blocked_ms_total", "top_sites"}
+    # Every model call fails, which /upload_image reports as a 500
+    upload = report["endpoints"]["upload_image"]
+    assert upload["errors"] == upload["requests"] == report["model"]["errors"]
+    assert report["endpoints"]["search_all"]["status"] == {"200": report["endpoints"]["search_all"]["requests"]}
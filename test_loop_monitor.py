@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+
+import loop_monitor
+from loop_monitor import LoopMonitor
+
+def block_the_loop(seconds):
+    time.sleep(seconds)
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_caught_with_its_stack():
+    monitor = LoopMonitor(interval_ms=10, threshold_ms=50)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_the_loop(0.25)
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats()
+    assert not stats["running"]
+    assert stats["late_ticks"] >= 1
+    assert stats["lag_ms"]["max"] >= 200
+    assert stats["blocking"]["events"] == 1
+    event = stats["blocking"]["recent"][0]
+    assert event["site"].startswith("test_loop_monitor.py:") and event["site"].endswith("in block_the_loop")
+    assert event["blocked_ms"] >= 200
+    assert any("block_the_loop(0.25)" in line for line in event["stack"])
+
+@pytest.mark.asyncio
+async def test_stack_is_built_outside_the_lock(monkeypatch):
+    monitor = LoopMonitor(interval_ms=10, threshold_ms=50)
+    held = []
+    extract_stack = loop_monitor.traceback.extract_stack
+
+    def spy(frame):
+        held.append(monitor._lock.locked())
+        return extract_stack(frame)
+
+    monkeypatch.setattr(loop_monitor.traceback, "extract_stack", spy)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        block_the_loop(0.25)
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+    assert held == [False]
+    assert monitor.stats()["blocking"]["events"] == 1
+
+@pytest.mark.asyncio
+async def test_idle_loop_reports_lag_without_events():
+    monitor = LoopMonitor(interval_ms=10, threshold_ms=100)
+    monitor.start()
+    await asyncio.sleep(0.15)
+    await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["ticks"] >= 5
+    assert stats["lag_ms"]["p50"] < 100
+    assert stats["blocking"] == {"events": 0, "blocked_ms_total": 0.0, "top_sites": [], "recent": []}
+    monitor.reset()
+    assert monitor.stats()["lag_ms"]["p50"] is None
+
+@pytest.mark.asyncio
+async def test_debug_mode_turns_on_asyncio_slow_callback_logging():
+    monitor = LoopMonitor(interval_ms=10, threshold_ms=75, debug=True)
+    monitor.start()
+    loop = asyncio.get_running_loop()
+    try:
+        assert loop.get_debug()
+        assert loop.slow_callback_duration == 0.075
+    finally:
+        await monitor.stop()
+        loop.set_debug(False)
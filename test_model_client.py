@@ -0,0 +1,58 @@
+import pytest
+import asyncio
+import time
+from model_client import ModelClient, ModelTimeoutError
+
+class SyncOnlyModel:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+
+    def generate_content(self, contents, **kwargs):
+        time.sleep(self.delay)
+        return f"response to {contents}"
+
+class AsyncModel:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+
+    async def generate_content_async(self, contents, **kwargs):
+        await asyncio.sleep(self.delay)
+        return f"async response to {contents}"
+
+@pytest.mark.asyncio
+async def test_prefers_async_path():
+    client = ModelClient(model=AsyncModel(delay=0))
+    assert await client.generate_content("prompt") == "async response to prompt"
+
+@pytest.mark.asyncio
+async def test_sync_model_runs_off_loop_and_overlaps():
+    client = ModelClient(model=SyncOnlyModel(delay=0.2), max_concurrency=4)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client.generate_content(i) for i in range(4)))
+    elapsed = time.perf_counter() - start
+    assert len(results) == 4
+    assert elapsed < 0.6
+
+@pytest.mark.asyncio
+async def test_timeout():
+    client = ModelClient(model=AsyncModel(delay=1), timeout=0.05)
+    with pytest.raises(ModelTimeoutError):
+        await client.generate_content("prompt")
+
+@pytest.mark.asyncio
+async def test_timed_out_thread_keeps_its_slot():
+    client = ModelClient(model=SyncOnlyModel(delay=0.3), max_concurrency=1)
+    with pytest.raises(ModelTimeoutError):
+        await client.generate_content("slow", timeout=0.05)
+    # The first call's thread is still running, so the next call waits for it before it can start
+    start = time.perf_counter()
+    assert await client.generate_content("next") == "response to next"
+    assert time.perf_counter() - start >= 0.45
+
+@pytest.mark.asyncio
+async def test_timed_out_async_call_frees_its_slot():
+    client = ModelClient(model=AsyncModel(delay=1), max_concurrency=1)
+    with pytest.raises(ModelTimeoutError):
+        await client.generate_content("slow", timeout=0.05)
+    client.model = AsyncModel(delay=0)
+    assert await asyncio.wait_for(client.generate_content("next"), timeout=0.5) == "async response to next"
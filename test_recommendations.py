@@ -0,0 +1,55 @@
+import pytest
+from recommendations import build_recommendation_pipeline, fetch_recommendations
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+def product(i, features):
+    return {
+        "category": "Electronics",
+        "subcategory": "Headphones",
+        "title": f"Brand {i}",
+        "features": features,
+        "price_range": "mid_range",
+    }
+
+@pytest.fixture
+def collection():
+    client = mongomock_motor.AsyncMongoMockClient()
+    return client.test_db.products
+
+@pytest.mark.asyncio
+async def test_primary_matches_only_when_enough(collection):
+    await collection.insert_many(
+        [product(i, ["Noise Cancelling"]) for i in range(4)] + [product(9, ["Wired"])]
+    )
+    recs = await fetch_recommendations(collection, {
+        "category": "Electronics", "subcategory": "Headphones", "key_features": ["Noise Cancelling"]
+    })
+    assert [r["name"] for r in recs] == ["Brand 0", "Brand 1", "Brand 2", "Brand 3"]
+
+@pytest.mark.asyncio
+async def test_fallback_fills_up_to_limit(collection):
+    await collection.insert_many([product(0, ["Noise Cancelling"])] + [product(i, ["Wired"]) for i in range(1, 8)])
+    recs = await fetch_recommendations(collection, {
+        "category": "Electronics", "subcategory": "Headphones", "key_features": ["Noise Cancelling"]
+    })
+    assert len(recs) == 5
+    assert recs[0]["name"] == "Brand 0"
+
+@pytest.mark.asyncio
+async def test_fallback_does_not_repeat_primary_matches(collection):
+    await collection.insert_many([product(0, ["Noise Cancelling"]), product(1, ["Wired"])])
+    recs = await fetch_recommendations(collection, {
+        "category": "Electronics", "subcategory": "Headphones", "key_features": ["Noise Cancelling"]
+    })
+    assert [r["name"] for r in recs] == ["Brand 0", "Brand 1"]
+
+@pytest.mark.asyncio
+async def test_missing_category(collection):
+    recs = await fetch_recommendations(collection, {"key_features": []})
+    assert recs[0]["name"] == "No recommendations available"
+
+def test_pipeline_projects_only_needed_fields():
+    pipeline = build_recommendation_pipeline("Electronics", "Headphones", ["x"])
+    facet = pipeline[1]["$facet"]
+    assert facet["primary"][-1]["$project"]["_id"] == 0
@@ -0,0 +1,146 @@
+import json
+import random
+import string
+
+import pytest
+
+from image_processor import IMAGE_ANALYSIS_SCHEMA
+from response_parser import Field, ResponseSchema, LIST, MAP
+from text_processor import TEXT_ANALYSIS_SCHEMA
+from video_processor import VIDEO_ANALYSIS_SCHEMA
+
+VIDEO_RESPONSE = """Here is the analysis.
+BEGIN_ANALYSIS
+Product Name: Aero Runner 2
+Category: Fashion
+Subcategory: Sneakers
+Platform: YouTube
+Duration: 3:12
+Views: 1.2M
+Transcript Summary: A lightweight running shoe. Great grip.
+Price: $129.99
+Key Timestamps:
+00:15: Unboxing
+- 01:30: Sole close-up
+Highlights:
+- Breathable mesh
+- Carbon plate
+Key Features:
+- Lightweight
+Search Keywords:
+- running shoes
+Product links:
+- Nike Store, $129.99
+- Amazon
+END_ANALYSIS
+Trailing chatter with Price: ignored"""
+
+def test_video_response():
+    parsed = VIDEO_ANALYSIS_SCHEMA.parse(VIDEO_RESPONSE)
+    assert parsed["product_name"] == "Aero Runner 2"
+    assert parsed["duration"] == "3:12"
+    assert parsed["price"] == "$129.99"
+    assert parsed["transcript_summary"] == "A lightweight running shoe. Great grip."
+    assert parsed["key_timestamps"] == {"00:15": "Unboxing", "01:30": "Sole close-up"}
+    assert parsed["highlights"] == ["Breathable mesh", "Carbon plate"]
+    assert parsed["key_features"] == ["Lightweight"]
+    assert parsed["search_keywords"] == ["running shoes"]
+    assert parsed["product_links"] == [
+        {"store": "Nike Store", "price": "$129.99"},
+        {"store": "Amazon", "price": "Not Available"},
+    ]
+
+def test_missing_fields_keep_schema_defaults():
+    assert VIDEO_ANALYSIS_SCHEMA.parse("Product Name: X")["views"] == "Not Available"
+    assert IMAGE_ANALYSIS_SCHEMA.parse("Product Name: X")["price"] == ""
+    assert TEXT_ANALYSIS_SCHEMA.parse("")["keywords"] == []
+
+def test_labels_are_distinct_per_schema():
+    text = "Keywords:\n- a\nUSP: fast\nSearch Keywords:\n- b"
+    assert TEXT_ANALYSIS_SCHEMA.parse(text)["keywords"] == ["a"]
+    assert TEXT_ANALYSIS_SCHEMA.parse(text)["usp"] == "fast"
+    assert IMAGE_ANALYSIS_SCHEMA.parse(text)["search_keywords"] == ["b"]
+
+def test_markdown_decorated_labels():
+    text = "## **Product Name:** Desk Lamp\n**Category**: Home Decor\n* **Key Features:**\n* Dimmable\n1. USB-C\r\nPrice: $40"
+    parsed = IMAGE_ANALYSIS_SCHEMA.parse(text)
+    assert parsed["product_name"] == "Desk Lamp"
+    assert parsed["category"] == "Home Decor"
+    assert parsed["price"] == "$40"
+
+def test_text_field_ends_a_list_section():
+    parsed = IMAGE_ANALYSIS_SCHEMA.parse("Key Features:\n- A\nPrice: $1\n- stray")
+    assert parsed["key_features"] == ["A"]
+
+def test_json_mode_response():
+    payload = {
+        "product_name": "Aero Runner 2",
+        "Category": "Fashion",
+        "key_features": ["Lightweight", "Carbon plate"],
+        "key_timestamps": {"00:15": "Unboxing"},
+        "product_links": [{"store": "Nike", "price": "$1"}, "Amazon, $2"],
+        "views": None,
+        "unknown": "ignored",
+    }
+    parsed = VIDEO_ANALYSIS_SCHEMA.parse("```json\n" + json.dumps(payload) + "\n```")
+    assert parsed["product_name"] == "Aero Runner 2"
+    assert parsed["category"] == "Fashion"
+    assert parsed["key_features"] == ["Lightweight", "Carbon plate"]
+    assert parsed["key_timestamps"] == {"00:15": "Unboxing"}
+    assert parsed["product_links"] == [{"store": "Nike", "price": "$1"}, {"store": "Amazon", "price": "$2"}]
+    assert parsed["views"] == "Not Available"
+    assert "unknown" not in parsed
+
+def test_invalid_json_falls_back_to_text():
+    parsed = IMAGE_ANALYSIS_SCHEMA.parse('{"product_name": "broken"\nProduct Name: Lamp')
+    assert parsed["product_name"] == "Lamp"
+
+def test_defaults_are_not_shared_between_results():
+    first = VIDEO_ANALYSIS_SCHEMA.parse("")
+    first["highlights"].append("x")
+    first["key_timestamps"]["a"] = "b"
+    second = VIDEO_ANALYSIS_SCHEMA.parse("")
+    assert second["highlights"] == [] and second["key_timestamps"] == {}
+
+FUZZ_ALPHABET = string.printable + "•–—é漢​"
+FUZZ_TOKENS = ["BEGIN_ANALYSIS", "END_ANALYSIS", "Product Name:", "Key Timestamps:", "Product links:",
+               "- ", "**", ":", "\n", "\r\n", "{", "}", "```json", "```", ",", "Highlights:", "1. "]
+
+def mutate(text, rng):
+    chars = list(text)
+    for _ in range(rng.randint(1, 30)):
+        action = rng.random()
+        position = rng.randint(0, len(chars))
+        if action < 0.3 and chars:
+            del chars[min(position, len(chars) - 1)]
+        elif action < 0.6:
+            chars[position:position] = list(rng.choice(FUZZ_TOKENS))
+        elif action < 0.8:
+            chars[position:position] = [rng.choice(FUZZ_ALPHABET)]
+        else:
+            chars = chars[:position]
+    return "".join(chars)
+
+@pytest.mark.parametrize("schema", [IMAGE_ANALYSIS_SCHEMA, TEXT_ANALYSIS_SCHEMA, VIDEO_ANALYSIS_SCHEMA])
+def test_fuzzed_model_output_never_breaks_the_shape(schema):
+    rng = random.Random(1234)
+    expected_types = {key: type(value) for key, value in schema.empty().items()}
+    samples = [VIDEO_RESPONSE, json.dumps({"product_name": "x", "key_features": ["a"]}), ""]
+    for _ in range(2000):
+        text = mutate(rng.choice(samples), rng)
+        parsed = schema.parse(text)
+        assert set(parsed) == set(expected_types)
+        for key, value in parsed.items():
+            assert isinstance(value, expected_types[key]), (key, text)
+
+def test_non_string_input_returns_defaults():
+    assert IMAGE_ANALYSIS_SCHEMA.parse(None) == IMAGE_ANALYSIS_SCHEMA.empty()
+
+def test_custom_schema():
+    schema = ResponseSchema([
+        Field("name", "Name"),
+        Field("specs", "Specs", MAP),
+        Field("sizes", "Sizes", LIST, parse_item=lambda item: item.upper()),
+    ], default=None)
+    parsed = schema.parse("Name: Tee\nSpecs:\nWeight: 180 g\nSizes:\n- s\n- m")
+    assert parsed == {"name": "Tee", "specs": {"Weight": "180 g"}, "sizes": ["S", "M"]}
@@ -0,0 +1,65 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from result_cache import ResultCache
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["_id"])
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.docs[query["_id"]] = doc
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    cache = ResultCache("test", max_entries=2)
+    await cache.set("a", {"v": 1})
+    await cache.set("b", {"v": 2})
+    assert await cache.get("a") == {"v": 1}
+    await cache.set("c", {"v": 3})
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"v": 1}
+    assert cache.hits == 2 and cache.misses == 1
+
+@pytest.mark.asyncio
+async def test_cached_values_are_copies():
+    cache = ResultCache("test")
+    await cache.set("a", {"features": ["x"]})
+    value = await cache.get("a")
+    value["features"].append("y")
+    assert await cache.get("a") == {"features": ["x"]}
+
+@pytest.mark.asyncio
+async def test_persistent_tier_survives_memory_eviction():
+    collection = FakeCollection()
+    cache = ResultCache("test", max_entries=1, collection=collection)
+    await cache.set("a", {"v": 1})
+    await cache.set("b", {"v": 2})
+    assert await cache.get("a") == {"v": 1}
+    assert "test:a" in collection.docs
+
+@pytest.mark.asyncio
+async def test_memory_entries_expire():
+    cache = ResultCache("test", ttl_seconds=0.05)
+    await cache.set("a", {"v": 1})
+    assert await cache.get("a") == {"v": 1}
+    await asyncio.sleep(0.1)
+    assert await cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+@pytest.mark.asyncio
+async def test_expired_persistent_entry_is_a_miss():
+    collection = FakeCollection()
+    cache = ResultCache("test", collection=collection, ttl_seconds=60)
+    collection.docs["test:a"] = {"value": {"v": 1}, "created_at": datetime.utcnow() - timedelta(seconds=61)}
+    collection.docs["test:b"] = {"value": {"v": 2}, "created_at": datetime.utcnow() - timedelta(seconds=30)}
+    assert await cache.get("a") is None
+    assert await cache.get("b") == {"v": 2}
+    # The promoted entry keeps the persisted document's expiry rather than a fresh TTL
+    expires_at, _ = cache._entries["b"]
+    assert expires_at - time.monotonic() <= 30
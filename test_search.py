@@ -0,0 +1,118 @@
+import pytest
+from pymongo.errors import OperationFailure
+from search import (escape_search_term, clamp_page, search_collection, search_collection_after, text_index_model,
+                    text_search_term, MAX_PAGE_SIZE)
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self._skip = 0
+        self._limit = None
+
+    def sort(self, *args):
+        return self
+
+    def skip(self, n):
+        self._skip = n
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[self._skip:self._skip + self._limit]
+
+class FakeCollection:
+    name = "products"
+
+    def __init__(self, text_docs=None, regex_docs=None, has_text_index=True):
+        self.text_docs = text_docs or []
+        self.regex_docs = regex_docs or []
+        self.has_text_index = has_text_index
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        if "$text" in query:
+            if not self.has_text_index:
+                raise OperationFailure("text index required for $text query", code=27)
+            return FakeCursor(self.text_docs)
+        return FakeCursor(self.regex_docs)
+
+    async def find_one(self, query, projection=None):
+        return self.text_docs[0] if self.text_docs else None
+
+    def aggregate(self, pipeline):
+        self.queries.append(pipeline)
+        if not self.has_text_index:
+            raise OperationFailure("text index required for $text query", code=27)
+        return FakeCursor(self.text_docs).limit(pipeline[-1].get("$limit", len(self.text_docs)))
+
+def test_escape_search_term():
+    assert escape_search_term(" a.*(b ") == r"a\.\*\(b"
+
+def test_text_search_term_drops_negation_and_phrases():
+    assert text_search_term('-phone') == "phone"
+    assert text_search_term('"noise cancelling" --wi-fi -') == "noise cancelling wi-fi"
+
+@pytest.mark.asyncio
+async def test_text_queries_use_the_neutralised_term():
+    collection = FakeCollection(text_docs=[{"_id": 1, "title": "phone", "score": 1.0}])
+    await search_collection(collection, '-phone "case"')
+    await search_collection_after(collection, '-phone "case"', None, 10)
+    assert collection.queries[0] == {"$text": {"$search": "phone case"}}
+    assert collection.queries[1][0] == {"$match": {"$text": {"$search": "phone case"}}}
+
+def test_clamp_page():
+    assert clamp_page(0, 0) == (1, 1)
+    assert clamp_page(3, 10_000) == (3, MAX_PAGE_SIZE)
+
+def test_text_index_weights():
+    index = text_index_model("products").document
+    assert index["weights"]["title"] > index["weights"]["features"]
+
+@pytest.mark.asyncio
+async def test_text_results_paginated():
+    collection = FakeCollection(text_docs=[{"title": str(i)} for i in range(5)])
+    assert await search_collection(collection, "x", page=2, page_size=2) == [{"title": "2"}, {"title": "3"}]
+    assert await search_collection(collection, "x", page=4, page_size=2) == []
+
+@pytest.mark.asyncio
+async def test_falls_back_to_escaped_regex_without_text_index():
+    collection = FakeCollection(regex_docs=[{"title": "a+b"}], has_text_index=False)
+    assert await search_collection(collection, "a+b") == [{"title": "a+b"}]
+    assert collection.queries[-1] == {"title": {"$regex": r"a\+b", "$options": "i"}}
+
+@pytest.mark.asyncio
+async def test_no_text_matches_does_not_scan_with_regex():
+    collection = FakeCollection(regex_docs=[{"title": "iPhone 15"}])
+    assert await search_collection(collection, "iph") == []
+    assert all("$text" in query for query in collection.queries)
+
+@pytest.mark.asyncio
+async def test_keyset_search_continues_after_the_last_result():
+    collection = FakeCollection(text_docs=[{"_id": 1, "title": "a", "score": 2.0}])
+    assert await search_collection_after(collection, "a", (3.0, 7), 10) == [{"_id": 1, "title": "a", "score": 2.0}]
+    pipeline = collection.queries[-1]
+    assert pipeline[2] == {"$match": {"$or": [{"score": {"$lt": 3.0}}, {"score": 3.0, "_id": {"$gt": 7}}]}}
+    assert {"$sort": {"score": -1, "_id": 1}} in pipeline
+
+@pytest.mark.asyncio
+async def test_keyset_search_falls_back_to_regex_by_id():
+    collection = FakeCollection(regex_docs=[{"_id": 8, "title": "a+b"}], has_text_index=False)
+    assert await search_collection_after(collection, "a+b", (None, 7), 10) == [{"_id": 8, "title": "a+b"}]
+    assert collection.queries[-1] == {"title": {"$regex": r"a\+b", "$options": "i"}, "_id": {"$gt": 7}}
+
+def test_search_routes_bound_page_size():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from routers import combined, image
+
+    app = FastAPI()
+    app.include_router(image.router, prefix="/upload/image")
+    app.include_router(combined.router, prefix="/search/all")
+    client = TestClient(app)
+    assert client.get(f"/upload/image/search/lamp?page_size={MAX_PAGE_SIZE + 1}").status_code == 422
+    assert client.get("/upload/image/search/lamp?page=0").status_code == 422
+    assert client.get("/search/all/lamp?limit=0").status_code == 422
@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+import pytest
+
+from speech_backends import BACKENDS, OnnxBackend, QuantizedTorchBackend, SpeechBackend, TorchBackend, create_backend
+
+
+def test_backends_selectable_by_name():
+    assert isinstance(create_backend("torch"), TorchBackend)
+    assert isinstance(create_backend("int8"), QuantizedTorchBackend)
+    assert isinstance(create_backend("onnx"), OnnxBackend)
+    assert set(BACKENDS) == {"torch", "int8", "onnx"}
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        create_backend("tensorrt")
+
+
+def test_backends_load_lazily(tmp_path):
+    backend = OnnxBackend("facebook/wav2vec2-base-960h", onnx_dir=tmp_path)
+    assert not backend.loaded
+    assert backend.onnx_path == tmp_path / "facebook__wav2vec2-base-960h.onnx"
+
+
+def test_base_backend_is_abstract():
+    with pytest.raises(TypeError):
+        SpeechBackend("facebook/wav2vec2-base-960h")
+
+
+def test_onnx_export_is_atomic(tmp_path, monkeypatch):
+    backend = OnnxBackend("facebook/wav2vec2-base-960h", onnx_dir=tmp_path)
+
+    def interrupted(path):
+        path.write_bytes(b"partial")
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(backend, "_export_to", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        backend.export()
+    assert list(tmp_path.iterdir()) == []
+
+    monkeypatch.setattr(backend, "_export_to", lambda path: path.write_bytes(b"model"))
+    backend.export()
+    assert list(tmp_path.iterdir()) == [backend.onnx_path]
+    assert backend.onnx_path.read_bytes() == b"model"
+
+
+@pytest.mark.parametrize("name", ["int8", "onnx"])
+def test_optimized_backend_matches_torch(name, tmp_path):
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    if name == "onnx":
+        pytest.importorskip("onnxruntime")
+    from benchmarks.transcription_benchmark import load_audio, synthetic_audio
+    from transcription import TranscriptionEngine
+
+    # SPEECH_PARITY_CLIP points at a short speech clip; synthetic audio still checks the frame ids agree
+    clip = os.getenv("SPEECH_PARITY_CLIP")
+    waveform = load_audio(clip) if clip else synthetic_audio(4)
+
+    reference = TorchBackend("facebook/wav2vec2-base-960h")
+    backend = create_backend(name) if name == "int8" else OnnxBackend("facebook/wav2vec2-base-960h", onnx_dir=tmp_path)
+    try:
+        reference.load()
+        backend.load()
+    except OSError as e:
+        pytest.skip(f"Model not available: {e}")
+
+    window = waveform[:16000 * 4]
+    expected, actual = reference.predict_ids([window])[0], backend.predict_ids([window])[0]
+    assert np.mean(expected == actual) >= (0.999 if name == "onnx" else 0.95)
+    if name == "onnx":
+        assert TranscriptionEngine(backend=backend).transcribe_sync(waveform) == \
+            TranscriptionEngine(backend=reference).transcribe_sync(waveform)
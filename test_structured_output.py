@@ -0,0 +1,108 @@
+import json
+
+import pytest
+from google.generativeai.types import generation_types
+
+from conftest import FakeModelClient, images
+from image_processor import IMAGE_ANALYSIS_SCHEMA
+from models.analysis import ProductAnalysis, ProductAnalysisBatch, TextAnalysis, VideoAnalysis
+from response_parser import gemini_schema, structured_config, structured_output_stats, validate_response
+from text_processor import TEXT_ANALYSIS_SCHEMA
+from video_processor import VIDEO_ANALYSIS_SCHEMA
+
+VIDEO_JSON = {
+    "product_name": "Aero Runner 2",
+    "category": "Fashion",
+    "subcategory": "Sneakers",
+    "platform": "YouTube",
+    "duration": "3:12",
+    "views": "1.2M",
+    "transcript_summary": "A lightweight running shoe.",
+    "price": "$129.99",
+    "key_timestamps": [{"timestamp": "00:15", "description": "Unboxing"}],
+    "highlights": ["Carbon plate"],
+    "key_features": ["Lightweight"],
+    "search_keywords": ["running shoes"],
+    "product_links": [{"store": "Nike Store", "price": "$129.99"}],
+}
+
+def walk(schema):
+    yield schema
+    for child in schema.get("properties", {}).values():
+        yield from walk(child)
+    if "items" in schema:
+        yield from walk(schema["items"])
+
+@pytest.mark.parametrize("model", [ProductAnalysis, ProductAnalysisBatch, TextAnalysis, VideoAnalysis])
+def test_gemini_schema_is_accepted_by_the_sdk(model):
+    schema = gemini_schema(model)
+    for node in walk(schema):
+        assert not {"default", "title", "$ref", "$defs", "anyOf"} & set(node)
+    assert schema["required"] == list(model.model_fields)
+    generation_types.to_generation_config_dict(structured_config(model))
+
+def test_nested_models_are_inlined():
+    links = gemini_schema(VideoAnalysis)["properties"]["product_links"]
+    assert links["type"] == "array"
+    assert set(links["items"]["properties"]) == {"store", "price"}
+
+def test_valid_json_is_validated_directly():
+    before = structured_output_stats()["validated"]
+    analysis = validate_response(json.dumps(VIDEO_JSON), VideoAnalysis, VIDEO_ANALYSIS_SCHEMA)
+    assert analysis.product_links[0].store == "Nike Store"
+    assert analysis.to_result()["key_timestamps"] == {"00:15": "Unboxing"}
+    assert structured_output_stats()["validated"] == before + 1
+
+def test_drifting_model_falls_back_to_text_scraping():
+    before = structured_output_stats()["fallback"]
+    text = "BEGIN_ANALYSIS\nProduct Name: Lamp\nKeywords:\n- desk\nEND_ANALYSIS"
+    analysis = validate_response(text, TextAnalysis, TEXT_ANALYSIS_SCHEMA)
+    assert analysis.product_name == "Lamp"
+    assert analysis.keywords == ["desk"]
+    assert structured_output_stats()["fallback"] == before + 1
+
+def test_fields_that_fail_validation_are_reset():
+    payload = dict(VIDEO_JSON, views=None, product_links=[{"store": "No price"}])
+    analysis = validate_response(json.dumps(payload), VideoAnalysis, VIDEO_ANALYSIS_SCHEMA)
+    assert analysis.product_name == "Aero Runner 2"
+    assert analysis.views == "Not Available"
+    assert analysis.product_links == []
+
+def test_video_analysis_builds_video_and_listing():
+    analysis = VideoAnalysis.model_validate(dict(VIDEO_JSON, status="success"))
+    video = analysis.to_video("Runner review", id="video_1")
+    listing = analysis.to_video_listing("abc", "Runner review", rating=4.8)
+    assert video.transcript_summary == "A lightweight running shoe."
+    assert video.price_range == "$129.99"
+    assert listing.key_timestamps == {"00:15": "Unboxing"}
+    assert listing.product_links[0].price == "$129.99"
+
+def test_cached_result_with_timestamp_mapping_validates():
+    result = VideoAnalysis.model_validate(VIDEO_JSON).to_result()
+    assert VideoAnalysis.model_validate(result).to_result() == result
+
+@pytest.fixture
+def processor(processor):
+    processor.structured = True
+    return processor
+
+@pytest.mark.asyncio
+async def test_image_analysis_requests_json(processor):
+    processor.model_client = FakeModelClient(json.dumps({"product_name": "Mug", "key_features": ["Ceramic"]}))
+    result = await processor.analyze_product(images(1)[0])
+    assert result["product_name"] == "Mug"
+    assert result["key_features"] == ["Ceramic"]
+    assert result["status"] == "success"
+    assert set(result) == set(IMAGE_ANALYSIS_SCHEMA.empty()) | {"status"}
+    assert processor.model_client.kwargs[0]["generation_config"]["response_mime_type"] == "application/json"
+
+@pytest.mark.asyncio
+async def test_image_batch_matches_json_analyses_by_number(processor):
+    batch = {"analyses": [
+        {"image_number": 2, "product_name": "Second"},
+        {"image_number": 1, "product_name": "First"},
+    ]}
+    processor.model_client = FakeModelClient("```json\n" + json.dumps(batch) + "\n```")
+    results = await processor.analyze_products(images(2))
+    assert [r["product_name"] for r in results] == ["First", "Second"]
+    assert "image_number" not in results[0]
@@ -0,0 +1,134 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from speech_backends import SpeechBackend
+from transcription import TranscriptionEngine, batch_by_length, detect_speech, plan_windows
+
+SAMPLES_PER_FRAME = 320
+ALPHABET = "abcde"
+
+
+def ctc_decode(ids):
+    out = []
+    previous = None
+    for i in ids:
+        if i != previous and i != 0:
+            out.append(ALPHABET[i - 1])
+        previous = i
+    return "".join(out)
+
+
+class FakeBackend(SpeechBackend):
+    """Reads each 320-sample frame's id straight out of the waveform amplitude"""
+
+    name = "fake"
+
+    def __init__(self):
+        super().__init__("fake-model")
+        self.batches = []
+
+    def load(self):
+        self.model = object()
+
+    def predict_ids(self, batch):
+        self.batches.append([len(w) for w in batch])
+        return np.stack([
+            np.round(w.reshape(-1, SAMPLES_PER_FRAME).mean(axis=1) * 10).astype(int)
+            for w in batch
+        ])
+
+    def decode(self, ids):
+        return ctc_decode(list(ids))
+
+
+def FakeEngine(**kwargs):
+    return TranscriptionEngine(backend=FakeBackend(), **kwargs)
+
+
+def encoded_audio(frame_ids):
+    return np.repeat(np.asarray(frame_ids, dtype=np.float32) / 10, SAMPLES_PER_FRAME)
+
+
+def test_windows_tile_the_input():
+    for n in (100, 1000, 1234, 3999, 4000, 4001):
+        windows = plan_windows(n, window=400, overlap=100)
+        assert windows[0].keep_start == 0
+        assert windows[-1].keep_end == n
+        for a, b in zip(windows, windows[1:]):
+            assert a.keep_end == b.keep_start
+            # The kept boundary has context on both sides
+            assert a.end - a.keep_end >= 50 and b.keep_start - b.start >= 50
+        assert all(w.end - w.start <= 450 for w in windows)
+
+
+def test_batches_only_group_equal_lengths():
+    lengths = [400, 400, 300, 400, 400, 250, 300]
+    batches = batch_by_length(lengths, batch_size=3)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len({lengths[i] for i in batch}) == 1
+
+
+def test_stitched_transcript_matches_single_pass():
+    rng = np.random.default_rng(0)
+    frame_ids = rng.integers(0, len(ALPHABET) + 1, size=1500)
+    engine = FakeEngine(window_seconds=1, overlap_seconds=0.2, batch_size=4, vad=False)
+
+    transcript = engine.transcribe_sync(encoded_audio(frame_ids))
+
+    assert transcript == ctc_decode(list(frame_ids))
+    batches = engine.backend.batches
+    assert max(len(batch) for batch in batches) <= 4
+    # No forward pass ever sees more than a window plus half the overlap
+    assert max(max(batch) for batch in batches) <= 16000 + 1600
+
+
+def test_detect_speech_trims_silence():
+    sr = 16000
+    tone = 0.5 * np.sin(2 * np.pi * 220 * np.arange(sr) / sr)
+    waveform = np.concatenate([np.zeros(3 * sr), tone, np.zeros(3 * sr)]).astype(np.float32)
+
+    segments = detect_speech(waveform, sr)
+
+    assert len(segments) == 1
+    start, end = segments[0]
+    assert 2.7 * sr <= start <= 3 * sr
+    assert 4 * sr <= end <= 4.3 * sr
+
+
+def test_silence_transcribes_to_empty_without_loading():
+    engine = FakeEngine(vad=True)
+    assert engine.transcribe_sync(np.zeros(16000, dtype=np.float32)) == ""
+    assert not engine.loaded
+
+
+def test_transcribe_runs_off_the_event_loop():
+    engine = FakeEngine(window_seconds=1, overlap_seconds=0.2)
+    frame_ids = [1, 1, 0, 2, 3] * 100
+    transcript = asyncio.run(engine.transcribe(encoded_audio(frame_ids)))
+    assert transcript == ctc_decode(frame_ids)
+
+
+def test_rejects_other_sample_rates():
+    with pytest.raises(ValueError):
+        FakeEngine().transcribe_sync(np.zeros(100, dtype=np.float32), sample_rate=8000)
+
+
+def test_concurrent_jobs_share_batches():
+    engine = FakeEngine(window_seconds=1, overlap_seconds=0.2, batch_size=8, max_wait_ms=100)
+    jobs = [[1, 2, 0, 3] * 60, [4, 4, 5, 0] * 60, [2, 0, 1] * 80]
+
+    async def run():
+        return await asyncio.gather(*(engine.transcribe(encoded_audio(ids)) for ids in jobs))
+
+    transcripts = asyncio.run(run())
+
+    assert transcripts == [ctc_decode(ids) for ids in jobs]
+    windows_per_job = [len(engine.plan(encoded_audio(ids))) for ids in jobs]
+    stats = engine.stats()["scheduler"]
+    assert stats["items"] == sum(windows_per_job)
+    # Some forward pass held more windows than any single job has, so jobs shared it
+    assert max(len(batch) for batch in engine.backend.batches) > max(windows_per_job)
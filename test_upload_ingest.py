@@ -0,0 +1,90 @@
+import hashlib
+import io
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+import upload_ingest
+from upload_ingest import stream_upload_to_file, read_image_upload, UploadLimitMiddleware
+
+def make_upload(data: bytes, filename="file.bin", size=None):
+    return UploadFile(file=io.BytesIO(data), filename=filename, size=size)
+
+def png_bytes(width, height):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@pytest.mark.asyncio
+async def test_stream_upload_copies_in_chunks_and_hashes(tmp_path):
+    data = b"x" * 10_000
+    result = await stream_upload_to_file(make_upload(data), tmp_path / "video.mp4", max_bytes=20_000, chunk_size=1024)
+    assert result.size == len(data)
+    assert result.sha256 == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "video.mp4").read_bytes() == data
+
+@pytest.mark.asyncio
+async def test_stream_upload_rejects_oversize_and_cleans_up(tmp_path):
+    with pytest.raises(HTTPException) as error:
+        await stream_upload_to_file(make_upload(b"x" * 5000), tmp_path / "video.mp4", max_bytes=4096, chunk_size=1024)
+    assert error.value.status_code == 413
+    assert not (tmp_path / "video.mp4").exists()
+
+@pytest.mark.asyncio
+async def test_declared_size_rejected_before_reading(tmp_path):
+    upload = make_upload(b"", size=10_000)
+    with pytest.raises(HTTPException) as error:
+        await stream_upload_to_file(upload, tmp_path / "video.mp4", max_bytes=1000)
+    assert error.value.status_code == 413
+
+@pytest.mark.asyncio
+async def test_read_image_enforces_pixel_cap():
+    with pytest.raises(HTTPException) as error:
+        await read_image_upload(make_upload(png_bytes(200, 200)), max_pixels=100 * 100)
+    assert error.value.status_code == 413
+
+def test_pixel_cap_leaves_pil_global_alone():
+    assert Image.MAX_IMAGE_PIXELS != upload_ingest.MAX_IMAGE_PIXELS * 2
+
+@pytest.fixture
+def limited_client(monkeypatch):
+    monkeypatch.setattr(upload_ingest, "UPLOAD_ROUTE_LIMITS", (("/upload/video", 4096), ("/upload_image", 1024)))
+    monkeypatch.setattr(upload_ingest, "MAX_REQUEST_BYTES", 64)
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware)
+
+    @app.post("/upload/video/")
+    async def upload_video(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.post("/other")
+    async def other():
+        return {"ok": True}
+
+    return TestClient(app)
+
+def test_middleware_caps_each_route_by_content_length(limited_client):
+    assert limited_client.post("/upload/video/", files={"file": ("v.mp4", b"x" * 2000)}).json() == {"size": 2000}
+    response = limited_client.post("/upload/video/", files={"file": ("v.mp4", b"x" * 5000)})
+    assert response.status_code == 413
+    assert limited_client.post("/other", content=b"x" * 100).status_code == 413
+
+def test_middleware_counts_chunked_bodies(limited_client):
+    body = b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"v.mp4\"\r\n\r\n"
+    chunks = iter([body] + [b"x" * 1024] * 8 + [b"\r\n--b--\r\n"])
+    response = limited_client.post("/upload/video/", content=chunks,
+                                   headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+
+@pytest.mark.asyncio
+async def test_read_image_returns_image_and_hash():
+    data = png_bytes(20, 10)
+    image, upload = await read_image_upload(make_upload(data))
+    assert image.size == (20, 10)
+    assert upload.sha256 == hashlib.sha256(data).hexdigest()
+
+@pytest.mark.asyncio
+async def test_read_image_rejects_garbage():
+    with pytest.raises(HTTPException) as error:
+        await read_image_upload(make_upload(b"not an image"))
+    assert error.value.status_code == 400
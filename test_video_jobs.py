@@ -0,0 +1,145 @@
+import pytest
+import asyncio
+from video_jobs import VideoJobQueue, STAGES, COMPLETED, FAILED
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+def make_collection():
+    return mongomock_motor.AsyncMongoMockClient().test_db.video_jobs
+
+async def wait_for_status(queue, job_id, statuses, timeout=2):
+    for _ in range(int(timeout / 0.01)):
+        job = await queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not reach {statuses}")
+
+@pytest.mark.asyncio
+async def test_job_runs_and_reports_progress(tmp_path):
+    async def handler(job, progress):
+        for stage in STAGES:
+            await progress(stage, "running")
+            await progress(stage, "done")
+        return {"title": job["params"]["title"]}
+
+    queue = VideoJobQueue(make_collection(), handler, workers=1, upload_dir=tmp_path)
+    await queue.start()
+    job_id = queue.new_job_id()
+    path = queue.new_upload_path(job_id)
+    path.write_bytes(b"video")
+    await queue.enqueue(job_id, path, {"title": "Demo"})
+
+    job = await wait_for_status(queue, job_id, {COMPLETED, FAILED})
+    await queue.stop()
+
+    assert job["status"] == COMPLETED
+    assert job["progress"] == 100
+    assert all(status == "done" for status in job["stages"].values())
+    assert job["result"] == {"title": "Demo"}
+    assert job["finished_at"] is not None
+    assert not path.exists()
+
+@pytest.mark.asyncio
+async def test_start_indexes_claims_and_expires_finished_jobs(tmp_path):
+    collection = make_collection()
+    queue = VideoJobQueue(collection, handler=None, workers=0, upload_dir=tmp_path, retention_seconds=3600)
+    await queue.start()
+    await queue.stop()
+    indexes = await collection.index_information()
+    assert list(indexes["status_created_at"]["key"]) == [("status", 1), ("created_at", 1)]
+    assert list(indexes["lease_until"]["key"]) == [("lease_until", 1)]
+    assert indexes["finished_at_ttl"]["expireAfterSeconds"] == 3600
+
+@pytest.mark.asyncio
+async def test_failed_job_records_error(tmp_path):
+    async def handler(job, progress):
+        raise RuntimeError("boom")
+
+    queue = VideoJobQueue(make_collection(), handler, workers=1, upload_dir=tmp_path)
+    await queue.start()
+    job_id = queue.new_job_id()
+    await queue.enqueue(job_id, queue.new_upload_path(job_id), {"title": "Demo"})
+
+    job = await wait_for_status(queue, job_id, {COMPLETED, FAILED})
+    await queue.stop()
+    assert job["status"] == FAILED
+    assert job["error"] == "boom"
+
+@pytest.mark.asyncio
+async def test_unfinished_jobs_recovered_on_start(tmp_path):
+    collection = make_collection()
+    await collection.insert_one({
+        "_id": "left-over", "status": "running", "video_path": str(tmp_path / "x.mp4"),
+        "params": {"title": "Old"}, "stages": {}, "progress": 40,
+    })
+
+    async def handler(job, progress):
+        return {"recovered": True}
+
+    queue = VideoJobQueue(collection, handler, workers=1, upload_dir=tmp_path)
+    await queue.start()
+    job = await wait_for_status(queue, "left-over", {COMPLETED, FAILED})
+    await queue.stop()
+    assert job["result"] == {"recovered": True}
+
+@pytest.mark.asyncio
+async def test_stop_leaves_running_job_and_upload_for_recovery(tmp_path):
+    collection = make_collection()
+    started = asyncio.Event()
+
+    async def slow_handler(job, progress):
+        started.set()
+        await asyncio.sleep(10)
+
+    queue = VideoJobQueue(collection, slow_handler, workers=1, upload_dir=tmp_path, lease_seconds=0.2)
+    await queue.start()
+    job_id = queue.new_job_id()
+    path = queue.new_upload_path(job_id)
+    path.write_bytes(b"video")
+    await queue.enqueue(job_id, path, {"title": "Demo"})
+    await asyncio.wait_for(started.wait(), 2)
+    await queue.stop()
+
+    assert (await queue.get(job_id))["status"] == "running"
+    assert path.exists()
+
+    async def handler(job, progress):
+        return {"recovered": True}
+
+    # Once the lease has run out, the next process takes the job over
+    await asyncio.sleep(0.25)
+    restarted = VideoJobQueue(collection, handler, workers=1, upload_dir=tmp_path)
+    await restarted.start()
+    job = await wait_for_status(restarted, job_id, {COMPLETED, FAILED})
+    await restarted.stop()
+    assert job["result"] == {"recovered": True}
+    assert not path.exists()
+
+@pytest.mark.asyncio
+async def test_job_with_live_lease_is_not_claimed_twice(tmp_path):
+    collection = make_collection()
+    runs = []
+    release = asyncio.Event()
+
+    async def handler(job, progress):
+        runs.append(job["_id"])
+        await release.wait()
+        return {}
+
+    first = VideoJobQueue(collection, handler, workers=1, upload_dir=tmp_path, lease_seconds=30)
+    second = VideoJobQueue(collection, handler, workers=1, upload_dir=tmp_path, lease_seconds=30, poll_seconds=0.01)
+    await first.start()
+    job_id = first.new_job_id()
+    await first.enqueue(job_id, first.new_upload_path(job_id), {"title": "Demo"})
+    await second.start()
+    await asyncio.sleep(0.1)
+    assert runs == [job_id]
+    assert await second.claim() is None
+
+    release.set()
+    job = await wait_for_status(first, job_id, {COMPLETED, FAILED})
+    await first.stop()
+    await second.stop()
+    assert job["status"] == COMPLETED
+    assert runs == [job_id]
@@ -1,16 +1,22 @@
 import pytest
 import asyncio
+import io
+import json
 from pathlib import Path
 import os
-from unittest.mock import Mock, patch
-from video_processor import VideoProcessor, TokenBucket
+import subprocess
+import time
+from unittest.mock import AsyncMock, Mock, patch
+import numpy as np
+from PIL import Image
+from video_processor import VideoProcessor, TokenBucket, TRANSCRIPT_PROMPT_CHARS, transcript_excerpt
 
 @pytest.fixture
 def google_api_key():
     return os.getenv('GOOGLE_API_KEY', 'test_key')
 
 @pytest.fixture
-async def processor(google_api_key):
+def processor(google_api_key):
     with patch('os.path.exists', return_value=True):
         return VideoProcessor(google_api_key)
 
@@ -25,60 +31,158 @@ async def test_token_bucket():
     assert await bucket.acquire()
     assert not await bucket.acquire()
 
+@pytest.mark.asyncio
+async def test_token_bucket_wait_wakes_when_token_due():
+    bucket = TokenBucket(tokens_per_second=20, max_tokens=1)
+    await bucket.wait()
+    start = time.monotonic()
+    await bucket.wait()
+    elapsed = time.monotonic() - start
+    assert 0.04 <= elapsed < 0.2
+
+@pytest.mark.asyncio
+async def test_frames_analyzed_concurrently(processor):
+    async def slow_analysis(frame):
+        await asyncio.sleep(0.1)
+        return f"description {frame}"
+
+    processor.FRAME_ANALYSIS_CONCURRENCY = 3
+    with patch.object(processor, '_analyze_frame', side_effect=slow_analysis):
+        start = time.monotonic()
+        descriptions = await processor._analyze_frames([1, 2, 3])
+        elapsed = time.monotonic() - start
+    assert descriptions == ["description 1", "description 2", "description 3"]
+    assert elapsed < 0.25
+
 @pytest.mark.asyncio
 async def test_video_download(processor):
-    with patch('video_processor.VideoProcessor._download_with_ytdl', return_value=True):
+    def fake_download(ydl_opts, url):
+        Path(ydl_opts['outtmpl']).write_bytes(b"video")
+        return True
+
+    with patch('video_processor.VideoProcessor._download_with_ytdl', side_effect=fake_download):
         result = await processor.download_video("https://example.com/video")
-        assert result is not None
-        assert isinstance(result, Path)
+    assert isinstance(result, Path)
+    result.unlink()
+
+@pytest.mark.asyncio
+async def test_audio_extraction(processor, tmp_path):
+    # Two seconds of stereo audio; it should come back as 16 kHz mono float32
+    video_path = tmp_path / "tone.mp4"
+    subprocess.run([
+        processor.ffmpeg_path, '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', 'sine=frequency=440:duration=2:sample_rate=44100',
+        '-ac', '2', '-c:a', 'aac', str(video_path)
+    ], check=True)
+    
+    waveform, sr = await processor._extract_audio(video_path)
+    assert sr == 16000
+    assert waveform.dtype == np.float32
+    assert waveform.ndim == 1
+    assert abs(len(waveform) - 2 * 16000) < 1600
+    assert 0.1 < np.abs(waveform).max() <= 1.0
+    assert not (processor.temp_dir / "temp_audio.wav").exists()
+
+def tone_video(processor, path, frequency):
+    subprocess.run([
+        processor.ffmpeg_path, '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f'sine=frequency={frequency}:duration=1:sample_rate=44100',
+        '-c:a', 'aac', str(path)
+    ], check=True)
+    return path
+
+@pytest.mark.asyncio
+async def test_concurrent_audio_extractions_do_not_share_output(processor, tmp_path):
+    low = tone_video(processor, tmp_path / "low.mp4", 300)
+    high = tone_video(processor, tmp_path / "high.mp4", 2000)
+
+    results = await asyncio.gather(processor._extract_audio(low), processor._extract_audio(high))
+    peaks = [np.argmax(np.abs(np.fft.rfft(waveform))) * sr / len(waveform) for waveform, sr in results]
+    assert abs(peaks[0] - 300) < 20
+    assert abs(peaks[1] - 2000) < 20
 
 @pytest.mark.asyncio
-async def test_audio_extraction(processor, sample_video_path):
-    with patch('librosa.load', return_value=(Mock(), 16000)):
-        waveform, sr = await processor._extract_audio(sample_video_path)
-        assert waveform is not None
-        assert sr == 16000
+async def test_audio_extraction_without_audio_track(processor, tmp_path):
+    video_path = tmp_path / "silent.mp4"
+    subprocess.run([
+        processor.ffmpeg_path, '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', 'color=c=black:s=32x32:d=1', str(video_path)
+    ], check=True)
+    assert await processor._extract_audio(video_path) == (None, None)
 
 @pytest.mark.asyncio
 async def test_frame_extraction(processor, sample_video_path):
-    mock_frame = Mock()
+    mock_frame = np.zeros((4, 4, 3), dtype=np.uint8)
     with patch('cv2.VideoCapture') as mock_cap:
-        mock_cap.return_value.read.return_value = (True, mock_frame)
-        mock_cap.return_value.get.return_value = 100
+        mock_cap.return_value.grab.side_effect = [True] * 100 + [False]
+        mock_cap.return_value.retrieve.return_value = (True, mock_frame)
         
         frames = await processor._extract_frames(sample_video_path, num_frames=3)
         assert len(frames) == 3
+        # Never seeks; frames are decoded in a single pass
+        mock_cap.return_value.set.assert_not_called()
 
 @pytest.mark.asyncio
 async def test_frame_analysis(processor):
-    mock_frame = Mock()
-    with patch('google.generativeai.GenerativeModel.generate_content') as mock_generate:
-        mock_generate.return_value.text = "Test description"
-        description = await processor._analyze_frame(mock_frame)
-        assert description == "Test description"
+    frame = Image.new("RGB", (1920, 1080), (200, 40, 40))
+    processor.model_client = Mock()
+    processor.model_client.generate_content = AsyncMock(return_value=Mock(text="Test description"))
+
+    description = await processor._analyze_frame(frame)
+    assert description == "Test description"
+    # The frame goes out downscaled and re-encoded, not as the full-size image
+    prompt, part = processor.model_client.generate_content.call_args.args[0]
+    assert part["mime_type"].startswith("image/")
+    decoded = Image.open(io.BytesIO(part["data"]))
+    assert max(decoded.size) == processor.preprocessor.max_edge
 
 @pytest.mark.asyncio
 async def test_process_video(processor):
+    progress = []
+
+    async def report(stage, status):
+        progress.append((stage, status))
+
     with patch.multiple(processor,
-        download_video=Mock(return_value=Path("test.mp4")),
-        _extract_audio=Mock(return_value=(Mock(), 16000)),
-        _transcribe_audio=Mock(return_value="Test transcription"),
-        _extract_frames=Mock(return_value=[Mock()]),
-        _analyze_frames=Mock(return_value=["Frame description"]),
-        _generate_description=Mock(return_value="Final description")):
-        
-        result = await processor.process_video("https://example.com/video")
-        assert result['status'] == 'success'
-        assert 'final_description' in result
+        _extract_audio=AsyncMock(return_value=(np.zeros(16000, dtype=np.float32), 16000)),
+        _transcribe_audio=AsyncMock(return_value="Test transcription"),
+        _describe_video_frames=AsyncMock(return_value=["Frame description"]),
+        _generate_description=AsyncMock(return_value=json.dumps({"product_name": "Test Lamp"}))):
+
+        result = await processor.process_video_path("test.mp4", report, content_hash="test-process-video")
+    assert result['status'] == 'success'
+    assert result['product_name'] == 'Test Lamp'
+    assert ("description", "done") in progress
 
 @pytest.mark.asyncio
 async def test_error_handling(processor):
-    with patch('video_processor.VideoProcessor.download_video', side_effect=Exception("Test error")):
-        result = await processor.process_video("https://example.com/video")
-        assert result['status'] == 'error'
-        assert 'message' in result
+    describe = AsyncMock(return_value=["Frame description"])
+    with patch.multiple(processor,
+        _extract_audio=AsyncMock(side_effect=Exception("Test error")),
+        _describe_video_frames=describe):
+
+        result = await processor.process_video_path("test.mp4", content_hash="test-error-handling")
+    assert result == {'status': 'error', 'message': 'Test error'}
+    describe.assert_not_called()
 
 def test_initialization_error():
     with patch('os.path.exists', return_value=False):
         with pytest.raises(RuntimeError):
             VideoProcessor("test_key")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("structured", [True, False])
+async def test_description_prompt_includes_bounded_transcript(processor, structured):
+    processor.structured = structured
+    processor.model_client = Mock()
+    processor.model_client.generate_content = AsyncMock(return_value=Mock(text="{}"))
+    transcript = "This blender crushes ice in seconds. " + "filler " * 2000
+
+    await processor._generate_description(["A red blender"], transcript)
+    prompt = processor.model_client.generate_content.call_args.args[0]
+    assert "Audio Transcript:\nThis blender crushes ice in seconds." in prompt
+    assert len(transcript_excerpt(transcript)) <= TRANSCRIPT_PROMPT_CHARS + 4
+    assert len(prompt) < len(transcript)
+
+    await processor._generate_description(["A red blender"], "")
+    assert "Audio Transcript" not in processor.model_client.generate_content.call_args.args[0]
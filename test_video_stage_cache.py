@@ -0,0 +1,113 @@
+import json
+
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock
+from PIL import Image
+
+from result_cache import ResultCache
+from video_processor import VideoProcessor
+
+ANALYSIS = json.dumps({"product_name": "Trail Shoe", "category": "Fashion", "subcategory": "Sneakers"})
+# The same analysis in the labelled text format, which structured mode only scrapes as a fallback
+TEXT_ANALYSIS = """BEGIN_ANALYSIS
+Product Name: Trail Shoe
+Category: Fashion
+Subcategory: Sneakers
+END_ANALYSIS"""
+
+def frame(seed):
+    # Distinct noise patterns, so frame selection keeps every frame
+    pixels = np.random.default_rng(seed).integers(0, 256, (32, 32, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels)
+    image.seed = seed
+    return image
+
+@pytest.fixture
+def processor():
+    processor = VideoProcessor("test_key", cache=ResultCache("video_stages"))
+    processor._extract_audio = AsyncMock(return_value=(np.zeros(16000, dtype=np.float32), 16000))
+    processor._transcribe_audio = AsyncMock(return_value="these shoes are great")
+    processor._extract_frames = AsyncMock(return_value=[frame(10), frame(20), frame(30)])
+    processor._analyze_frame = AsyncMock(side_effect=lambda f: f"frame {f.seed}")
+    processor._generate_description = AsyncMock(return_value=ANALYSIS)
+    return processor
+
+def collect(events):
+    async def progress(stage, status):
+        events.append((stage, status))
+    return progress
+
+@pytest.mark.asyncio
+async def test_duplicate_upload_skips_every_stage(processor):
+    first = await processor.process_video_path("unused.mp4", content_hash="abc")
+    assert first["status"] == "success"
+    assert first["product_name"] == "Trail Shoe"
+
+    events = []
+    second = await processor.process_video_path("unused.mp4", collect(events), content_hash="abc")
+
+    assert second == first
+    assert processor._extract_audio.await_count == 1
+    assert processor._extract_frames.await_count == 1
+    assert processor._analyze_frame.await_count == 3
+    assert processor._generate_description.await_count == 1
+    assert {status for _, status in events} == {"cached"}
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("structured, description", [
+    (False, "BEGIN_ANALYSIS\nCategory: Fashion\nEND_ANALYSIS"),
+    (True, "{\"category\": \"Fashion\"}"),
+    (True, TEXT_ANALYSIS),
+])
+async def test_incomplete_analysis_is_not_cached(processor, structured, description):
+    processor.structured = structured
+    processor._generate_description.return_value = description
+    first = await processor.process_video_path("unused.mp4", content_hash="abc")
+    assert first["status"] == "success"
+
+    processor._generate_description.return_value = ANALYSIS if structured else TEXT_ANALYSIS
+    second = await processor.process_video_path("unused.mp4", content_hash="abc")
+    assert second["product_name"] == "Trail Shoe"
+    assert processor._generate_description.await_count == 2
+    # The earlier stages were complete, so only the description is redone
+    assert processor._extract_frames.await_count == 1
+
+@pytest.mark.asyncio
+async def test_failed_run_resumes_after_last_completed_stage(processor):
+    processor._generate_description.side_effect = [RuntimeError("timeout"), ANALYSIS]
+
+    failed = await processor.process_video_path("unused.mp4", content_hash="abc")
+    assert failed["status"] == "error"
+
+    events = []
+    retried = await processor.process_video_path("unused.mp4", collect(events), content_hash="abc")
+
+    assert retried["status"] == "success"
+    assert processor._extract_audio.await_count == 1
+    assert processor._transcribe_audio.await_count == 1
+    assert processor._extract_frames.await_count == 1
+    assert processor._analyze_frame.await_count == 3
+    assert ("transcription", "cached") in events
+    assert ("frame_analysis", "cached") in events
+    assert ("description", "done") in events
+    # The frame descriptions are handed to the retried description call unchanged
+    assert processor._generate_description.await_args.args[0] == ["frame 10", "frame 20", "frame 30"]
+
+@pytest.mark.asyncio
+async def test_shared_frames_reuse_descriptions_across_videos(processor):
+    await processor.process_video_path("a.mp4", content_hash="video-a")
+    processor._extract_frames.return_value = [frame(10), frame(20), frame(99)]
+
+    await processor.process_video_path("b.mp4", content_hash="video-b")
+
+    # Only the one new frame went to the model
+    assert processor._analyze_frame.await_count == 4
+    assert processor._generate_description.await_count == 2
+
+@pytest.mark.asyncio
+async def test_without_cache_every_run_recomputes(processor):
+    processor.stage_cache.cache = None
+    await processor.process_video_path("unused.mp4", content_hash="abc")
+    await processor.process_video_path("unused.mp4", content_hash="abc")
+    assert processor._generate_description.await_count == 2
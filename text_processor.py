@@ -1,11 +1,23 @@
-import google.generativeai as genai
 import os
 from dotenv import load_dotenv
 import logging
+from model_client import configure, get_model_client
+from response_parser import Field, ResponseSchema, LIST, STRUCTURED_OUTPUT, structured_config, validate_response
+from models.analysis import TextAnalysis
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TEXT_ANALYSIS_SCHEMA = ResponseSchema([
+    Field("product_name", "Product Name"),
+    Field("category", "Category"),
+    Field("key_features", "Key Features", LIST),
+    Field("target_audience", "Target Audience"),
+    Field("price_range", "Price Range"),
+    Field("usp", "USP"),
+    Field("keywords", "Keywords", LIST),
+])
+
 class TextProcessor:
     def __init__(self, api_key=None):
         """
@@ -18,12 +30,23 @@ class TextProcessor:
             if not api_key:
                 raise ValueError("GOOGLE_API_KEY not found in environment variables")
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-1.5-pro-latest")
+        configure(api_key)
+        self.model_client = get_model_client("gemini-1.5-pro-latest")
+        # JSON-mode responses validated into TextAnalysis, with the text format as fallback
+        self.structured = STRUCTURED_OUTPUT
     
     async def analyze_text(self, text: str):
         """Analyze product description text and return structured data"""
         try:
+            if self.structured:
+                response = await self.model_client.generate_content(
+                    f"Analyze this product description for an e-commerce listing.\n\nText to analyze: {text}",
+                    generation_config=structured_config(TextAnalysis),
+                )
+                analysis_dict = validate_response(response.text, TextAnalysis, TEXT_ANALYSIS_SCHEMA).model_dump()
+                analysis_dict['status'] = 'success'
+                return analysis_dict
+
             analysis_prompt = f"""Analyze this product description and provide detailed information in the following format exactly:
 
 BEGIN_ANALYSIS
@@ -44,7 +67,7 @@ END_ANALYSIS
 
 Text to analyze: {text}"""
             
-            response = self.model.generate_content(analysis_prompt)
+            response = await self.model_client.generate_content(analysis_prompt)
             analysis_dict = self._parse_analysis(response.text)
             analysis_dict['status'] = 'success'
             
@@ -59,52 +82,4 @@ Text to analyze: {text}"""
     
     def _parse_analysis(self, text):
         """Parse the analysis text into structured format"""
-        analysis_dict = {
-            'product_name': '',
-            'category': '',
-            'key_features': [],
-            'target_audience': '',
-            'price_range': '',
-            'usp': '',
-            'keywords': []
-        }
-        
-        try:
-            if 'BEGIN_ANALYSIS' in text and 'END_ANALYSIS' in text:
-                content = text.split('BEGIN_ANALYSIS')[-1].split('END_ANALYSIS')[0].strip()
-            else:
-                content = text.strip()
-            
-            lines = content.split('\n')
-            current_section = None
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if line.startswith('Product Name:'):
-                    analysis_dict['product_name'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Category:'):
-                    analysis_dict['category'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Target Audience:'):
-                    analysis_dict['target_audience'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Price Range:'):
-                    analysis_dict['price_range'] = line.split(':', 1)[1].strip()
-                elif line.startswith('USP:'):
-                    analysis_dict['usp'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Key Features:'):
-                    current_section = 'features'
-                elif line.startswith('Keywords:'):
-                    current_section = 'keywords'
-                elif line.startswith('- '):
-                    if current_section == 'features':
-                        analysis_dict['key_features'].append(line.strip('- '))
-                    elif current_section == 'keywords':
-                        analysis_dict['keywords'].append(line.strip('- '))
-            
-            return analysis_dict
-            
-        except Exception as e:
-            logger.error(f"Error parsing analysis: {str(e)}")
-            return analysis_dict
+        return TEXT_ANALYSIS_SCHEMA.parse(text)
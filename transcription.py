@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from inference_scheduler import MicroBatchScheduler
+from speech_backends import SPEECH_BACKEND, SPEECH_MODEL_NAME, SpeechBackend, create_backend
+from warmup import import_timer
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+TRANSCRIBE_WINDOW_SECONDS = float(os.getenv("TRANSCRIBE_WINDOW_SECONDS", "20"))
+TRANSCRIBE_OVERLAP_SECONDS = float(os.getenv("TRANSCRIBE_OVERLAP_SECONDS", "2"))
+TRANSCRIBE_BATCH_SIZE = int(os.getenv("TRANSCRIBE_BATCH_SIZE", "4"))
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", "1"))
+# 0 leaves torch's own default (one thread per core)
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+TRANSCRIBE_VAD = os.getenv("TRANSCRIBE_VAD", "0") == "1"
+# Windows from concurrent jobs share forward passes; a window waits at most this long for company
+TRANSCRIBE_MICRO_BATCHING = os.getenv("TRANSCRIBE_MICRO_BATCHING", "1") == "1"
+TRANSCRIBE_MAX_WAIT_MS = float(os.getenv("TRANSCRIBE_MAX_WAIT_MS", "50"))
+
+# Energy-based VAD settings
+VAD_FRAME_SECONDS = 0.03
+VAD_THRESHOLD_RATIO = 0.1
+VAD_MIN_GAP_SECONDS = 0.5
+VAD_PAD_SECONDS = 0.2
+
+
+class Window(NamedTuple):
+    """A slice of audio fed to the model and the part of it whose output we keep"""
+    start: int
+    end: int
+    keep_start: int
+    keep_end: int
+
+
+def plan_windows(num_samples: int, window: int, overlap: int, offset: int = 0) -> List[Window]:
+    """
+    Split ``num_samples`` samples into overlapping windows.
+
+    Neighbouring windows share ``overlap`` samples and each keeps the half of the
+    overlap nearest its own centre, so the kept regions tile the input exactly
+    and every kept sample has at least ``overlap / 2`` samples of context.
+    """
+    if num_samples <= 0:
+        return []
+    if overlap >= window:
+        raise ValueError("Window overlap must be smaller than the window")
+    if num_samples <= window:
+        return [Window(offset, offset + num_samples, offset, offset + num_samples)]
+
+    step = window - overlap
+    half = overlap // 2
+    starts = list(range(0, num_samples - overlap, step))
+    # Let the last window run to the end instead of leaving a short tail window
+    if num_samples - starts[-1] < overlap + half and len(starts) > 1:
+        starts.pop()
+
+    windows = []
+    for i, start in enumerate(starts):
+        last = i == len(starts) - 1
+        end = num_samples if last else start + window
+        keep_start = start if i == 0 else start + half
+        keep_end = end if last else starts[i + 1] + half
+        windows.append(Window(offset + start, offset + end, offset + keep_start, offset + keep_end))
+    return windows
+
+
+def detect_speech(waveform: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Tuple[int, int]]:
+    """
+    Return (start, end) sample ranges that contain speech, using short-time energy.
+
+    Frames louder than ``VAD_THRESHOLD_RATIO`` times the 95th percentile RMS count as
+    speech. Gaps shorter than ``VAD_MIN_GAP_SECONDS`` are bridged and every segment
+    is padded so word onsets are not clipped.
+    """
+    frame = max(1, int(VAD_FRAME_SECONDS * sample_rate))
+    usable = len(waveform) - len(waveform) % frame
+    if usable == 0:
+        return [(0, len(waveform))] if len(waveform) else []
+
+    rms = np.sqrt(np.mean(np.square(waveform[:usable].reshape(-1, frame), dtype=np.float64), axis=1))
+    reference = np.percentile(rms, 95)
+    if reference <= 0:
+        return []
+    voiced = np.flatnonzero(rms > VAD_THRESHOLD_RATIO * reference)
+    if voiced.size == 0:
+        return []
+
+    max_gap = int(VAD_MIN_GAP_SECONDS * sample_rate / frame)
+    pad = int(VAD_PAD_SECONDS * sample_rate)
+    segments = []
+    seg_start = seg_end = voiced[0]
+    for index in voiced[1:]:
+        if index - seg_end > max_gap:
+            segments.append((seg_start, seg_end))
+            seg_start = index
+        seg_end = index
+    segments.append((seg_start, seg_end))
+
+    return [
+        (max(0, start * frame - pad), min(len(waveform), (end + 1) * frame + pad))
+        for start, end in segments
+    ]
+
+
+def batch_by_length(lengths: Sequence[int], batch_size: int) -> List[List[int]]:
+    """Group item indices by length into batches of at most ``batch_size``, so batches never need padding"""
+    groups: Dict[int, List[int]] = {}
+    for index, length in enumerate(lengths):
+        groups.setdefault(length, []).append(index)
+    return [
+        indices[i:i + batch_size]
+        for indices in groups.values()
+        for i in range(0, len(indices), batch_size)
+    ]
+
+
+class TranscriptionEngine:
+    """
+    Chunked CTC transcription with a bounded memory footprint.
+
+    Audio is (optionally) trimmed to voiced segments, cut into overlapping
+    windows and run through the model a batch at a time. Each window
+    contributes only the frame predictions from its kept region, so the
+    stitched ids are decoded once and CTC collapses repeats across window
+    boundaries as it would within one pass. Inference runs on a dedicated
+    thread pool; torch releases the GIL, so the event loop stays responsive.
+
+    With micro-batching on, ``transcribe`` hands its windows to a shared
+    scheduler, so windows from concurrent jobs go through the one model
+    instance together instead of as separate small passes.
+    """
+
+    def __init__(self, backend: Optional[SpeechBackend] = None,
+                 window_seconds: float = TRANSCRIBE_WINDOW_SECONDS,
+                 overlap_seconds: float = TRANSCRIBE_OVERLAP_SECONDS,
+                 batch_size: int = TRANSCRIBE_BATCH_SIZE,
+                 vad: bool = TRANSCRIBE_VAD,
+                 num_threads: int = TORCH_NUM_THREADS,
+                 workers: int = TRANSCRIBE_WORKERS,
+                 micro_batching: bool = TRANSCRIBE_MICRO_BATCHING,
+                 max_wait_ms: float = TRANSCRIBE_MAX_WAIT_MS):
+        self.backend = backend or create_backend(SPEECH_BACKEND, SPEECH_MODEL_NAME, num_threads=num_threads)
+        self.window = int(window_seconds * SAMPLE_RATE)
+        self.overlap = int(overlap_seconds * SAMPLE_RATE)
+        self.batch_size = max(1, batch_size)
+        self.vad = vad
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcribe")
+        self.micro_batching = micro_batching
+        self.scheduler = MicroBatchScheduler(
+            self._predict_windows, max_batch_size=self.batch_size, max_wait_ms=max_wait_ms,
+            executor=self._executor, name="transcription",
+        )
+
+    @property
+    def loaded(self) -> bool:
+        return self.backend.loaded
+
+    def load(self):
+        """Load the speech backend if it is not loaded yet"""
+        if self.backend.loaded:
+            return
+        with self._lock:
+            if self.backend.loaded:
+                return
+            with import_timer("speech_model"):
+                self.backend.load()
+            logger.info(f"Speech backend {self.backend.name} ready ({self.backend.model_name})")
+
+    def plan(self, waveform: np.ndarray) -> List[Window]:
+        if self.vad:
+            segments = detect_speech(waveform)
+        else:
+            segments = [(0, len(waveform))]
+        windows = []
+        for start, end in segments:
+            windows.extend(plan_windows(end - start, self.window, self.overlap, offset=start))
+        return windows
+
+    def _predict_windows(self, windows: List[np.ndarray]) -> List[np.ndarray]:
+        """Greedy CTC ids for each window, run through the backend in equal-length batches"""
+        self.load()
+        rows: List[Optional[np.ndarray]] = [None] * len(windows)
+        for indices in batch_by_length([len(w) for w in windows], self.batch_size):
+            ids = self.backend.predict_ids([windows[i] for i in indices])
+            for index, row in zip(indices, ids):
+                rows[index] = row
+        return rows
+
+    def _stitch(self, windows: List[Window], rows: List[np.ndarray]) -> str:
+        separator = self.backend.word_delimiter_id
+        stitched = []
+        previous_end = None
+        for window, row in zip(windows, rows):
+            # Map the kept sample range onto this window's output frames
+            length = window.end - window.start
+            first = round((window.keep_start - window.start) * len(row) / length)
+            last = round((window.keep_end - window.start) * len(row) / length)
+            # Separate non-contiguous VAD segments with a word boundary
+            if previous_end is not None and window.keep_start != previous_end and separator is not None:
+                stitched.append(np.array([separator], dtype=row.dtype))
+            stitched.append(row[first:last])
+            previous_end = window.keep_end
+        return self.backend.decode(np.concatenate(stitched)).strip()
+
+    def transcribe_sync(self, waveform: np.ndarray, sample_rate: int = SAMPLE_RATE) -> str:
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f"Expected {SAMPLE_RATE} Hz audio, got {sample_rate} Hz")
+        waveform = np.asarray(waveform, dtype=np.float32)
+        windows = self.plan(waveform)
+        if not windows:
+            return ""
+        rows = self._predict_windows([waveform[w.start:w.end] for w in windows])
+        return self._stitch(windows, rows)
+
+    async def transcribe(self, waveform: np.ndarray, sample_rate: int = SAMPLE_RATE) -> str:
+        if not self.micro_batching:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.transcribe_sync, waveform, sample_rate)
+
+        if sample_rate != SAMPLE_RATE:
+            raise ValueError(f"Expected {SAMPLE_RATE} Hz audio, got {sample_rate} Hz")
+        waveform = np.asarray(waveform, dtype=np.float32)
+        windows = await asyncio.to_thread(self.plan, waveform)
+        if not windows:
+            return ""
+        rows = await self.scheduler.submit_many([waveform[w.start:w.end] for w in windows])
+        return await asyncio.to_thread(self._stitch, windows, rows)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.backend.name,
+            "loaded": self.loaded,
+            "micro_batching": self.micro_batching,
+            "scheduler": self.scheduler.stats(),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
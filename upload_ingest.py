@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from pathlib import Path
+from typing import NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_VIDEO_BYTES = int(os.getenv("MAX_VIDEO_BYTES", str(500 * 1024 * 1024)))
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(20 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(40_000_000)))
+MAX_IMAGES_PER_UPLOAD = 5
+# Request body cap for POSTs that are not uploads
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(1024 * 1024)))
+# Multipart boundaries and form fields on top of the file bytes themselves
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
+# Body cap per upload route, matched by path prefix
+UPLOAD_ROUTE_LIMITS = (
+    ("/upload/video", MAX_VIDEO_BYTES + MULTIPART_OVERHEAD_BYTES),
+    ("/upload/image", MAX_IMAGES_PER_UPLOAD * MAX_IMAGE_BYTES + MULTIPART_OVERHEAD_BYTES),
+    ("/upload_image", MAX_IMAGE_BYTES + MULTIPART_OVERHEAD_BYTES),
+)
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail="Upload too large")
+        self.limit = limit
+
+
+def request_body_limit(path: str) -> int:
+    for prefix, limit in UPLOAD_ROUTE_LIMITS:
+        if path.startswith(prefix):
+            return limit
+    return MAX_REQUEST_BYTES
+
+
+class UploadLimitMiddleware:
+    """
+    Cap the request body of every POST, per route.
+
+    A declared Content-Length over the cap is rejected before any of the body
+    is read. Otherwise the body is counted as it is received and the request
+    fails with a 413 once the count passes the cap. Chunked uploads carry no
+    Content-Length, so they are only caught by the count: Starlette spools
+    multipart files to disk while parsing, and up to the cap will have been
+    spooled by the time the request is rejected. The per-file caps in
+    ``stream_upload_to_file`` and ``read_image_upload`` still apply afterwards.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+
+        limit = request_body_limit(scope["path"])
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(content={"status": "error", "message": "Upload too large"}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def counted_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.warning(f"Rejected {scope['path']} upload after {received} bytes (cap {limit})")
+                    # An HTTPException subclass, so body parsing passes it through as a 413
+                    raise UploadTooLarge(limit)
+            return message
+
+        await self.app(scope, counted_receive, send)
+
+
+class IngestedUpload(NamedTuple):
+    path: Optional[Path]
+    size: int
+    sha256: str
+
+
+def _too_large(limit: int) -> HTTPException:
+    readable = f"{limit // (1024 * 1024)} MB" if limit >= 1024 * 1024 else f"{limit} bytes"
+    return HTTPException(status_code=413, detail=f"File too large. Maximum size is {readable}")
+
+
+def check_declared_size(upload: UploadFile, max_bytes: int):
+    """Reject an upload up front when its declared size is already over the limit"""
+    declared = getattr(upload, "size", None)
+    if declared is not None and declared > max_bytes:
+        raise _too_large(max_bytes)
+
+
+async def _read_chunks(upload: UploadFile, max_bytes: int, chunk_size: int):
+    size = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            return
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large(max_bytes)
+        yield chunk
+
+
+async def stream_upload_to_file(upload: UploadFile, dest_path, max_bytes: int = MAX_VIDEO_BYTES,
+                                chunk_size: int = UPLOAD_CHUNK_SIZE) -> IngestedUpload:
+    """
+    Copy an upload to disk in fixed-size chunks, hashing it on the way.
+
+    At most one chunk is held in memory. The partial file is removed if the
+    upload goes over ``max_bytes``.
+    """
+    check_declared_size(upload, max_bytes)
+    dest_path = Path(dest_path)
+    digest = hashlib.sha256()
+    size = 0
+    out = await asyncio.to_thread(open, dest_path, "wb")
+    try:
+        async for chunk in _read_chunks(upload, max_bytes, chunk_size):
+            digest.update(chunk)
+            size += len(chunk)
+            await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        out.close()
+        dest_path.unlink(missing_ok=True)
+        raise
+    out.close()
+    return IngestedUpload(dest_path, size, digest.hexdigest())
+
+
+async def read_image_upload(upload: UploadFile, max_bytes: int = MAX_IMAGE_BYTES,
+                            max_pixels: int = MAX_IMAGE_PIXELS,
+                            chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[Image.Image, IngestedUpload]:
+    """
+    Read an image upload under byte and pixel caps.
+
+    The dimensions are checked from the image header before any pixel data
+    is decoded, so ``max_pixels`` applies here rather than through PIL's
+    process-wide ``Image.MAX_IMAGE_PIXELS``.
+    """
+    check_declared_size(upload, max_bytes)
+    buffer = io.BytesIO()
+    digest = hashlib.sha256()
+    async for chunk in _read_chunks(upload, max_bytes, chunk_size):
+        digest.update(chunk)
+        buffer.write(chunk)
+    buffer.seek(0)
+
+    try:
+        image = Image.open(buffer)
+    except Image.DecompressionBombError:
+        raise HTTPException(status_code=413, detail=f"Image too large. Maximum is {max_pixels} pixels")
+    except Exception as e:
+        logger.warning(f"Rejected unreadable image {upload.filename}: {e}")
+        raise HTTPException(status_code=400, detail=f"Could not read image: {upload.filename}")
+
+    if image.width * image.height > max_pixels:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image too large. Maximum is {max_pixels} pixels, got {image.width}x{image.height}",
+        )
+    return image, IngestedUpload(None, buffer.getbuffer().nbytes, digest.hexdigest())
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+VIDEO_JOB_WORKERS = int(os.getenv("VIDEO_JOB_WORKERS", "2"))
+VIDEO_UPLOAD_DIR = Path(os.getenv("VIDEO_UPLOAD_DIR", "temp/uploads"))
+# A running job is owned by one worker until its lease runs out; the lease is renewed while it runs
+VIDEO_JOB_LEASE_SECONDS = float(os.getenv("VIDEO_JOB_LEASE_SECONDS", "60"))
+# How often idle workers look for queued jobs and expired leases left by other processes
+VIDEO_JOB_POLL_SECONDS = float(os.getenv("VIDEO_JOB_POLL_SECONDS", "5"))
+# Completed and failed jobs are deleted by a TTL index this long after they finish
+VIDEO_JOB_RETENTION_SECONDS = int(os.getenv("VIDEO_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# Pipeline stages in execution order, used to report per-stage progress
+STAGES = [
+    "audio_extraction",
+    "transcription",
+    "frame_extraction",
+    "frame_analysis",
+    "description",
+    "storing",
+]
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+ProgressCallback = Callable[[str, str], Awaitable[None]]
+JobHandler = Callable[[Dict, ProgressCallback], Awaitable[Dict]]
+
+
+class VideoJobQueue:
+    """
+    Background queue for video analysis jobs.
+
+    Job state lives in a Mongo collection, which is also the queue: a worker
+    claims a job by atomically moving it from queued to running under its
+    ``owner`` id with a ``lease_until`` that it keeps renewing while the job
+    runs. Several processes can share the collection without running a job
+    twice. A running job whose lease has expired (its process stopped or
+    died) is claimed again, so jobs interrupted by a restart are retried from
+    the start. A fixed pool of worker tasks calls ``handler(job, progress)``.
+    Finished jobs are kept for ``retention_seconds`` after ``finished_at``.
+    """
+
+    def __init__(self, collection, handler: JobHandler, workers: int = VIDEO_JOB_WORKERS,
+                 upload_dir: Path = VIDEO_UPLOAD_DIR, lease_seconds: float = VIDEO_JOB_LEASE_SECONDS,
+                 poll_seconds: float = VIDEO_JOB_POLL_SECONDS,
+                 retention_seconds: int = VIDEO_JOB_RETENTION_SECONDS):
+        self.collection = collection
+        self.handler = handler
+        self.workers = workers
+        self.upload_dir = Path(upload_dir)
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def new_upload_path(self, job_id: str, suffix: str = ".mp4") -> Path:
+        """Where the uploaded video for a job is kept until the job finishes"""
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        return self.upload_dir / f"{job_id}{suffix}"
+
+    @staticmethod
+    def new_job_id() -> str:
+        return uuid.uuid4().hex
+
+    async def ensure_indexes(self):
+        """Index the claim query and expire finished jobs"""
+        try:
+            await self.collection.create_indexes([
+                # claim() sorts queued jobs by age and looks up expired leases on every poll
+                IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+                IndexModel([("lease_until", ASCENDING)], name="lease_until"),
+                # Only completed and failed jobs have finished_at, so nothing else expires
+                IndexModel([("finished_at", ASCENDING)], name="finished_at_ttl",
+                           expireAfterSeconds=self.retention_seconds),
+            ])
+        except Exception as e:
+            logger.error(f"Failed to create video job indexes: {e}")
+
+    async def start(self):
+        await self.ensure_indexes()
+        # Queued jobs and expired leases from a previous process are picked up by the first claims
+        self._wakeup = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        # Running jobs keep their status and upload; they are claimed again once the lease expires
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, job_id: str, video_path: Path, params: Dict) -> str:
+        now = datetime.utcnow()
+        await self.collection.insert_one({
+            "_id": job_id,
+            "status": QUEUED,
+            "video_path": str(video_path),
+            "params": params,
+            "stages": {stage: "pending" for stage in STAGES},
+            "progress": 0,
+            "result": None,
+            "error": None,
+            "owner": None,
+            "lease_until": None,
+            "created_at": now,
+            "updated_at": now,
+        })
+        if self._wakeup is not None:
+            self._wakeup.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        return await self.collection.find_one({"_id": job_id}, {"video_path": 0, "owner": 0, "lease_until": 0})
+
+    def queue_depth(self) -> int:
+        return self._wakeup.qsize() if self._wakeup is not None else 0
+
+    async def claim(self) -> Optional[Dict]:
+        """Atomically take the oldest queued job, or a running one whose lease has expired"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": QUEUED},
+                {"status": RUNNING, "lease_until": {"$lt": now}},
+                {"status": RUNNING, "lease_until": None},
+            ]},
+            {"$set": {
+                "status": RUNNING,
+                "owner": self.owner,
+                "lease_until": now + timedelta(seconds=self.lease_seconds),
+                "stages": {stage: "pending" for stage in STAGES},
+                "progress": 0,
+                "updated_at": now,
+            }},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _set(self, job_id: str, fields: Dict) -> bool:
+        """Update a job this worker still owns; False if the lease was lost to another worker"""
+        fields["updated_at"] = datetime.utcnow()
+        result = await self.collection.update_one({"_id": job_id, "owner": self.owner}, {"$set": fields})
+        return result.matched_count > 0
+
+    async def _renew_lease(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            lease_until = datetime.utcnow() + timedelta(seconds=self.lease_seconds)
+            if not await self._set(job_id, {"lease_until": lease_until}):
+                logger.warning(f"Lost the lease on video job {job_id}")
+                return
+
+    async def _worker(self, index: int):
+        while True:
+            # Drain everything claimable, not just the job that woke us
+            while True:
+                try:
+                    job = await self.claim()
+                except Exception as e:
+                    logger.error(f"Video job worker {index} could not claim a job: {e}")
+                    break
+                if job is None:
+                    break
+                try:
+                    await self._run(job)
+                except Exception as e:
+                    logger.error(f"Video job worker {index} crashed on {job['_id']}: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.get(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job: Dict):
+        job_id = job["_id"]
+
+        async def report(stage: str, status: str):
+            fields = {f"stages.{stage}": status}
+            if status in ("done", "cached") and stage in STAGES:
+                fields["progress"] = round(100 * (STAGES.index(stage) + 1) / len(STAGES))
+            await self._set(job_id, fields)
+
+        renewal = asyncio.create_task(self._renew_lease(job_id))
+        try:
+            result = await self.handler(job, report)
+            finished = await self._set(job_id, {"status": COMPLETED, "progress": 100, "result": result,
+                                                "lease_until": None, "finished_at": datetime.utcnow()})
+            logger.info(f"Video job {job_id} completed")
+        except asyncio.CancelledError:
+            # Shutting down: leave the job running with its upload for whoever claims it next
+            raise
+        except Exception as e:
+            logger.error(f"Video job {job_id} failed: {e}")
+            finished = await self._set(job_id, {"status": FAILED, "error": str(e), "lease_until": None,
+                                                "finished_at": datetime.utcnow()})
+        finally:
+            renewal.cancel()
+
+        # The upload is only needed until the job reaches a final state
+        if finished:
+            try:
+                os.remove(job["video_path"])
+            except OSError:
+                pass
@@ -1,14 +1,7 @@
-import cv2
 import numpy as np
-import torch
-from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
-import google.generativeai as genai
-import librosa
 from PIL import Image
 import os
-from tqdm import tqdm
 import subprocess
-import soundfile as sf
 from pathlib import Path
 import asyncio
 import logging
@@ -18,10 +11,55 @@ import backoff
 from functools import wraps
 import imageio_ffmpeg
 import tempfile
+from model_client import configure, get_model_client
+from upload_ingest import stream_upload_to_file
+from frame_sampler import FrameSampler
+from frame_selection import FrameSelector
+from image_preprocessing import get_image_preprocessor
+from transcription import TranscriptionEngine
+from response_parser import (Field, ResponseSchema, LIST, MAP, STRUCTURED_OUTPUT, scrape_response, structured_config,
+                             validate_json)
+from models.analysis import VideoAnalysis
+from video_stage_cache import VideoStageCache, fingerprint_frame
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_READ_CHUNK_SIZE = 1024 * 1024
+# Longest transcript excerpt sent with the description prompt, in characters
+TRANSCRIPT_PROMPT_CHARS = int(os.getenv("TRANSCRIPT_PROMPT_CHARS", "4000"))
+
+def transcript_excerpt(transcript, limit=TRANSCRIPT_PROMPT_CHARS):
+    """The transcript cut to ``limit`` characters at a word boundary"""
+    transcript = " ".join((transcript or "").split())
+    if len(transcript) <= limit:
+        return transcript
+    return transcript[:limit].rsplit(" ", 1)[0] + " ..."
+
+def parse_product_link(item):
+    """'Store name, $29.99' -> {"store": ..., "price": ...}"""
+    if ',' in item:
+        link, price = item.rsplit(',', 1)
+        return {"store": link.strip(), "price": price.strip()}
+    return {"store": item.strip(), "price": "Not Available"}
+
+VIDEO_ANALYSIS_SCHEMA = ResponseSchema([
+    Field('product_name', 'Product Name'),
+    Field('category', 'Category'),
+    Field('subcategory', 'Subcategory'),
+    Field('price', 'Price'),
+    Field('key_features', 'Key Features', LIST),
+    Field('search_keywords', 'Search Keywords', LIST),
+    Field('highlights', 'Highlights', LIST),
+    Field('key_timestamps', 'Key Timestamps', MAP),
+    Field('product_links', 'Product links', LIST, parse_product_link),
+    Field('platform', 'Platform'),
+    Field('duration', 'Duration'),
+    Field('views', 'Views'),
+    Field('transcript_summary', 'Transcript Summary'),
+], default="Not Available")
+
 def handle_rate_limit(max_tries=5, initial_wait=5):
     def decorator(func):
         @wraps(func)
@@ -43,51 +81,82 @@ class TokenBucket:
         self.tokens_per_second = tokens_per_second
         self.max_tokens = max_tokens
         self.tokens = max_tokens
-        self.last_update = time.time()
+        self.last_update = time.monotonic()
         self.lock = asyncio.Lock()
         self.waiting = False
-    
+
+    def _refill(self):
+        now = time.monotonic()
+        time_passed = now - self.last_update
+        self.tokens = min(self.max_tokens, self.tokens + time_passed * self.tokens_per_second)
+        self.last_update = now
+
     async def acquire(self):
         async with self.lock:
-            now = time.time()
-            time_passed = now - self.last_update
-            self.tokens = min(self.max_tokens, self.tokens + time_passed * self.tokens_per_second)
-            self.last_update = now
-            
+            self._refill()
             if self.tokens >= 1:
                 self.tokens -= 1
                 return True
             return False
     
     async def wait(self):
-        while not await self.acquire():
-            self.waiting = True
-            await asyncio.sleep(20)
-        self.waiting = False
+        """Take a token, sleeping exactly until the next one is due if the bucket is empty.
+
+        The lock is held while sleeping, so waiters are served in arrival order.
+        """
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                self.waiting = True
+                await asyncio.sleep((1 - self.tokens) / self.tokens_per_second)
+                self._refill()
+            self.waiting = False
+            self.tokens -= 1
 
 class VideoProcessor:
-    def __init__(self, google_api_key):
+    def __init__(self, google_api_key, cache=None):
         self.api_key = google_api_key
+        self.stage_cache = VideoStageCache(cache)
         self.rate_limiter = TokenBucket(tokens_per_second=0.05)
         
-        genai.configure(api_key=google_api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-pro-latest')
+        configure(google_api_key)
+        self.model_client = get_model_client('gemini-1.5-pro-latest')
         
         self.ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()  # Get the bundled FFmpeg path
         if not os.path.exists(self.ffmpeg_path):
             raise RuntimeError(f"FFmpeg not found at: {self.ffmpeg_path}")
         print(f"Using FFmpeg from: {self.ffmpeg_path}")
+        self.frame_sampler = FrameSampler(self.ffmpeg_path)
         
-        self.audio_processor = Wav2Vec2Processor.from_pretrained("facebook/wav2vec2-base-960h")
-        self.audio_model = Wav2Vec2ForCTC.from_pretrained("facebook/wav2vec2-base-960h")
+        # The speech model pulls in torch and transformers, so it is loaded on first use
+        self.transcriber = TranscriptionEngine()
         
         self.temp_dir = Path("temp")
         self.temp_dir.mkdir(exist_ok=True)
         
         self.MAX_FRAMES_PER_VIDEO = 3
-        self.MAX_API_RETRIES = 3
-        self.API_RETRY_DELAY = 10
-        self.FRAME_ANALYSIS_DELAY = 5
+        # Frames sampled per video; frame selection picks up to MAX_FRAMES_PER_VIDEO of them
+        self.FRAME_CANDIDATES = int(os.getenv("FRAME_CANDIDATES", "8"))
+        self.frame_selector = FrameSelector()
+        self.preprocessor = get_image_preprocessor()
+        # Frames analyzed at once; overall throughput is still bounded by rate_limiter
+        self.FRAME_ANALYSIS_CONCURRENCY = int(os.getenv("FRAME_ANALYSIS_CONCURRENCY", "3"))
+        # JSON-mode responses validated into VideoAnalysis, with the text format as fallback
+        self.structured = STRUCTURED_OUTPUT
+
+    def load_audio_models(self):
+        """Load the wav2vec2 processor and model if they are not loaded yet"""
+        self.transcriber.load()
+
+    @property
+    def audio_processor(self):
+        self.transcriber.load()
+        return self.transcriber.backend.processor
+
+    @property
+    def audio_model(self):
+        self.transcriber.load()
+        return self.transcriber.backend.model
 
     async def download_video(self, video_url):
         try:
@@ -122,19 +191,20 @@ class VideoProcessor:
                 return False
 
     async def _extract_audio(self, video_path):
+        """Decode the audio track to 16 kHz mono float32 PCM, read straight from FFmpeg's stdout"""
         try:
             if not os.path.exists(str(video_path)):
                 raise FileNotFoundError(f"Video file not found: {video_path}")
                 
-            temp_audio_path = self.temp_dir / "temp_audio.wav"
             command = [
                 str(self.ffmpeg_path),
+                '-hide_banner', '-loglevel', 'error',
                 '-i', str(video_path),
-                '-ab', '160k',
-                '-ac', '2',
-                '-ar', '16000',
-                '-vn', str(temp_audio_path),
-                '-y'
+                '-vn',
+                '-ac', '1',
+                '-ar', str(AUDIO_SAMPLE_RATE),
+                '-f', 'f32le',
+                '-'
             ]
             
             process = await asyncio.create_subprocess_exec(
@@ -142,14 +212,26 @@ class VideoProcessor:
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE
             )
-            await process.communicate()
+            # Drain stderr alongside stdout so a chatty FFmpeg can't block on a full pipe
+            stderr_task = asyncio.create_task(process.stderr.read())
+            pcm = bytearray()
+            while True:
+                chunk = await process.stdout.read(AUDIO_READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                pcm.extend(chunk)
+            stderr = await stderr_task
+            await process.wait()
             
-            if not os.path.exists(str(temp_audio_path)):
+            if process.returncode != 0 or not pcm:
+                logger.error(f"FFmpeg audio decode failed: {stderr.decode(errors='ignore')[-500:]}")
                 return None, None
                 
-            waveform, sample_rate = librosa.load(str(temp_audio_path), sr=16000)
-            os.remove(str(temp_audio_path))
-            return waveform, sample_rate
+            # Trim a trailing partial sample, then view the buffer as float32 without copying
+            if len(pcm) % 4:
+                del pcm[len(pcm) - len(pcm) % 4:]
+            waveform = np.frombuffer(pcm, dtype='<f4')
+            return waveform, AUDIO_SAMPLE_RATE
             
         except Exception as e:
             logger.error(f"Error extracting audio: {str(e)}")
@@ -157,38 +239,18 @@ class VideoProcessor:
 
     async def _transcribe_audio(self, waveform):
         try:
-            inputs = self.audio_processor(waveform, sampling_rate=16000, return_tensors="pt", padding=True)
-            with torch.no_grad():
-                logits = self.audio_model(inputs.input_values).logits
-            predicted_ids = torch.argmax(logits, dim=-1)
-            return self.audio_processor.batch_decode(predicted_ids)[0]
+            return await self.transcriber.transcribe(waveform, AUDIO_SAMPLE_RATE)
         except Exception as e:
             logger.error(f"Error transcribing audio: {str(e)}")
             return ""
 
     async def _extract_frames(self, video_path, num_frames=5):
-        frames = []
         try:
-            cap = cv2.VideoCapture(str(video_path))
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            if total_frames > 0:
-                frame_indices = np.linspace(0, total_frames-1, num_frames, dtype=int)
-                for idx in frame_indices:
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
-                    ret, frame = cap.read()
-                    if ret:
-                        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        frames.append(Image.fromarray(frame))
-                        
+            # Decoding is CPU-bound, keep it off the event loop
+            return await asyncio.to_thread(self.frame_sampler.sample, video_path, num_frames)
         except Exception as e:
             logger.error(f"Error extracting frames: {str(e)}")
-            
-        finally:
-            if 'cap' in locals():
-                cap.release()
-                
-        return frames
+            return []
 
     @handle_rate_limit(max_tries=3, initial_wait=2)
     async def _analyze_frame(self, frame):
@@ -200,39 +262,78 @@ Include:
 3. Potential uses
 4. Any visible technical specifications
 Keep the description professional and engaging."""
-        response = self.model.generate_content([prompt, frame])
+        response = await self.model_client.generate_content([prompt, await self.preprocessor.to_part(frame)])
         return response.text
 
     async def _analyze_frames(self, frames):
-        descriptions = []
-        frames = frames[:self.MAX_FRAMES_PER_VIDEO]
-        
-        for frame in tqdm(frames, desc="Analyzing frames"):
-            try:
-                for attempt in range(self.MAX_API_RETRIES):
-                    try:
-                        await self.rate_limiter.wait()
-                        description = await self._analyze_frame(frame)
-                        if description:
-                            descriptions.append(description)
-                            break
-                        await asyncio.sleep(2)
-                    except Exception as e:
-                        if "429" in str(e):
-                            await asyncio.sleep(self.API_RETRY_DELAY * (attempt + 1))
-                            continue
-                        raise e
-                        
-            except Exception as e:
-                logger.error(f"Error analyzing frame: {str(e)}")
-                
-            await asyncio.sleep(self.FRAME_ANALYSIS_DELAY)
-        
-        return descriptions
+        descriptions = await self._analyze_frames_aligned(frames[:self.MAX_FRAMES_PER_VIDEO])
+        return [description for description in descriptions if description]
+
+    async def _analyze_frames_aligned(self, frames):
+        """One description per frame, in order, with None where the analysis failed"""
+        semaphore = asyncio.Semaphore(self.FRAME_ANALYSIS_CONCURRENCY)
+
+        async def analyze(frame):
+            async with semaphore:
+                try:
+                    # Rate limiting and 429 retries happen inside _analyze_frame
+                    return await self._analyze_frame(frame)
+                except Exception as e:
+                    logger.error(f"Error analyzing frame: {str(e)}")
+                    return None
+
+        return list(await asyncio.gather(*(analyze(frame) for frame in frames)))
+
+    async def _describe_video_frames(self, video_path, content_hash, report):
+        """Sample and describe frames, reusing cached descriptions by frame fingerprint.
+
+        Returns None when no frames could be extracted.
+        """
+        entry = await self.stage_cache.get(content_hash, "frames")
+        if entry is not None:
+            descriptions = await self.stage_cache.get_frame_descriptions(entry["fingerprints"])
+            if all(description is not None for description in descriptions):
+                await report("frame_extraction", "cached")
+                await report("frame_analysis", "cached")
+                return descriptions
+
+        await report("frame_extraction", "running")
+        candidates = await self._extract_frames(video_path, num_frames=self.FRAME_CANDIDATES)
+        if not candidates:
+            await report("frame_extraction", "failed")
+            return None
+        # Near-duplicate and blurry frames aren't worth a model call
+        selection = await asyncio.to_thread(self.frame_selector.select, candidates, self.MAX_FRAMES_PER_VIDEO)
+        frames = selection.frames
+        fingerprints = await asyncio.to_thread(lambda: [fingerprint_frame(frame) for frame in frames])
+        await self.stage_cache.set(content_hash, "frames", {"fingerprints": fingerprints})
+        await report("frame_extraction", "done")
+
+        await report("frame_analysis", "running")
+        descriptions = await self.stage_cache.get_frame_descriptions(fingerprints)
+        missing = [i for i, description in enumerate(descriptions) if description is None]
+        fresh = await self._analyze_frames_aligned([frames[i] for i in missing])
+        for i, description in zip(missing, fresh):
+            if description:
+                descriptions[i] = description
+                await self.stage_cache.set_frame_description(fingerprints[i], description)
+        await report("frame_analysis", "done")
+        return [description for description in descriptions if description]
 
     @handle_rate_limit(max_tries=3, initial_wait=2)
     async def _generate_description(self, frame_descriptions, audio_transcription=""):
         await self.rate_limiter.wait()
+        transcript = transcript_excerpt(audio_transcription)
+        transcript_section = f"Audio Transcript:\n{transcript}\n" if transcript else ""
+        if self.structured:
+            prompt = f"""Analyze the product in this video from the descriptions of its frames and the transcript of its audio below. If any value is not found, write N/A.
+
+Visual Descriptions:
+{chr(10).join(frame_descriptions)}
+{transcript_section}"""
+            response = await self.model_client.generate_content(prompt, generation_config=structured_config(VideoAnalysis))
+            return response.text
+
         prompt = f"""Analyze this product video and provide detailed information in the following format exactly. If any value is not found, write N/A.
 
 BEGIN_ANALYSIS
@@ -247,7 +348,7 @@ Price: [visible pricing information]
 Key Timestamps: [visible timestamps information]
 Visual Descriptions:
 {chr(10).join(frame_descriptions)}
-Highlights: 
+{transcript_section}Highlights: 
 - [highlight 1]
 - [highlight 2]
 - [highlight 3]
@@ -265,129 +366,100 @@ Product links:
 - [Product link 3, Price on that platform]
 END_ANALYSIS"""
         
-        response = self.model.generate_content(prompt)
+        response = await self.model_client.generate_content(prompt)
         return response.text
 
-    async def process_video(self, video_file):
+    async def process_video(self, video_file, progress=None):
         try:
-            
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_video:
+                temp_video_path = temp_video.name
+            # Copy the upload in chunks instead of buffering the whole video in memory
+            await stream_upload_to_file(video_file, temp_video_path)
             try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_video:
-                    temp_video.write(await video_file.read())
-                    temp_video_path = temp_video.name
-                waveform, sr = await self._extract_audio(temp_video_path)
-                audio_transcription = await self._transcribe_audio(waveform) if waveform is not None else ""
-                
-                frames = await self._extract_frames(temp_video_path)
-                if not frames:
-                    return {'status': 'error', 'message': 'Failed to extract frames from video'}
-                
-                frame_descriptions = await self._analyze_frames(frames)
-                final_description = await self._generate_description(frame_descriptions, audio_transcription)
-                analysis_dict = self._parse_analysis(final_description)
-                analysis_dict['status'] = 'success'
-                
-                return analysis_dict
-                
+                return await self.process_video_path(temp_video_path, progress)
             finally:
-                print("Video analyzed successfully")
-                    
+                os.remove(temp_video_path)
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
-        
-    def _parse_analysis(self, text):
-        """Parse the analysis text into structured format"""
-        analysis_dict = {
-            'product_name': "Not Available",
-            'category': "Not Available",
-            'subcategory': "Not Available",
-            'price': "Not Available",
-            'key_features': [],
-            'search_keywords': [],
-            'highlights': [],
-            'key_timestamps': {},
-            'product_links': [],
-            'platform': "Not Available",
-            'duration': "Not Available",
-            'views': "Not Available",
-            'transcript_summary': "Not Available",
-        }
+
+    async def process_video_path(self, video_path, progress=None, content_hash=None):
+        """Run the full analysis pipeline on a video file already on disk.
+
+        ``progress`` is an optional ``async (stage, status)`` callback that is
+        told when each stage starts ("running") and finishes ("done").
+
+        Stage outputs are cached under the video's content hash (computed here
+        when not given). A retry or duplicate upload resumes after the last
+        completed stage, and skipped stages are reported as "cached".
+        """
+        async def report(stage, status):
+            if progress is not None:
+                await progress(stage, status)
 
         try:
-            # Extract only content between BEGIN_ANALYSIS and END_ANALYSIS
-            if 'BEGIN_ANALYSIS' in text and 'END_ANALYSIS' in text:
-                content = text.split('BEGIN_ANALYSIS')[-1].split('END_ANALYSIS')[0].strip()
+            if content_hash is None:
+                content_hash = await self.stage_cache.content_hash(video_path)
+
+            cached_analysis = await self.stage_cache.get(content_hash, "analysis")
+            if cached_analysis is not None:
+                for stage in ("audio_extraction", "transcription", "frame_extraction", "frame_analysis", "description"):
+                    await report(stage, "cached")
+                logger.info(f"Reusing cached analysis for video {content_hash[:12]}")
+                return cached_analysis
+
+            cached_transcript = await self.stage_cache.get(content_hash, "transcript")
+            if cached_transcript is not None:
+                audio_transcription = cached_transcript["transcript"]
+                await report("audio_extraction", "cached")
+                await report("transcription", "cached")
+            else:
+                await report("audio_extraction", "running")
+                waveform, sr = await self._extract_audio(video_path)
+                await report("audio_extraction", "done")
+
+                await report("transcription", "running")
+                audio_transcription = await self._transcribe_audio(waveform) if waveform is not None else ""
+                # An empty transcript may be a swallowed failure, so only real text is kept
+                if audio_transcription:
+                    await self.stage_cache.set(content_hash, "transcript", {"transcript": audio_transcription})
+                await report("transcription", "done")
+
+            frame_descriptions = await self._describe_video_frames(video_path, content_hash, report)
+            if frame_descriptions is None:
+                return {'status': 'error', 'message': 'Failed to extract frames from video'}
+
+            await report("description", "running")
+            final_description = await self._generate_description(frame_descriptions, audio_transcription)
+            analysis_dict, complete = self._parse_analysis(final_description)
+            analysis_dict['status'] = 'success'
+            # A scraped or nameless analysis is returned but not cached, so the next upload retries it
+            if complete:
+                await self.stage_cache.set(content_hash, "analysis", analysis_dict)
             else:
-                content = text.strip()
-
-            lines = content.split('\n')
-            current_section = None
-
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-
-                # Direct assignments for labeled fields
-                if line.startswith('Product Name:'):
-                    analysis_dict['product_name'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Category:'):
-                    analysis_dict['category'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Subcategory:'):
-                    analysis_dict['subcategory'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Platform:'):
-                    analysis_dict['platform'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Duration:'):
-                    analysis_dict['duration'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Views:'):
-                    analysis_dict['views'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Transcript Summary:'):
-                    analysis_dict['transcript_summary'] = line.split(':', 1)[1].strip()
-                elif line.startswith('Price:'):
-                    analysis_dict['price'] = line.split(':', 1)[1].strip()
-
-                # Handle Sections Based on Headers
-                elif line.startswith('Key Features:'):
-                    current_section = 'features'
-                elif line.startswith('Search Keywords:'):
-                    current_section = 'keywords'
-                elif line.startswith('Highlights:'):
-                    current_section = 'highlights'
-                elif line.startswith('Key Timestamps:'):
-                    current_section = 'timestamps'
-                elif line.startswith('Product links:'):
-                    current_section = 'links'
-
-                # Parse Lists
-                elif line.startswith('- '):
-                    item = line.strip('- ').strip()
-                    if current_section == 'features':
-                        analysis_dict['key_features'].append(item)
-                    elif current_section == 'keywords':
-                        analysis_dict['search_keywords'].append(item)
-                    elif current_section == 'highlights':
-                        analysis_dict['highlights'].append(item)
-                    elif current_section == 'links':
-                        # Parse links (e.g., '- [Product link 1, $29.99]')
-                        if ',' in item:
-                            link, price = item.rsplit(',', 1)
-                            analysis_dict['product_links'].append({
-                                "store": link.strip(),
-                                "price": price.strip()
-                            })
-                        else:
-                            analysis_dict['product_links'].append({
-                                "store": item.strip(),
-                                "price": "Not Available"
-                            })
-
-                # Parse Timestamps (e.g., '00:15: Intro scene')
-                elif current_section == 'timestamps' and ':' in line:
-                    timestamp, desc = line.split(':', 1)
-                    analysis_dict['key_timestamps'][timestamp.strip()] = desc.strip()
+                logger.warning(f"Not caching incomplete analysis for video {content_hash[:12]}")
+            await report("description", "done")
 
+            logger.info("Video analyzed successfully")
             return analysis_dict
 
         except Exception as e:
-            logger.error(f"Error parsing analysis: {str(e)}")
-            return analysis_dict
\ No newline at end of file
+            return {'status': 'error', 'message': str(e)}
+
+    def _parse_analysis(self, text):
+        """
+        Parse the model's analysis (JSON, or the labelled text format) into structured format.
+
+        Also returns whether the analysis is complete: a structured response
+        that validated without the text scraper, naming a product.
+        """
+        if self.structured:
+            analysis = validate_json(text, VideoAnalysis)
+            validated = analysis is not None
+            if not validated:
+                analysis = scrape_response(text, VideoAnalysis, VIDEO_ANALYSIS_SCHEMA)
+            result = analysis.to_result()
+        else:
+            validated = True
+            result = VIDEO_ANALYSIS_SCHEMA.parse(text)
+        product_name = str(result.get('product_name') or '').strip()
+        return result, validated and product_name not in ('', VIDEO_ANALYSIS_SCHEMA.default)
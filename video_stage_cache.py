@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+import logging
+from typing import Dict, List, Optional
+
+from PIL import Image
+
+from result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+# Bump when a prompt or the pipeline changes so stale stage outputs are ignored
+VIDEO_PIPELINE_VERSION = "4"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def fingerprint_frame(frame: Image.Image) -> str:
+    """Exact fingerprint of a sampled frame's pixels"""
+    rgb = frame.convert("RGB")
+    digest = hashlib.sha256(f"{rgb.width}x{rgb.height}".encode())
+    digest.update(rgb.tobytes())
+    return digest.hexdigest()
+
+
+def hash_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VideoStageCache:
+    """
+    Per-stage outputs of the video pipeline, keyed by the video's content hash.
+
+    Stored per video: the transcript, the fingerprints of the sampled frames
+    and the final parsed analysis. Frame descriptions are stored per frame
+    fingerprint, so they are also reused when two uploads share frames. A
+    missing ``cache`` turns every lookup into a miss.
+    """
+
+    def __init__(self, cache: Optional[ResultCache] = None):
+        self.cache = cache
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache is not None
+
+    async def content_hash(self, video_path) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(hash_file, video_path)
+
+    def _key(self, content_hash: str, stage: str) -> str:
+        return f"{content_hash}:{stage}:v{VIDEO_PIPELINE_VERSION}"
+
+    async def get(self, content_hash: Optional[str], stage: str) -> Optional[Dict]:
+        if not self.enabled or not content_hash:
+            return None
+        return await self.cache.get(self._key(content_hash, stage))
+
+    async def set(self, content_hash: Optional[str], stage: str, value: Dict):
+        if not self.enabled or not content_hash:
+            return
+        await self.cache.set(self._key(content_hash, stage), value)
+
+    async def get_frame_descriptions(self, fingerprints: List[str]) -> List[Optional[str]]:
+        if not self.enabled:
+            return [None] * len(fingerprints)
+        entries = await asyncio.gather(*(
+            self.cache.get(f"frame:{fingerprint}:v{VIDEO_PIPELINE_VERSION}") for fingerprint in fingerprints
+        ))
+        return [entry["description"] if entry else None for entry in entries]
+
+    async def set_frame_description(self, fingerprint: str, description: str):
+        if not self.enabled:
+            return
+        await self.cache.set(f"frame:{fingerprint}:v{VIDEO_PIPELINE_VERSION}", {"description": description})
+
+    def stats(self) -> Dict:
+        return self.cache.stats() if self.enabled else {"enabled": False}
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Set WARMUP_ON_STARTUP=1 to preload the lazy subsystems in the background after startup.
+# Leaving it unset keeps the fast-start behaviour: heavy stacks load on first use.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+
+_timings: Dict[str, float] = {}
+_warmup_task = None
+
+
+@contextmanager
+def import_timer(subsystem: str):
+    """Record how long importing or loading a subsystem takes"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _timings[subsystem] = round(_timings.get(subsystem, 0.0) + elapsed, 4)
+        logger.info(f"Loaded {subsystem} in {elapsed:.2f}s")
+
+
+def get_import_timings() -> Dict[str, float]:
+    return dict(_timings)
+
+
+def schedule_warmup(*loaders: Callable[[], object]):
+    """Run blocking loaders one after another on a worker thread without delaying startup"""
+    global _warmup_task
+
+    async def run():
+        for loader in loaders:
+            try:
+                await asyncio.to_thread(loader)
+            except Exception as e:
+                logger.error(f"Warm-up of {getattr(loader, '__name__', loader)} failed: {e}")
+
+    _warmup_task = asyncio.get_running_loop().create_task(run())
+    return _warmup_task
+
+
+def warmup_status() -> str:
+    if _warmup_task is None:
+        return "disabled"
+    return "done" if _warmup_task.done() else "running"